@@ -1,14 +1,43 @@
+import html
+from urllib.parse import urlencode
+
 import streamlit as st
+from utils.data import search
 from utils.utils import inject_css, load_template
 
 # Inject custom CSS
 css_file = "styles/styles.css"
 inject_css(css_file)
 
+page = st.query_params.get("page", "home")
+query = st.query_params.get("q", "") if page == "search" else ""
+
 # Load HTML template
-navbar_html = load_template("templates/navbar.html")
+navbar_html = load_template("templates/navbar.html", query=html.escape(query, quote=True))
 st.markdown(navbar_html, unsafe_allow_html=True)
 
+if page == "search":
+    st.title(f"Search results for “{query}”")
+    try:
+        after = int(st.query_params.get("after", -1))
+    except (TypeError, ValueError):
+        # A hand-edited or stale link; start from the first page
+        after = -1
+    results = search(query, after=after)
+    if results.results:
+        st.table(
+            {
+                "Name": [result.name for result in results.results],
+                "Type": [result.kind.title() for result in results.results],
+            }
+        )
+    else:
+        st.write("No matches found.")
+    if results.next_cursor is not None:
+        next_page = urlencode({"page": "search", "q": query, "after": results.next_cursor})
+        st.markdown(f"[Next page →](?{next_page})")
+    st.stop()
+
 # Content for the Home Page
 st.title("Welcome to DashDribble ⚽")
 st.markdown("A powerful football dashboard for leagues, teams, and players.")
@@ -0,0 +1,403 @@
+"""
+Read-only data access for the Streamlit app.
+
+One small pool of read-only SQLite connections is shared by every session
+(`st.cache_resource`). Query results are memoised with `st.cache_data`;
+each cached function takes the database file's modification stamp as an
+argument, so a reload of the database invalidates every cached result
+without waiting for the TTL.
+
+When DASHDRIBBLE_SNAPSHOT_DIR points at a snapshot written by
+db/scripts/snapshots.py, the same functions read its memory-mapped Arrow
+(or Parquet) files instead of SQLite, and the manifest's stamp takes the
+place of the database's.
+"""
+
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+import streamlit as st
+
+from utils.search import SearchPage, search as search_index
+from utils.snapshot import Snapshot, manifest_version
+
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE", "dashdribble.db")
+POOL_SIZE = int(os.getenv("DASHDRIBBLE_DB_POOL_SIZE", "4"))
+CACHE_TTL = int(os.getenv("DASHDRIBBLE_CACHE_TTL", "600"))
+# Unset: query the database
+SNAPSHOT_DIR = os.getenv("DASHDRIBBLE_SNAPSHOT_DIR")
+
+
+@dataclass(frozen=True)
+class League:
+    id: int
+    name: str
+    code: str
+    emblem: str
+    current_matchday: int | None
+
+
+@dataclass(frozen=True)
+class Standing:
+    position: int
+    team_id: int
+    team_name: str
+    crest: str
+    played_games: int
+    won: int
+    draw: int
+    lost: int
+    points: int
+    goals_for: int
+    goals_against: int
+    goal_difference: int
+
+
+@dataclass(frozen=True)
+class LeagueSummary:
+    league_id: int
+    teams: int
+    matches_played: int
+    goals: int
+    goals_per_game: float | None
+    leader_team_id: int | None
+    leader_points: int | None
+    points_gap: int | None
+
+
+@dataclass(frozen=True)
+class SquadStats:
+    team_id: int
+    players: int
+    average_age: float | None
+    goalkeepers: int
+    defenders: int
+    midfielders: int
+    attackers: int
+    nationalities: int
+
+
+@dataclass(frozen=True)
+class TeamOdds:
+    team_id: int
+    matchday: int
+    expected_points: float
+    expected_position: float
+    title_odds: float
+    top_four_odds: float
+    relegation_odds: float
+
+
+@dataclass(frozen=True)
+class MatchResult:
+    utc_date: str
+    home_team_id: int
+    away_team_id: int
+    home_score: int
+    away_score: int
+
+
+@dataclass(frozen=True)
+class Player:
+    id: int
+    name: str
+    position: str
+    date_of_birth: str
+    nationality: str
+
+
+@dataclass(frozen=True)
+class Coach:
+    id: int
+    name: str
+    nationality: str
+    contract_start: str
+    contract_until: str
+
+
+class ConnectionPool:
+    """Fixed-size pool of read-only connections shared across script runs."""
+
+    def __init__(self, db_file, size):
+        uri = f"{Path(db_file).resolve().as_uri()}?mode=ro"
+        self._connections = queue.Queue()
+        for _ in range(size):
+            connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            connection.execute("PRAGMA query_only = ON")
+            self._connections.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+
+@st.cache_resource(max_entries=1)
+def _pool(db_file: str, size: int, inode: int) -> ConnectionPool:
+    return ConnectionPool(db_file, size)
+
+
+def get_pool(db_file: str = DB_FILE, size: int = POOL_SIZE) -> ConnectionPool:
+    # Keyed on the inode so a database file swapped in place gets fresh connections
+    return _pool(db_file, size, os.stat(db_file).st_ino)
+
+
+def db_version(db_file: str = DB_FILE) -> tuple[int, int]:
+    """Modification stamp of the database, including an un-checkpointed WAL."""
+    stamps = []
+    for path in (db_file, f"{db_file}-wal"):
+        try:
+            stamps.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            stamps.append(0)
+    return tuple(stamps)
+
+
+@st.cache_resource(max_entries=1)
+def _snapshot(directory: str, version: tuple) -> Snapshot:
+    return Snapshot(directory)
+
+
+def get_snapshot() -> Snapshot | None:
+    if not SNAPSHOT_DIR:
+        return None
+    return _snapshot(SNAPSHOT_DIR, manifest_version(SNAPSHOT_DIR))
+
+
+def data_version() -> tuple:
+    """Stamp of whichever source the app reads: the snapshot manifest or the database."""
+    return manifest_version(SNAPSHOT_DIR) if SNAPSHOT_DIR else db_version()
+
+
+def _query(sql: str, params: tuple = ()) -> list[tuple]:
+    with get_pool().connection() as connection:
+        return connection.execute(sql, params).fetchall()
+
+
+def _select(
+    table: str,
+    columns: list[str],
+    where: dict | None = None,
+    order_by: list[tuple[str, str]] | None = None,
+    limit: int | None = None,
+) -> list[tuple]:
+    """
+    `columns` of the rows of `table` matching every `where` equality, from the
+    snapshot when one is configured. `order_by` is (column, "ascending" |
+    "descending") pairs; `limit` keeps the first rows of that order.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.select(table, columns, where, order_by, limit)
+    where = where or {}
+    sql = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(f"{column} = ?" for column in where)
+    if order_by:
+        sql += " ORDER BY " + ", ".join(
+            f"{column} {'DESC' if order == 'descending' else 'ASC'}" for column, order in order_by
+        )
+    params = tuple(where.values())
+    if limit is not None:
+        sql += " LIMIT ?"
+        params += (limit,)
+    return _query(sql, params)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _leagues(version: tuple) -> list[League]:
+    rows = _select(
+        "leagues",
+        ["id", "name", "code", "emblem", "current_matchday"],
+        order_by=[("name", "ascending")],
+    )
+    return [League(*row) for row in rows]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _standings(league_id: int, version: tuple) -> list[Standing]:
+    # league_table is materialised by the loaders (db/scripts/summaries.py)
+    rows = _select(
+        "league_table",
+        ["position", "team_id", "team_name", "crest", "played_games", "won", "draw",
+         "lost", "points", "goals_for", "goals_against", "goal_difference"],
+        {"league_id": league_id},
+        [("position", "ascending")],
+    )
+    return [Standing(*row) for row in rows]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _league_summary(league_id: int, version: tuple) -> LeagueSummary | None:
+    rows = _select(
+        "league_summary",
+        ["league_id", "teams", "matches_played", "goals", "goals_per_game",
+         "leader_team_id", "leader_points", "points_gap"],
+        {"league_id": league_id},
+    )
+    return LeagueSummary(*rows[0]) if rows else None
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _squad_stats(team_id: int, version: tuple) -> SquadStats | None:
+    rows = _select(
+        "team_squad_stats",
+        ["team_id", "players", "average_age", "goalkeepers", "defenders",
+         "midfielders", "attackers", "nationalities"],
+        {"team_id": team_id},
+    )
+    return SquadStats(*rows[0]) if rows else None
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _nationalities(team_id: int, version: tuple) -> list[tuple[str, int]]:
+    return _select(
+        "nationality_counts",
+        ["nationality", "players"],
+        {"team_id": team_id},
+        [("players", "descending"), ("nationality", "ascending")],
+    )
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _squad(team_id: int, version: tuple) -> list[Player]:
+    rows = _select(
+        "players",
+        ["id", "name", "position", "date_of_birth", "nationality"],
+        {"team_id": team_id},
+        [("position", "ascending"), ("name", "ascending")],
+    )
+    return [Player(*row) for row in rows]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _coach(team_id: int, version: tuple) -> Coach | None:
+    rows = _select(
+        "coaches",
+        ["id", "name", "nationality", "contract_start", "contract_until"],
+        {"team_id": team_id},
+    )
+    return Coach(*rows[0]) if rows else None
+
+
+def get_leagues() -> list[League]:
+    return _leagues(data_version())
+
+
+def get_standings(league_id: int) -> list[Standing]:
+    """League table ordered by position."""
+    return _standings(league_id, data_version())
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def _odds(league_id: int, version: tuple) -> list[TeamOdds]:
+    # Precomputed by db/scripts/simulation.py; the most recent parameter set wins
+    columns = ["team_id", "matchday", "expected_points", "expected_position",
+               "title_odds", "top_four_odds", "relegation_odds"]
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        # Already narrowed to that parameter set by the export
+        rows = snapshot.select(
+            "latest_odds", columns, {"league_id": league_id}, [("expected_position", "ascending")]
+        )
+        return [TeamOdds(*row) for row in rows]
+    rows = _query(
+        """
+        SELECT team_id, matchday, expected_points, expected_position,
+               title_odds, top_four_odds, relegation_odds
+        FROM simulation_results
+        WHERE league_id = ? AND params_key = (
+            SELECT params_key FROM simulation_results
+            WHERE league_id = ? ORDER BY created_at DESC LIMIT 1
+        )
+        ORDER BY expected_position
+        """,
+        (league_id, league_id),
+    )
+    return [TeamOdds(*row) for row in rows]
+
+
+def get_odds(league_id: int) -> list[TeamOdds]:
+    """Simulated final-position, title and relegation odds, best projected team first."""
+    return _odds(league_id, data_version())
+
+
+def get_league_summary(league_id: int) -> LeagueSummary | None:
+    return _league_summary(league_id, data_version())
+
+
+def get_squad_stats(team_id: int) -> SquadStats | None:
+    """Squad size, average age and players per position group."""
+    return _squad_stats(team_id, data_version())
+
+
+def get_nationalities(team_id: int) -> list[tuple[str, int]]:
+    """(nationality, players) for a team, most common first."""
+    return _nationalities(team_id, data_version())
+
+
+def get_squad(team_id: int) -> list[Player]:
+    """Players of a team ordered by position and name."""
+    return _squad(team_id, data_version())
+
+
+def get_coach(team_id: int) -> Coach | None:
+    return _coach(team_id, data_version())
+
+
+# Statuses whose score counts (db/scripts/matches.py)
+RESULT_STATUSES = ("FINISHED", "AWARDED")
+
+
+def _results(where: dict, limit: int) -> list[MatchResult]:
+    """The newest `limit` results matching `where`, across the counted statuses."""
+    columns = ["utc_date", "home_team_id", "away_team_id", "home_score", "away_score"]
+    rows = []
+    for status in RESULT_STATUSES:
+        rows += _select("matches", columns, {**where, "status": status}, [("utc_date", "descending")], limit)
+    return [MatchResult(*row) for row in sorted(rows, reverse=True)[:limit]]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=1000)
+def _form(team_id: int, last: int, version: tuple) -> list[MatchResult]:
+    home = _results({"home_team_id": team_id}, last)
+    away = _results({"away_team_id": team_id}, last)
+    return sorted(home + away, key=lambda match: match.utc_date, reverse=True)[:last]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=1000)
+def _head_to_head(team_id: int, other_team_id: int, last: int, version: tuple) -> list[MatchResult]:
+    home = _results({"home_team_id": team_id, "away_team_id": other_team_id}, last)
+    away = _results({"home_team_id": other_team_id, "away_team_id": team_id}, last)
+    return sorted(home + away, key=lambda match: match.utc_date, reverse=True)[:last]
+
+
+def get_form(team_id: int, last: int = 5) -> list[MatchResult]:
+    """A team's last results, newest first."""
+    return _form(team_id, last, data_version())
+
+
+def get_head_to_head(team_id: int, other_team_id: int, last: int = 10) -> list[MatchResult]:
+    """Results between two teams, newest first."""
+    return _head_to_head(team_id, other_team_id, last, data_version())
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False, max_entries=1000)
+def _search(query: str, kind: str | None, after: int, limit: int, version: tuple) -> SearchPage:
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.search(query, kind, after, limit)
+    with get_pool().connection() as connection:
+        return search_index(connection, query, kind, after, limit)
+
+
+def search(query: str, kind: str | None = None, after: int = -1, limit: int = 20) -> SearchPage:
+    """One keyset-paginated page of name matches (see utils.search)."""
+    return _search(query.strip(), kind, after, limit, data_version())
@@ -0,0 +1,66 @@
+"""
+Name search over the `search_index` FTS5 table.
+
+Queries are matched token by token as prefixes ("Mbap" finds "Mbappé";
+accents are folded by the index tokenizer). Results are paged by rowid
+with a keyset cursor, so every page is a bounded index range read no
+matter how deep the user pages.
+"""
+
+import re
+from dataclasses import dataclass
+
+KINDS = ("player", "team", "coach", "stadium")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class SearchResult:
+    cursor: int
+    kind: str
+    entity_id: int
+    name: str
+    team_id: int | None
+
+
+@dataclass(frozen=True)
+class SearchPage:
+    results: list[SearchResult]
+    next_cursor: int | None
+
+
+def match_expression(query: str) -> str | None:
+    """Turn free text into an FTS5 prefix query, e.g. 'kylian mbap' -> '"kylian"* "mbap"*'."""
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search(connection, query: str, kind: str | None = None, after: int = -1, limit: int = 20) -> SearchPage:
+    """
+    One page of matches for `query`, optionally restricted to one kind.
+
+    Pass the previous page's `next_cursor` as `after` to get the next page.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return SearchPage([], None)
+
+    sql = (
+        "SELECT rowid, kind, entity_id, name, team_id FROM search_index "
+        "WHERE search_index MATCH ? AND rowid > ?"
+    )
+    params = [expression, after]
+    if kind is not None:
+        # rowid = entity id * len(KINDS) + kind code
+        sql += f" AND rowid % {len(KINDS)} = ?"
+        params.append(KINDS.index(kind))
+    sql += " ORDER BY rowid LIMIT ?"
+    params.append(limit + 1)
+
+    rows = connection.execute(sql, params).fetchall()
+    results = [SearchResult(*row) for row in rows[:limit]]
+    next_cursor = results[-1].cursor if len(rows) > limit else None
+    return SearchPage(results, next_cursor)
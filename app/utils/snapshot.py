@@ -0,0 +1,99 @@
+"""
+Read-only access to the columnar snapshot written by db/scripts/snapshots.py.
+
+Datasets are opened lazily on first use. Arrow IPC files are memory-mapped,
+so columns are read straight from the page cache without a copy and every
+Streamlit process on the host shares the same pages; Parquet snapshots are
+decoded into memory once.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from utils.search import SearchPage, SearchResult
+
+MANIFEST = "manifest.json"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def manifest_version(directory: str) -> tuple[int, int]:
+    """Modification stamp of the snapshot; the manifest is replaced on every export."""
+    stat = os.stat(os.path.join(directory, MANIFEST))
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+class Snapshot:
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> pa.Table:
+        with self._lock:
+            table = self._tables.get(name)
+            if table is None:
+                path = os.path.join(self.directory, self.manifest["datasets"][name]["file"])
+                if path.endswith(".parquet"):
+                    table = pq.read_table(path, memory_map=True)
+                else:
+                    table = ipc.open_file(pa.memory_map(path)).read_all()
+                self._tables[name] = table
+            return table
+
+    def select(
+        self,
+        name: str,
+        columns: list[str],
+        where: dict | None = None,
+        order_by: list[tuple[str, str]] | None = None,
+        limit: int | None = None,
+    ) -> list[tuple]:
+        """
+        Rows of `columns` where every `where` column equals its value, sorted
+        like SQL ORDER BY and cut to `limit` rows like SQL LIMIT.
+        """
+        table = self.table(name)
+        for column, value in (where or {}).items():
+            table = table.filter(pc.equal(table[column], value))
+        if order_by:
+            table = table.sort_by(order_by)
+        if limit is not None:
+            table = table.slice(0, limit)
+        return list(zip(*(table[column].to_pylist() for column in columns)))
+
+    def search(self, query: str, kind: str | None = None, after: int = -1, limit: int = 20) -> SearchPage:
+        """`utils.search.search` over the `search_names` dataset: every token matches a word prefix."""
+        tokens = _TOKEN.findall(_fold(query))
+        if not tokens:
+            return SearchPage([], None)
+
+        table = self.table("search_names")
+        mask = pc.greater(table["cursor"], after)
+        if kind is not None:
+            mask = pc.and_(mask, pc.equal(table["kind"], kind))
+        for token in tokens:
+            # A word start, as in the FTS5 unicode61 tokenizer
+            pattern = r"(?:^|[^\pL\pN])" + re.escape(token)
+            mask = pc.and_(mask, pc.match_substring_regex(table["folded"], pattern))
+
+        rows = table.filter(mask).sort_by("cursor").slice(0, limit + 1)
+        columns = [rows[column].to_pylist() for column in ("cursor", "kind", "entity_id", "name", "team_id")]
+        results = [SearchResult(*row) for row in zip(*columns)][:limit]
+        next_cursor = results[-1].cursor if rows.num_rows > limit else None
+        return SearchPage(results, next_cursor)
@@ -1,15 +1,79 @@
+import os
+import re
+import threading
 from pathlib import Path
+from string import Template
+
 import streamlit as st
 
+# Assets are resolved relative to the app package, not the working directory
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# In dev mode assets are re-read when their mtime changes; otherwise each
+# file is read once per process.
+DEV_MODE = os.getenv("DASHDRIBBLE_DEV", "").lower() in ("1", "true", "yes")
+
+
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_html(html: str) -> str:
+    html = re.sub(r"<!--.*?-->", "", html, flags=re.S)
+    html = re.sub(r">\s+<", "><", html)
+    return re.sub(r"\s+", " ", html).strip()
+
+
+class AssetCache:
+    """Per-process cache of minified asset files, keyed by path."""
+
+    def __init__(self, dev_mode=DEV_MODE):
+        self.dev_mode = dev_mode
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, transform):
+        """Return `transform(file contents)`, reading the file only when needed."""
+        entry = self._entries.get(path)
+        if entry is not None and not self.dev_mode:
+            return entry[1]
+
+        mtime = path.stat().st_mtime_ns
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        with self._lock:
+            with open(path, "r", encoding="utf-8") as f:
+                value = transform(f.read())
+            self._entries[path] = (mtime, value)
+        return value
+
+
+_assets = AssetCache()
+
+
+def asset_path(asset_file: str) -> Path:
+    path = Path(asset_file)
+    return path if path.is_absolute() else APP_DIR / path
+
+
 # Inject custom CSS
 def inject_css(css_file: str):
-    css_path = Path(css_file)
-    with open(css_path, "r") as f:
-        css = f.read()
-        st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+    style = _assets.get(asset_path(css_file), lambda css: f"<style>{minify_css(css)}</style>")
+    st.markdown(style, unsafe_allow_html=True)
+
 
 # Load HTML template
-def load_template(template_file: str):
-    template_path = Path(template_file)
-    with open(template_path, "r") as f:
-        return f.read()
+def load_template(template_file: str, **params) -> str:
+    """
+    Return the minified template, with `$name` placeholders filled from
+    `params` (unknown placeholders are left as-is).
+    """
+    template = _assets.get(asset_path(template_file), lambda html: Template(minify_html(html)))
+    if not params:
+        return template.template
+    return template.safe_substitute(params)
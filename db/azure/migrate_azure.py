@@ -1,9 +1,46 @@
-import sqlite3
+"""
+Migrate the local SQLite database to Azure SQL (or any SQLAlchemy target).
+
+Tables are created on the target with their primary and foreign keys, then
+copied in fixed-size chunks read by key order from SQLite and written with
+bulk executemany inserts (`fast_executemany` on pyodbc). Tables are grouped
+by the dependencies in `foreign_keys.json`; tables in the same group are
+migrated concurrently, each group only after its parents. Progress is
+checkpointed after every chunk so a failed run resumes where it stopped.
+
+Usage:
+    python db/azure/migrate_azure.py [--chunk-size N] [--workers N] [--fresh] [--recreate]
+
+Set MIGRATION_TARGET_URL (e.g. sqlite:///copy.db or a postgresql:// URL) to
+migrate somewhere other than Azure.
+"""
+
+import argparse
+import json
 import os
-import pandas as pd
-from sqlalchemy import create_engine
-import dotenv
+import re
+import sqlite3
+import sys
+import threading
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import dotenv
+from sqlalchemy import (
+    Float,
+    Integer,
+    LargeBinary,
+    MetaData,
+    Unicode,
+    UnicodeText,
+    create_engine,
+    text,
+)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+import metrics  # noqa: E402
 
 # Load environment variables
 dotenv.load_dotenv()
@@ -11,42 +48,347 @@ dotenv.load_dotenv()
 # SQLite DB file path
 sqlite_db_path = os.environ.get("DASHDRIBBLE_DB_FILE")
 
-# Create a connection string for Azure SQL
-azure_connection_string = os.environ.get("AZURE_CONN_STRING")
-params = urllib.parse.quote(azure_connection_string)
-
-url = f"mssql+pyodbc:///?odbc_connect={params}"
-
-
-try:
-    # Connect to SQLite
-    sqlite_conn = sqlite3.connect(sqlite_db_path)
-    sqlite_cursor = sqlite_conn.cursor()
-    
-    # Connect to Azure SQL using SQLAlchemy
-    azure_engine = create_engine(url)
-except sqlite3.Error as e:
-    print(f"SQLite error: {e}")
-    exit(1)
-except Exception as e:
-    print(f"Error: {e}")
-    exit(1)
-
-# Fetch all table names from SQLite
-sqlite_cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-tables = [row[0] for row in sqlite_cursor.fetchall()]
-
-# Loop through each table and migrate
-for table in tables:
-    print(f"Migrating table: {table}")
-
-    # Read table data from SQLite
-    df = pd.read_sql(f"SELECT * FROM {table}", sqlite_conn)
-
-    # Upload data to Azure SQL
-    df.to_sql(table, azure_engine, if_exists="replace", index=False)
-    print(f"Successfully migrated: {table}")
-
-# Close connections
-sqlite_conn.close()
-print("Migration completed successfully!")
+HERE = os.path.dirname(os.path.abspath(__file__))
+FOREIGN_KEYS_FILE = os.path.join(HERE, "foreign_keys.json")
+CHECKPOINT_FILE = os.environ.get(
+    "MIGRATION_CHECKPOINT_FILE", os.path.join(HERE, "migration_checkpoint.json")
+)
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_WORKERS = 4
+MAX_INDEXED_TEXT_LENGTH = 450
+
+
+def target_url():
+    """MIGRATION_TARGET_URL if set, otherwise Azure SQL from AZURE_CONN_STRING."""
+    url = os.environ.get("MIGRATION_TARGET_URL")
+    if url:
+        return url
+    params = urllib.parse.quote(os.environ.get("AZURE_CONN_STRING", ""))
+    return f"mssql+pyodbc:///?odbc_connect={params}"
+
+
+def create_target_engine(url):
+    if url.startswith("mssql+pyodbc"):
+        # Bind whole parameter arrays instead of one round-trip per row
+        return create_engine(url, fast_executemany=True)
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"timeout": 60})
+    return create_engine(url)
+
+
+def load_dependencies(tables, foreign_keys_file=FOREIGN_KEYS_FILE):
+    """Return {table: set of parent tables} restricted to `tables`."""
+    dependencies = {table: set() for table in tables}
+    try:
+        with open(foreign_keys_file, "r") as f:
+            foreign_keys = json.load(f)
+    except FileNotFoundError:
+        print(f"{foreign_keys_file} not found, migrating tables without ordering.")
+        return dependencies
+    for fk in foreign_keys:
+        table, parent = fk["table"], fk["ref_table"]
+        if table in dependencies and parent in dependencies and parent != table:
+            dependencies[table].add(parent)
+    return dependencies
+
+
+def dependency_levels(dependencies):
+    """
+    Group tables into levels where every table's parents are in an earlier
+    level. Tables within a level are independent of each other.
+    """
+    remaining = {table: set(parents) for table, parents in dependencies.items()}
+    levels = []
+    while remaining:
+        ready = sorted(table for table, parents in remaining.items() if not parents)
+        if not ready:
+            raise ValueError(f"Foreign key cycle between tables: {sorted(remaining)}")
+        levels.append(ready)
+        for table in ready:
+            del remaining[table]
+        for parents in remaining.values():
+            parents.difference_update(ready)
+    return levels
+
+
+class Checkpoint:
+    """Per-table migration progress, persisted to a JSON file after every chunk."""
+
+    def __init__(self, path, fresh=False):
+        self.path = path
+        self.state = {}
+        self._lock = threading.Lock()
+        if not fresh and os.path.exists(path):
+            with open(path, "r") as f:
+                self.state = json.load(f)
+
+    def get(self, table):
+        return self.state.get(table, {"last_key": None, "rows": 0, "done": False})
+
+    def update(self, table, **values):
+        with self._lock:
+            entry = {**self.get(table), **values}
+            self.state[table] = entry
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.state, f, indent=4)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def local_tables(sqlite_conn):
+    """
+    Plain tables of the SQLite database. Virtual tables (the FTS5 search
+    index) and their shadow tables are derived data and stay local.
+    """
+    rows = sqlite_conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    virtual = [name for name, sql in rows if sql.upper().startswith("CREATE VIRTUAL TABLE")]
+    return [
+        name for name, _ in rows
+        if not any(name == v or name.startswith(f"{v}_") for v in virtual)
+    ]
+
+
+def reflect_source(sqlite_path):
+    """
+    Reflect the SQLite schema into target-neutral column types.
+
+    Primary keys are copied verbatim (no IDENTITY/serial), so the target
+    keeps the same ids and foreign keys. Indexed text columns get a bounded
+    length because SQL Server cannot index NVARCHAR(MAX).
+    """
+    sqlite_conn = sqlite3.connect(sqlite_path)
+    try:
+        tables = local_tables(sqlite_conn)
+    finally:
+        sqlite_conn.close()
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    metadata = MetaData()
+    metadata.reflect(engine, only=tables)
+    for table in metadata.tables.values():
+        indexed = {column.name for index in table.indexes for column in index.columns}
+        for column in table.columns:
+            type_name = type(column.type).__name__.upper()
+            if "INT" in type_name:
+                column.type = Integer()
+            elif type_name in ("REAL", "FLOAT", "NUMERIC", "DOUBLE"):
+                column.type = Float()
+            elif type_name in ("BLOB", "LARGEBINARY"):
+                column.type = LargeBinary()
+            elif column.name in indexed:
+                column.type = Unicode(MAX_INDEXED_TEXT_LENGTH)
+            else:
+                column.type = UnicodeText()
+            if column.primary_key:
+                column.autoincrement = False
+    engine.dispose()
+    return metadata
+
+
+def without_rowid(sqlite_conn, table):
+    """Whether `table` was created WITHOUT ROWID (the summary and history tables)."""
+    (sql,) = sqlite_conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+    # Table options follow the closing parenthesis of the column list
+    return re.search(r"\bWITHOUT\s+ROWID\b", sql[sql.rindex(")"):], re.IGNORECASE) is not None
+
+
+def key_columns(sqlite_conn, table):
+    """
+    Columns to page a table by: its primary key, in key order. Tables
+    without one fall back to SQLite's rowid, which WITHOUT ROWID tables
+    do not have, so those are always paged by their (composite) key.
+    """
+    pk = sorted((row[5], row[1]) for row in sqlite_conn.execute(f"PRAGMA table_info({table})") if row[5])
+    if len(pk) == 1 or (pk and without_rowid(sqlite_conn, table)):
+        return [name for _, name in pk]
+    return ["rowid"]
+
+
+def after_key(keys):
+    """
+    WHERE clause for target rows sorting after the `:k0, :k1, ...` key,
+    spelled out column by column since SQL Server has no row-value
+    comparison (SQLite does, and pages the source with one).
+    """
+    return " OR ".join(
+        "(" + " AND ".join([*(f"{keys[j]} = :k{j}" for j in range(i)), f"{keys[i]} > :k{i}"]) + ")"
+        for i in range(len(keys))
+    )
+
+
+def key_params(last_key):
+    values = last_key if isinstance(last_key, list) else [last_key]
+    return {f"k{i}": value for i, value in enumerate(values)}
+
+
+def row_bytes(row):
+    """Approximate payload size of a row: text and blob lengths, 8 bytes per number."""
+    return sum(
+        len(value.encode()) if isinstance(value, str) else len(value) if isinstance(value, bytes) else 8
+        for value in row
+        if value is not None
+    )
+
+
+def migrate_table(sqlite_path, target_engine, table, checkpoint, chunk_size):
+    """Copy one table in key order, checkpointing after every committed chunk."""
+    progress = checkpoint.get(table)
+    if progress["done"]:
+        print(f"Skipping table (already migrated): {table}")
+        return progress["rows"]
+
+    sqlite_conn = sqlite3.connect(sqlite_path)
+    try:
+        keys = key_columns(sqlite_conn, table)
+        columns = [row[1] for row in sqlite_conn.execute(f"PRAGMA table_info({table})")]
+        select_columns = columns if keys[0] in columns else ["rowid", *columns]
+        key_indexes = [select_columns.index(key) for key in keys]
+        order_by = ", ".join(keys)
+        insert_sql = text(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(':' + c for c in columns)})"
+        )
+
+        # A single-column key is checkpointed as a scalar, a composite one as a list
+        last_key = progress["last_key"]
+        rows_done = progress["rows"]
+        if last_key is not None and keys[0] not in columns:
+            # Source rowids are not copied, so the rows committed after the last
+            # checkpoint write cannot be told apart in the target: start over
+            print(f"Restarting table {table}: rowid-paged tables cannot resume")
+            last_key, rows_done = None, 0
+        # Drop anything committed after the last checkpoint write
+        with target_engine.begin() as target_conn:
+            if last_key is None:
+                target_conn.execute(text(f"DELETE FROM {table}"))
+            else:
+                target_conn.execute(
+                    text(f"DELETE FROM {table} WHERE {after_key(keys)}"), key_params(last_key)
+                )
+        if last_key is None:
+            print(f"Migrating table: {table}")
+        else:
+            print(f"Resuming table {table} after {order_by} {last_key} ({rows_done} rows done)")
+
+        start = time.perf_counter()
+        while True:
+            if last_key is None:
+                cursor = sqlite_conn.execute(
+                    f"SELECT {', '.join(select_columns)} FROM {table} ORDER BY {order_by} LIMIT :limit",
+                    {"limit": chunk_size},
+                )
+            else:
+                cursor = sqlite_conn.execute(
+                    f"SELECT {', '.join(select_columns)} FROM {table} "
+                    f"WHERE ({order_by}) > ({', '.join(f':k{i}' for i in range(len(keys)))}) "
+                    f"ORDER BY {order_by} LIMIT :limit",
+                    {**key_params(last_key), "limit": chunk_size},
+                )
+            chunk = cursor.fetchall()
+            if not chunk:
+                break
+
+            offset = len(select_columns) - len(columns)
+            params = [dict(zip(columns, row[offset:])) for row in chunk]
+            with metrics.span(f"migrate_table.{table}") as write:
+                with target_engine.begin() as target_conn:
+                    target_conn.execute(insert_sql, params)
+            metrics.observe("migrate_chunk_seconds", write.seconds, table=table)
+            metrics.inc("migrated_rows_total", len(chunk), table=table)
+            metrics.inc("migrated_bytes_total", sum(row_bytes(row[offset:]) for row in chunk), table=table)
+
+            last_key = [chunk[-1][i] for i in key_indexes]
+            if len(last_key) == 1:
+                last_key = last_key[0]
+            rows_done += len(chunk)
+            checkpoint.update(table, last_key=last_key, rows=rows_done)
+
+        checkpoint.update(table, done=True)
+        elapsed = time.perf_counter() - start
+        metrics.set_gauge("migrate_table_seconds", elapsed, table=table)
+        print(f"Successfully migrated: {table} ({rows_done} rows, {elapsed:.2f}s)")
+        return rows_done
+    finally:
+        sqlite_conn.close()
+
+
+def migrate(sqlite_path, url, chunk_size=DEFAULT_CHUNK_SIZE, workers=DEFAULT_WORKERS,
+            fresh=False, recreate=False):
+    with metrics.span("migrate_azure"):
+        _migrate(sqlite_path, url, chunk_size, workers, fresh, recreate)
+
+
+def _migrate(sqlite_path, url, chunk_size, workers, fresh, recreate):
+    checkpoint = Checkpoint(CHECKPOINT_FILE, fresh=fresh or recreate)
+    target_engine = create_target_engine(url)
+
+    metadata = reflect_source(sqlite_path)
+    tables = list(metadata.tables)
+    levels = dependency_levels(load_dependencies(tables))
+
+    if recreate:
+        metadata.drop_all(target_engine)
+    metadata.create_all(target_engine, checkfirst=True)
+
+    if not checkpoint.state:
+        # New run: empty the target children-first so the foreign keys hold
+        with target_engine.begin() as target_conn:
+            for level in reversed(levels):
+                for table in level:
+                    target_conn.execute(text(f"DELETE FROM {table}"))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for level in levels:
+            # Parents are fully migrated before any child table starts
+            futures = [
+                executor.submit(migrate_table, sqlite_path, target_engine, table, checkpoint, chunk_size)
+                for table in level
+            ]
+            for future in futures:
+                future.result()
+
+    checkpoint.clear()
+    target_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate the SQLite database to Azure SQL.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--fresh", action="store_true", help="ignore any saved checkpoint")
+    parser.add_argument(
+        "--recreate", action="store_true", help="drop and recreate the target tables first"
+    )
+    args = parser.parse_args()
+
+    try:
+        migrate(
+            sqlite_db_path,
+            target_url(),
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            fresh=args.fresh,
+            recreate=args.recreate,
+        )
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}")
+        exit(1)
+    except Exception as e:
+        print(f"Error: {e}. Re-run to resume from the last checkpoint.")
+        exit(1)
+    finally:
+        metrics.export()
+
+    print("Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
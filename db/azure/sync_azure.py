@@ -0,0 +1,263 @@
+"""
+Incremental (change-data-capture) sync from SQLite to the remote warehouse.
+
+A row hash per primary key is kept in a small SQLite state file. Each run
+hashes the current rows, diffs them against the stored hashes and pushes
+only inserted/updated rows (batched MERGE on SQL Server, INSERT ... ON
+CONFLICT elsewhere) and deleted keys. The target tables must exist; create
+them with migrate_azure.py first, and delete the state file whenever the
+target is rebuilt from scratch.
+
+Usage:
+    python db/azure/sync_azure.py [--batch-size N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+
+import dotenv
+from sqlalchemy import bindparam, text
+
+from migrate_azure import (
+    create_target_engine,
+    dependency_levels,
+    key_columns,
+    key_params,
+    load_dependencies,
+    local_tables,
+    target_url,
+)
+
+dotenv.load_dotenv()
+
+sqlite_db_path = os.environ.get("DASHDRIBBLE_DB_FILE")
+SYNC_STATE_FILE = os.environ.get(
+    "SYNC_STATE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sync_state.db"),
+)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def open_state(path):
+    state = sqlite3.connect(path)
+    state.execute("""
+    CREATE TABLE IF NOT EXISTS row_hashes (
+        table_name TEXT NOT NULL,
+        row_key NOT NULL,
+        row_hash TEXT NOT NULL,
+        PRIMARY KEY (table_name, row_key)
+    ) WITHOUT ROWID
+    """)
+    state.commit()
+    return state
+
+
+def row_hash(row):
+    return hashlib.blake2b(repr(row).encode(), digest_size=12).hexdigest()
+
+
+def sync_keys(sqlite_conn, table):
+    """Primary key columns of `table`; CDC needs a key the target also has, not a rowid."""
+    keys = key_columns(sqlite_conn, table)
+    if keys == ["rowid"]:
+        raise ValueError(f"{table} has no primary key to sync by")
+    return keys
+
+
+def diff_table(sqlite_conn, state, table, keys, columns):
+    """
+    Compare the current rows of `table` with the stored hashes. A
+    single-column key is stored as is, a composite one as a JSON list.
+
+    Returns:
+        tuple: (rows to upsert, keys to delete, {key: new hash} for changed rows)
+    """
+    stored = dict(
+        state.execute(
+            "SELECT row_key, row_hash FROM row_hashes WHERE table_name = ?", (table,)
+        ).fetchall()
+    )
+    key_indexes = [columns.index(key) for key in keys]
+    upserts, new_hashes = [], {}
+    for row in sqlite_conn.execute(f"SELECT {', '.join(columns)} FROM {table}"):
+        if len(key_indexes) == 1:
+            row_key = row[key_indexes[0]]
+        else:
+            row_key = json.dumps([row[i] for i in key_indexes])
+        digest = row_hash(row)
+        if stored.pop(row_key, None) != digest:
+            upserts.append(dict(zip(columns, row)))
+            new_hashes[row_key] = digest
+    # Whatever is left in `stored` no longer exists locally
+    deletes = list(stored)
+    return upserts, deletes, new_hashes
+
+
+def upsert_statement(dialect, table, keys, columns):
+    # A table whose columns are all key columns has nothing to update on a match
+    others = [c for c in columns if c not in keys]
+    if dialect == "mssql":
+        matched = (
+            f"WHEN MATCHED THEN UPDATE SET {', '.join(f'{c} = source.{c}' for c in others)} "
+            if others else ""
+        )
+        return text(
+            f"MERGE INTO {table} WITH (HOLDLOCK) AS target "
+            f"USING (VALUES ({', '.join(':' + c for c in columns)})) "
+            f"AS source ({', '.join(columns)}) "
+            f"ON {' AND '.join(f'target.{k} = source.{k}' for k in keys)} "
+            f"{matched}"
+            f"WHEN NOT MATCHED THEN INSERT ({', '.join(columns)}) "
+            f"VALUES ({', '.join('source.' + c for c in columns)});"
+        )
+    on_conflict = (
+        f"DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in others)}"
+        if others else "DO NOTHING"
+    )
+    return text(
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(':' + c for c in columns)}) "
+        f"ON CONFLICT ({', '.join(keys)}) {on_conflict}"
+    )
+
+
+def batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def push_upserts(target_engine, table, keys, columns, rows, batch_size):
+    statement = upsert_statement(target_engine.dialect.name, table, keys, columns)
+    with target_engine.begin() as target_conn:
+        for batch in batches(rows, batch_size):
+            target_conn.execute(statement, batch)
+
+
+def push_deletes(target_engine, table, keys, row_keys, batch_size):
+    if len(keys) > 1:
+        statement = text(
+            f"DELETE FROM {table} WHERE {' AND '.join(f'{k} = :k{i}' for i, k in enumerate(keys))}"
+        )
+        with target_engine.begin() as target_conn:
+            for batch in batches(row_keys, batch_size):
+                target_conn.execute(statement, [key_params(json.loads(row_key)) for row_key in batch])
+        return
+    statement = text(f"DELETE FROM {table} WHERE {keys[0]} IN :keys").bindparams(
+        bindparam("keys", expanding=True)
+    )
+    with target_engine.begin() as target_conn:
+        for batch in batches(row_keys, batch_size):
+            target_conn.execute(statement, {"keys": batch})
+
+
+def save_hashes(state, table, new_hashes, deletes):
+    with state:
+        state.executemany(
+            "INSERT OR REPLACE INTO row_hashes (table_name, row_key, row_hash) VALUES (?, ?, ?)",
+            [(table, row_key, digest) for row_key, digest in new_hashes.items()],
+        )
+        state.executemany(
+            "DELETE FROM row_hashes WHERE table_name = ? AND row_key = ?",
+            [(table, row_key) for row_key in deletes],
+        )
+
+
+@dataclass
+class TablePlan:
+    table: str
+    keys: list
+    columns: list
+    upserts: list
+    deletes: list
+    new_hashes: dict
+    seconds: float = 0.0
+    sent_bytes: int = field(init=False)
+
+    def __post_init__(self):
+        self.sent_bytes = sum(len(repr(row)) for row in self.upserts)
+
+
+def plan_tables(sqlite_conn, state, levels):
+    plans = {}
+    for level in levels:
+        for table in level:
+            keys = sync_keys(sqlite_conn, table)
+            columns = [row[1] for row in sqlite_conn.execute(f"PRAGMA table_info({table})")]
+            start = time.perf_counter()
+            upserts, deletes, new_hashes = diff_table(sqlite_conn, state, table, keys, columns)
+            plans[table] = TablePlan(table, keys, columns, upserts, deletes, new_hashes)
+            plans[table].seconds += time.perf_counter() - start
+    return plans
+
+
+def sync(sqlite_path, url, batch_size=DEFAULT_BATCH_SIZE, state_path=SYNC_STATE_FILE):
+    """
+    Push the rows changed since the last sync.
+
+    Returns:
+        list: The TablePlan of every synced table.
+    """
+    sqlite_conn = sqlite3.connect(sqlite_path)
+    state = open_state(state_path)
+    target_engine = create_target_engine(url)
+
+    try:
+        tables = local_tables(sqlite_conn)
+        levels = dependency_levels(load_dependencies(tables))
+        plans = plan_tables(sqlite_conn, state, levels)
+        ordered = [plans[table] for level in levels for table in level if table in plans]
+
+        # Upserts parents-first, deletes children-first, so foreign keys hold.
+        # Hashes are saved only after the target has committed the change.
+        for plan in ordered:
+            start = time.perf_counter()
+            if plan.upserts:
+                push_upserts(target_engine, plan.table, plan.keys, plan.columns, plan.upserts, batch_size)
+                save_hashes(state, plan.table, plan.new_hashes, [])
+            plan.seconds += time.perf_counter() - start
+
+        for plan in reversed(ordered):
+            start = time.perf_counter()
+            if plan.deletes:
+                push_deletes(target_engine, plan.table, plan.keys, plan.deletes, batch_size)
+                save_hashes(state, plan.table, {}, plan.deletes)
+            plan.seconds += time.perf_counter() - start
+    finally:
+        sqlite_conn.close()
+        state.close()
+        target_engine.dispose()
+
+    print(f"{'table':<20} {'upserted':>9} {'deleted':>8} {'~bytes':>10} {'seconds':>8}")
+    for plan in ordered:
+        print(
+            f"{plan.table:<20} {len(plan.upserts):>9} {len(plan.deletes):>8} "
+            f"{plan.sent_bytes:>10} {plan.seconds:>8.2f}"
+        )
+    return ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push only changed rows to the warehouse.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        sync(sqlite_db_path, target_url(), batch_size=args.batch_size)
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}")
+        exit(1)
+    except Exception as e:
+        print(f"Error: {e}")
+        exit(1)
+
+    print("Sync completed successfully!")
+
+
+if __name__ == "__main__":
+    main()
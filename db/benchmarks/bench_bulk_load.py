@@ -0,0 +1,86 @@
+"""
+Rows/sec of the row-by-row team data loader against the executemany bulk
+loader, on a synthetic team_data file.
+
+    python db/benchmarks/bench_bulk_load.py --players 100000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from db_players_coach_stadium_create import (  # noqa: E402
+    create_tables,
+    process_team_data,
+    process_team_data_rowwise,
+)
+
+POSITIONS = ["Goalkeeper", "Defence", "Midfield", "Offence"]
+
+
+def synthetic_team_data(players, squad_size=25):
+    teams = {}
+    for team_index in range(max(1, players // squad_size)):
+        team_id = 1000 + team_index
+        teams[str(team_id)] = {
+            "id": team_id,
+            "venue": f"Stadium {team_id}",
+            "coach": {
+                "id": 500000 + team_id,
+                "name": f"Coach {team_id}",
+                "firstName": "Coach",
+                "lastName": str(team_id),
+                "dateOfBirth": "1970-01-01",
+                "nationality": "England",
+                "contract": {"start": "2023-07", "until": "2026-06"},
+            },
+            "squad": [
+                {
+                    "id": team_id * 100 + i,
+                    "name": f"Player {team_id}-{i}",
+                    "position": POSITIONS[i % len(POSITIONS)],
+                    "dateOfBirth": f"{1990 + i % 15}-0{1 + i % 9}-1{i % 10}",
+                    "nationality": "Spain",
+                }
+                for i in range(squad_size)
+            ],
+        }
+    return teams
+
+
+def run(name, load, data, rows, directory):
+    path = os.path.join(directory, f"{name}.db")
+    connection = sqlite3.connect(path)
+    create_tables(connection)
+    start = time.perf_counter()
+    load(connection, data)
+    elapsed = time.perf_counter() - start
+    count = connection.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+    connection.close()
+    print(f"{name:<10} {elapsed:8.2f}s  {rows / elapsed:12,.0f} rows/s  players={count}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, default=100_000)
+    args = parser.parse_args()
+
+    data = synthetic_team_data(args.players)
+    # players + one coach and one stadium per team
+    rows = sum(len(team["squad"]) + 2 for team in data.values())
+    print(f"{len(data)} teams, {rows} rows")
+
+    with tempfile.TemporaryDirectory() as directory:
+        rowwise = run("rowwise", process_team_data_rowwise, data, rows, directory)
+        bulk = run("bulk", process_team_data, data, rows, directory)
+    print(f"speedup    {rowwise / bulk:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
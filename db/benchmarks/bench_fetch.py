@@ -0,0 +1,84 @@
+"""
+Compare the old sleep-loop player fetch against the token-bucket fetcher.
+
+Both run against the local stub API with a scaled-down quota window, so a
+"minute" lasts `--window` seconds. The ideal time is the number of windows
+the quota forces us to wait for.
+
+    python db/benchmarks/bench_fetch.py --teams 96 --window 2
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from fetch_client import TokenBucket, fetch_json, fetch_many  # noqa: E402
+from stub_api import start_stub_server  # noqa: E402
+
+
+def legacy_fetch(base_url, team_ids, requests_per_minute, window):
+    """The pre-token-bucket loop, with its sleeps scaled to `window`."""
+    delay_between_requests = window / requests_per_minute
+    player_data = {}
+    for i, team_id in enumerate(team_ids):
+        response = requests.get(f"{base_url}/teams/{team_id}")
+        if response.status_code == 200:
+            player_data[team_id] = response.json()
+        if (i + 1) % requests_per_minute == 0:
+            time.sleep(window)
+        else:
+            time.sleep(delay_between_requests)
+    return player_data
+
+
+def bucket_fetch(base_url, team_ids, requests_per_minute, window):
+    limiter = TokenBucket(requests_per_minute, requests_per_minute / window)
+    return fetch_many(
+        team_ids,
+        lambda team_id: fetch_json(f"{base_url}/teams/{team_id}", {}, limiter, backoff=0.1),
+        max_workers=requests_per_minute,
+    )
+
+
+def run(name, fn, team_ids, args):
+    server, base_url, quota = start_stub_server(args.rpm, args.window, args.latency)
+    try:
+        start = time.perf_counter()
+        data = fn(base_url, team_ids, args.rpm, args.window)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+    print(
+        f"{name:<12} {elapsed:8.2f}s  fetched={len(data)}/{len(team_ids)}  "
+        f"requests={quota.total}  429s={quota.rejected}"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--teams", type=int, default=96)
+    parser.add_argument("--rpm", type=int, default=9, help="requests per window")
+    parser.add_argument("--window", type=float, default=2.0, help="seconds per quota window")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub response latency")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    team_ids = list(range(1, args.teams + 1))
+    ideal = (math.ceil(args.teams / args.rpm) - 1) * args.window
+    print(f"{args.teams} teams, {args.rpm} requests per {args.window}s window")
+    print(f"{'quota floor':<12} {ideal:8.2f}s")
+
+    if not args.skip_legacy:
+        run("legacy", legacy_fetch, team_ids, args)
+    run("token-bucket", bucket_fetch, team_ids, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Query plans and timings for the dashboard's access paths, before and after
+the schema migrations.
+
+Builds a synthetic database with the original un-indexed schema, runs the
+queries, applies the migrations and runs them again, then compares the
+aggregates computed per request with the load-time summary tables.
+
+    python db/benchmarks/bench_queries.py --leagues 200 --players 200000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from migrations import baseline_schema, migrate  # noqa: E402
+
+QUERIES = {
+    "standings by league": (
+        "SELECT position, team_id, played_games, won, draw, lost, points, "
+        "goals_for, goals_against, goal_difference "
+        "FROM current_standings WHERE league_id = ? ORDER BY position",
+        lambda league_id, team_id: (league_id,),
+    ),
+    "players by team": (
+        "SELECT name, position, date_of_birth, nationality FROM players "
+        "WHERE team_id = ? ORDER BY position, name",
+        lambda league_id, team_id: (team_id,),
+    ),
+    "coach by team": (
+        "SELECT name, nationality FROM coaches WHERE team_id = ?",
+        lambda league_id, team_id: (team_id,),
+    ),
+    "stadium dedup lookup": (
+        "SELECT 1 FROM stadiums WHERE team_id = ? AND venue_name = ?",
+        lambda league_id, team_id: (team_id, f"Stadium {team_id}"),
+    ),
+}
+
+# (computed per request, read from the summary tables)
+SUMMARY_QUERIES = {
+    "league table with names": (
+        "SELECT s.position, s.team_id, t.name, t.crest, s.played_games, s.points "
+        "FROM current_standings s JOIN league_teams t ON t.id = s.team_id "
+        "WHERE s.league_id = ? ORDER BY s.position",
+        "SELECT position, team_id, team_name, crest, played_games, points "
+        "FROM league_table WHERE league_id = ? ORDER BY position",
+        lambda league_id, team_id: (league_id,),
+    ),
+    "squad stats": (
+        "SELECT COUNT(*), AVG((julianday('now') - julianday(date_of_birth)) / 365.25), "
+        "SUM(position = 'Goalkeeper'), SUM(position LIKE '%Midfield%'), "
+        "COUNT(DISTINCT nationality) FROM players WHERE team_id = ?",
+        "SELECT players, average_age, goalkeepers, midfielders, nationalities "
+        "FROM team_squad_stats WHERE team_id = ?",
+        lambda league_id, team_id: (team_id,),
+    ),
+    "nationality breakdown": (
+        "SELECT nationality, COUNT(*) FROM players WHERE team_id = ? "
+        "GROUP BY nationality ORDER BY 2 DESC",
+        "SELECT nationality, players FROM nationality_counts WHERE team_id = ? "
+        "ORDER BY players DESC",
+        lambda league_id, team_id: (team_id,),
+    ),
+}
+
+
+def build(path, leagues, players, teams_per_league=20):
+    connection = sqlite3.connect(path)
+    # Only the tables, as the pre-migration create scripts left them
+    baseline_schema(connection.cursor())
+    rng = random.Random(7)
+    team_rows, standing_rows, coach_rows, stadium_rows = [], [], [], []
+    for league_id in range(1, leagues + 1):
+        for position in range(1, teams_per_league + 1):
+            team_id = league_id * 100 + position
+            team_rows.append((team_id, league_id, f"Team {team_id}"))
+            standing_rows.append(
+                (league_id, team_id, position, 20, 10, 5, 5, 35, 30, 20, 10)
+            )
+            coach_rows.append((team_id, team_id, f"Coach {team_id}", "Italy"))
+            stadium_rows.append((team_id, f"Stadium {team_id}"))
+    team_ids = [row[0] for row in team_rows]
+    player_rows = [
+        (
+            i,
+            rng.choice(team_ids),
+            f"Player {i}",
+            rng.choice(["Goalkeeper", "Defence", "Midfield", "Offence"]),
+            f"{rng.randint(1985, 2006)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+            rng.choice(["Brazil", "Spain", "France", "England", "Germany"]),
+        )
+        for i in range(players)
+    ]
+    connection.executemany(
+        "INSERT INTO leagues (id, name) VALUES (?, ?)",
+        [(i, f"League {i}") for i in range(1, leagues + 1)],
+    )
+    connection.executemany("INSERT INTO league_teams (id, league_id, name) VALUES (?, ?, ?)", team_rows)
+    connection.executemany(
+        "INSERT INTO current_standings (league_id, team_id, position, played_games, won, draw, "
+        "lost, points, goals_for, goals_against, goal_difference) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        standing_rows,
+    )
+    connection.executemany(
+        "INSERT INTO coaches (id, team_id, name, nationality) VALUES (?, ?, ?, ?)", coach_rows
+    )
+    connection.executemany("INSERT INTO stadiums (team_id, venue_name) VALUES (?, ?)", stadium_rows)
+    connection.executemany(
+        "INSERT INTO players (id, team_id, name, position, date_of_birth, nationality) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        player_rows,
+    )
+    connection.commit()
+    return connection, team_ids
+
+
+def time_query(connection, name, sql, params, team_ids, repeat):
+    plan = connection.execute(f"EXPLAIN QUERY PLAN {sql}", params(1, team_ids[0])).fetchall()
+    rng = random.Random(11)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        team_id = rng.choice(team_ids)
+        connection.execute(sql, params(team_id // 100, team_id)).fetchall()
+    per_query_us = (time.perf_counter() - start) / repeat * 1e6
+    print(f"{name:<34} {per_query_us:10.1f} us/query")
+    for row in plan:
+        print(f"    {row[-1]}")
+
+
+def run_queries(connection, label, leagues, team_ids, repeat):
+    print(f"\n== {label} ==")
+    for name, (sql, params) in QUERIES.items():
+        time_query(connection, name, sql, params, team_ids, repeat)
+
+
+def run_summary_queries(connection, team_ids, repeat):
+    print("\n== per-request aggregates vs summary tables ==")
+    for name, (computed_sql, summary_sql, params) in SUMMARY_QUERIES.items():
+        time_query(connection, f"{name} (computed)", computed_sql, params, team_ids, repeat)
+        time_query(connection, f"{name} (summary)", summary_sql, params, team_ids, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--leagues", type=int, default=200)
+    parser.add_argument("--players", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection, team_ids = build(os.path.join(directory, "bench.db"), args.leagues, args.players)
+        # Mark the tables as adopted so migrate() only adds what v2+ brings
+        connection.execute("PRAGMA user_version = 1")
+        run_queries(connection, "before migrations", args.leagues, team_ids, args.repeat)
+        migrate(connection)
+        connection.execute("ANALYZE")
+        run_queries(connection, "after migrations", args.leagues, team_ids, args.repeat)
+        run_summary_queries(connection, team_ids, args.repeat)
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Parse time and memory per row: the old dict-building parsers against the
+record types in `records.py`, with the standard library JSON decoder and,
+when installed, orjson.
+
+For each path it reports the best-of-N parse time per row and, measured with
+tracemalloc, the bytes still allocated per row once the rows are ready for
+`executemany` (what a loader holds for a chunk) and the peak bytes per row
+while parsing.
+
+    python db/benchmarks/bench_records.py --scale 10 --repeat 5
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+import records  # noqa: E402
+from synthetic import SyntheticWorld  # noqa: E402
+
+LEAGUE_TEAM_COLUMNS = ("id", "league_id", "name", "short_name", "tla", "crest")
+STANDING_COLUMNS = (
+    "league_id", "team_id", "position", "played_games", "won", "draw", "lost",
+    "points", "goals_for", "goals_against", "goal_difference",
+)
+
+
+def dict_standings(json_data):
+    """The previous parser: one dict per row, then one tuple per row for executemany."""
+    league_id = json_data["competition"]["id"]
+    static_teams, dynamic_standings = [], []
+    for standing in json_data["standings"]:
+        for entry in standing["table"]:
+            static_teams.append({
+                "league_id": league_id,
+                "id": entry["team"]["id"],
+                "name": entry["team"]["name"],
+                "short_name": entry["team"].get("shortName", ""),
+                "tla": entry["team"].get("tla", ""),
+                "crest": entry["team"].get("crest", ""),
+            })
+            dynamic_standings.append({
+                "league_id": league_id,
+                "team_id": entry["team"]["id"],
+                "position": entry["position"],
+                "played_games": entry["playedGames"],
+                "won": entry["won"],
+                "draw": entry["draw"],
+                "lost": entry["lost"],
+                "points": entry["points"],
+                "goals_for": entry["goalsFor"],
+                "goals_against": entry["goalsAgainst"],
+                "goal_difference": entry["goalDifference"],
+            })
+    team_rows = [tuple(team[c] for c in LEAGUE_TEAM_COLUMNS) for team in static_teams]
+    standing_rows = [tuple(row[c] for c in STANDING_COLUMNS) for row in dynamic_standings]
+    # The dicts stay alive alongside the tuples: they feed the standings history
+    return team_rows, standing_rows, dynamic_standings
+
+
+def tuple_team(team_id, team_data):
+    """The previous team parser: a plain tuple per coach, player and stadium, unvalidated."""
+    team_id = int(team_id)
+    coach = None
+    coach_data = team_data.get("coach") or {}
+    if coach_data.get("id") is not None:
+        contract = coach_data.get("contract") or {}
+        coach = (
+            coach_data["id"],
+            team_id,
+            coach_data.get("name"),
+            coach_data.get("firstName", ""),
+            coach_data.get("lastName", ""),
+            coach_data.get("dateOfBirth", ""),
+            coach_data.get("nationality", ""),
+            contract.get("start", ""),
+            contract.get("until", ""),
+        )
+    players = [
+        (
+            player["id"],
+            team_id,
+            player["name"],
+            player.get("position", ""),
+            player.get("dateOfBirth", ""),
+            player.get("nationality", ""),
+        )
+        for player in team_data.get("squad", [])
+    ]
+    return coach, players, (team_id, team_data.get("venue", ""))
+
+
+def records_standings(json_data):
+    return records.parse_standings(json_data)
+
+
+def records_team(team_id, team_data):
+    return records.parse_team(team_id, team_data)
+
+
+def payloads(world):
+    standings = [json.dumps(world.standings(code)).encode() for code in world.league_codes()]
+    teams = [json.dumps(team).encode() for _, team in world.teams()]
+    return standings, teams
+
+
+def parse_standings_payloads(decode, parse, payloads):
+    parsed = [parse(decode(payload)) for payload in payloads]
+    return parsed, sum(len(teams) + len(rows) for teams, rows, *_ in parsed)
+
+
+def parse_team_payloads(decode, parse, payloads):
+    parsed = []
+    for payload in payloads:
+        team = decode(payload)
+        parsed.append(parse(team["id"], team))
+    # Rows are players; the coach and stadium of each team ride along
+    return parsed, sum(len(players) for _, players, _ in parsed)
+
+
+def measure(run, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    _, rows = run()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(seconds), retained, peak, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    standings, teams = payloads(SyntheticWorld(args.scale))
+    decoders = [("json", json.loads)]
+    if records.orjson is not None:
+        decoders.append(("orjson", records.orjson.loads))
+
+    parsers = {
+        "standings": (parse_standings_payloads, standings, dict_standings, records_standings),
+        "squads": (parse_team_payloads, teams, tuple_team, records_team),
+    }
+
+    print(f"{len(standings)} standings and {len(teams)} team payloads (scale {args.scale})")
+    print(f"{'payload':<10} {'parser':<8} {'decoder':<7} {'rows':>7} {'us/row':>7} "
+          f"{'B/row held':>11} {'B/row peak':>11} {'speed-up':>9}")
+    for payload, (run, inputs, old, new) in parsers.items():
+        cases = [("dicts" if payload == "standings" else "tuples", "json", json.loads, old)]
+        cases += [("records", name, decode, new) for name, decode in decoders]
+        baseline = None
+        for name, decoder, decode, parse in cases:
+            seconds, retained, peak, rows = measure(lambda: run(decode, parse, inputs), args.repeat)
+            baseline = baseline or seconds
+            print(
+                f"{payload:<10} {name:<8} {decoder:<7} {rows:>7} {seconds / rows * 1e6:>7.2f} "
+                f"{retained / rows:>11.0f} {peak / rows:>11.0f} {baseline / seconds:>8.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
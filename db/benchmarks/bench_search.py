@@ -0,0 +1,128 @@
+"""
+Latency of the FTS5 name search on a synthetic database.
+
+Loads `--players` synthetic players (with accented names) plus teams,
+coaches and stadiums through the migrated schema, then times typical
+prefix queries and deep keyset pages.
+
+    python db/benchmarks/bench_search.py --players 500000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "app", "utils"))
+
+from migrations import migrate  # noqa: E402
+from search import KINDS, match_expression, search  # noqa: E402
+from search_index import rebuild_search_index  # noqa: E402
+
+FIRST_NAMES = ["Kylian", "Lionel", "Érling", "Jude", "Vinícius", "Luka", "Antoine", "Pedri", "Rúben", "Søren"]
+STAR_NAMES = ["Mbappé", "Messi", "Håland", "Bellingham", "Júnior", "Modrić", "Griezmann", "González", "Dias", "Müller"]
+SYLLABLES = ["ba", "co", "de", "fé", "ga", "hi", "jo", "ka", "lu", "mé", "no", "pa", "ri", "sá", "to", "vi", "za", "ño"]
+
+
+def last_name(rng):
+    # Mostly generated surnames, with the occasional real one
+    if rng.random() < 0.01:
+        return rng.choice(STAR_NAMES)
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+QUERIES = ["Mbap", "mbappe", "Modric", "hala", "kyl mba", "Vini Jun", "zzzz", "Stadium 12", "Kylian"]
+
+
+def build(path, players):
+    connection = sqlite3.connect(path)
+    migrate(connection)
+    rng = random.Random(3)
+    teams = max(1, players // 25)
+    connection.executemany(
+        "INSERT INTO league_teams (id, league_id, name) VALUES (?, 1, ?)",
+        [(team_id, f"{last_name(rng)} FC") for team_id in range(1, teams + 1)],
+    )
+    connection.executemany(
+        "INSERT INTO coaches (id, team_id, name) VALUES (?, ?, ?)",
+        [(team_id, team_id, f"{rng.choice(FIRST_NAMES)} {last_name(rng)}") for team_id in range(1, teams + 1)],
+    )
+    connection.executemany(
+        "INSERT INTO stadiums (team_id, venue_name) VALUES (?, ?)",
+        [(team_id, f"Stadium {team_id}") for team_id in range(1, teams + 1)],
+    )
+    connection.executemany(
+        "INSERT INTO players (id, team_id, name) VALUES (?, ?, ?)",
+        (
+            (i, i % teams + 1, f"{rng.choice(FIRST_NAMES)} {last_name(rng)}")
+            for i in range(1, players + 1)
+        ),
+    )
+    # The rows bypass the loaders, so index them the way a full load does
+    rebuild_search_index(connection.cursor())
+    connection.commit()
+    return connection
+
+
+def hit_count(connection, query, kind=None):
+    """Every match of `query`, not just the first page, to check the results against."""
+    expression = match_expression(query)
+    if expression is None:
+        return 0
+    sql = "SELECT COUNT(*) FROM search_index WHERE search_index MATCH ?"
+    params = [expression]
+    if kind is not None:
+        sql += f" AND rowid % {len(KINDS)} = ?"
+        params.append(KINDS.index(kind))
+    return connection.execute(sql, params).fetchone()[0]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        connection = build(os.path.join(directory, "search.db"), args.players)
+        print(f"built {args.players} players in {time.perf_counter() - start:.1f}s")
+        rows = connection.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+        print(f"search_index rows: {rows}\n")
+
+        print(f"{'query':<14} {'kind':<8} {'page':>5} {'hits':>7} {'median ms':>10} {'max ms':>8}  first hit")
+        for query in QUERIES:
+            for kind in (None, "player"):
+                page, median, worst = timed(lambda: search(connection, query, kind), args.repeat)
+                hits = hit_count(connection, query, kind)
+                first = page.results[0].name if page.results else "-"
+                print(f"{query:<14} {kind or 'any':<8} {1:>5} {hits:>7} {median:>10.2f} {worst:>8.2f}  {first}")
+
+        # Walk 50 pages deep through a broad query
+        cursor, pages = -1, 0
+        while pages < 50:
+            page, median, worst = timed(lambda: search(connection, "Mess", after=cursor), 1)
+            pages += 1
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+        hits = hit_count(connection, "Mess")
+        print(f"{'Mess':<14} {'any':<8} {pages:>5} {hits:>7} {median:>10.2f} {worst:>8.2f}  (deep keyset page)")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
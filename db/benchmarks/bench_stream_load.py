@@ -0,0 +1,102 @@
+"""
+Peak RSS of the team data loader as the number of teams grows.
+
+Each load runs in a fresh process so its peak RSS is measured on its own.
+Streaming NDJSON and the incremental legacy parser should stay flat; the
+old `json.load` of the whole document grows with the file.
+
+    python db/benchmarks/bench_stream_load.py --teams 1000 4000 16000
+"""
+
+import argparse
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from bench_bulk_load import synthetic_team_data  # noqa: E402
+from db_players_coach_stadium_create import create_tables, process_team_data  # noqa: E402
+from team_data_stream import iter_teams, write_teams  # noqa: E402
+
+MODES = ("ndjson", "legacy-stream", "legacy-json-load")
+
+
+def load(mode, path, db_path):
+    connection = sqlite3.connect(db_path)
+    create_tables(connection)
+    if mode == "legacy-json-load":
+        with open(path) as f:
+            process_team_data(connection, json.load(f))
+    else:
+        process_team_data(connection, iter_teams(path))
+    connection.close()
+
+
+def peak_rss_mib():
+    # On Linux ru_maxrss survives exec and would include the parent's peak,
+    # so prefer the per-process high-water mark from /proc.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode, path, db_path):
+    start = time.perf_counter()
+    load(mode, path, db_path)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"elapsed": elapsed, "peak_mib": peak_rss_mib()}))
+
+
+def write_files(directory, teams):
+    data = synthetic_team_data(teams * 25)
+    ndjson_path = os.path.join(directory, f"{teams}.ndjson")
+    legacy_path = os.path.join(directory, f"{teams}.json")
+    write_teams(ndjson_path, ((int(k), v) for k, v in data.items()))
+    with open(legacy_path, "w") as f:
+        json.dump(data, f, indent=4)
+    return {"ndjson": ndjson_path, "legacy-stream": legacy_path, "legacy-json-load": legacy_path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--teams", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "PATH", "DB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'teams':>7} {'mode':<18} {'file MiB':>9} {'peak MiB':>9} {'seconds':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for teams in args.teams:
+            paths = write_files(directory, teams)
+            for mode in MODES:
+                db_path = os.path.join(directory, f"{teams}-{mode}.db")
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, paths[mode], db_path],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout.strip().splitlines()[-1]
+                result = json.loads(output)
+                size_mib = os.path.getsize(paths[mode]) / 2**20
+                print(
+                    f"{teams:>7} {mode:<18} {size_mib:>9.1f} "
+                    f"{result['peak_mib']:>9.1f} {result['elapsed']:>8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+End-to-end benchmark suite on a synthetic world of 1x, 10x or 100x our volume.
+
+Stages, each timed through the same code the pipeline runs:
+
+- fetch: competitions, standings and every team from the local stub API,
+  with the quota squeezed into a `--window` second "minute";
+- parse: the loaders' JSON decoder (`records.loads`) plus their parsers, in memory;
+- load: leagues, standings and squads into a fresh migrated database;
+- migrate: schema migrations on an empty and on a loaded database, and the
+  warehouse copy (migrate_azure) into a SQLite target;
+- query: the dashboard's access paths and the name search.
+
+Every run appends one JSON line (commit, scale, metrics) to
+`--results` (BENCH_RESULTS_FILE, default db/benchmarks/results.jsonl) and
+is compared with the previous run at the same scale, so a regression
+between commits shows up as a flagged delta.
+
+    python db/benchmarks/run_suite.py --scale 10
+    python db/benchmarks/run_suite.py --scale 1 --stages parse load query --baseline 1a2b3c4
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+sys.path.insert(0, os.path.join(HERE, "..", "azure"))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "app", "utils"))
+
+from bench_queries import QUERIES, SUMMARY_QUERIES  # noqa: E402
+from db_league_teams_create import insert_teams_parallel  # noqa: E402
+from db_league_teams_create import parse_json_data as parse_standings  # noqa: E402
+from db_leagues_create import insert_leagues_parallel  # noqa: E402
+from db_leagues_create import parse_json_data as parse_league  # noqa: E402
+from db_players_coach_stadium_create import parse_team_batches, process_team_data  # noqa: E402
+from fetch_client import FootballDataClient, TokenBucket  # noqa: E402
+from migrations import migrate  # noqa: E402
+from records import loads  # noqa: E402
+from search import search  # noqa: E402
+from stub_api import start_stub_server  # noqa: E402
+from synthetic import SyntheticWorld  # noqa: E402
+from team_data_stream import iter_teams, resolve_team_data_path  # noqa: E402
+
+STAGES = ("fetch", "parse", "load", "migrate", "query")
+# Stages that read the database written by `load`
+NEEDS_LOAD = ("migrate", "query")
+RESULTS_FILE = os.getenv("BENCH_RESULTS_FILE", os.path.join(HERE, "results.jsonl"))
+SEARCH_QUERIES = ["Kyl", "Luka ba", "Arena", "fé", "zzzz"]
+# Changes smaller than this are timer noise, whatever the percentage
+NOISE_FLOOR = {"_s": 0.005, "_us": 2.0}
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the per-row progress the loaders and fetchers print."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_fetch(world, args):
+    server, base_url, quota = start_stub_server(
+        args.rpm, args.window, args.latency, world=world
+    )
+    client = FootballDataClient(base_url, "bench", requests_per_minute=args.rpm)
+    client.limiter = TokenBucket(args.rpm, args.rpm / args.window)
+    codes = world.league_codes()
+    team_paths = [f"teams/{team_id}" for team_id in world.all_team_ids()]
+    try:
+        with quiet():
+            competitions, competitions_s = timed(
+                lambda: client.get_many([f"competition/{code}" for code in codes])
+            )
+            standings, standings_s = timed(
+                lambda: client.get_many([f"competition/{code}/standings" for code in codes])
+            )
+            teams, teams_s = timed(lambda: client.get_many(team_paths))
+    finally:
+        client.close()
+        server.shutdown()
+
+    requests = 2 * len(codes) + len(team_paths)
+    fetched = len(competitions) + len(standings) + len(teams)
+    if fetched != requests:
+        raise RuntimeError(f"fetched {fetched} of {requests} payloads")
+    return {
+        "fetch.competitions_s": competitions_s,
+        "fetch.standings_s": standings_s,
+        "fetch.teams_s": teams_s,
+        "fetch.total_s": competitions_s + standings_s + teams_s,
+        "fetch.quota_floor_s": (math.ceil(requests / args.rpm) - 1) * args.window,
+        "fetch.requests": quota.total,
+        "fetch.rejected": quota.rejected,
+    }
+
+
+def _read_payloads(folder):
+    return [
+        open(os.path.join(folder, name), "rb").read()
+        for name in sorted(os.listdir(folder))
+        if name.endswith(".json")
+    ]
+
+
+def bench_parse(folders):
+    leagues_folder, standings_folder, team_folder = folders
+    leagues = _read_payloads(leagues_folder)
+    standings = _read_payloads(standings_folder)
+    with open(resolve_team_data_path(team_folder), "rb") as f:
+        teams = f.read().splitlines()
+    total_bytes = sum(map(len, leagues)) + sum(map(len, standings)) + sum(map(len, teams))
+
+    def parse_all():
+        for payload in leagues:
+            parse_league(loads(payload))
+        for payload in standings:
+            parse_standings(loads(payload))
+        # One team payload per line, as write_teams lays them out
+        parse_team_batches((team["id"], team) for team in map(loads, teams))
+
+    # Best of three: the whole stage is short enough for scheduler noise to matter
+    seconds = min(timed(parse_all)[1] for _ in range(3))
+    return {
+        "parse.total_s": seconds,
+        "parse.mb_per_s": total_bytes / seconds / 1e6,
+        "parse.payloads": len(leagues) + len(standings) + len(teams),
+    }
+
+
+def bench_load(folders, db_path, workers):
+    leagues_folder, standings_folder, team_folder = folders
+    connection = sqlite3.connect(db_path)
+    try:
+        cursor = connection.cursor()
+        with quiet():
+            migrate(connection)
+            _, leagues_s = timed(lambda: insert_leagues_parallel(cursor, leagues_folder, workers))
+            _, teams_s = timed(lambda: insert_teams_parallel(cursor, standings_folder, workers))
+            _, players_s = timed(
+                lambda: process_team_data(connection, iter_teams(resolve_team_data_path(team_folder)))
+            )
+        rows = sum(
+            connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("players", "coaches", "stadiums")
+        )
+    finally:
+        connection.close()
+    return {
+        "load.leagues_s": leagues_s,
+        "load.standings_s": teams_s,
+        "load.squads_s": players_s,
+        "load.squad_rows_per_s": rows / players_s,
+        "load.total_s": leagues_s + teams_s + players_s,
+    }
+
+
+def bench_migrate(db_path, directory):
+    empty = sqlite3.connect(os.path.join(directory, "empty.db"))
+    try:
+        with quiet():
+            _, fresh_s = timed(lambda: migrate(empty))
+    finally:
+        empty.close()
+
+    loaded = sqlite3.connect(db_path)
+    try:
+        _, noop_s = timed(lambda: migrate(loaded))
+    finally:
+        loaded.close()
+
+    # Read at import time, so set it before the first import
+    os.environ["MIGRATION_CHECKPOINT_FILE"] = os.path.join(directory, "checkpoint.json")
+    import migrate_azure
+
+    target = f"sqlite:///{os.path.join(directory, 'warehouse.db')}"
+    with quiet():
+        _, warehouse_s = timed(lambda: migrate_azure.migrate(db_path, target, fresh=True))
+    return {
+        "migrate.fresh_schema_s": fresh_s,
+        "migrate.noop_s": noop_s,
+        "migrate.warehouse_s": warehouse_s,
+    }
+
+
+def _query_us(connection, sql, params, team_ids, repeat):
+    rng = random.Random(11)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        team_id = rng.choice(team_ids)
+        connection.execute(sql, params(team_id // 100, team_id)).fetchall()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench_query(db_path, team_ids, repeat):
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.execute("ANALYZE")
+        metrics = {}
+        for name, (sql, params) in QUERIES.items():
+            metrics[f"query.{name.replace(' ', '_')}_us"] = _query_us(
+                connection, sql, params, team_ids, repeat
+            )
+        for name, (_, summary_sql, params) in SUMMARY_QUERIES.items():
+            metrics[f"query.{name.replace(' ', '_')}_us"] = _query_us(
+                connection, summary_sql, params, team_ids, repeat
+            )
+        samples = []
+        for query in SEARCH_QUERIES:
+            for _ in range(max(1, repeat // 20)):
+                start = time.perf_counter()
+                search(connection, query)
+                samples.append((time.perf_counter() - start) * 1e6)
+        metrics["query.search_median_us"] = statistics.median(samples)
+    finally:
+        connection.close()
+    return metrics
+
+
+def git_revision():
+    """(short commit, dirty) of the working tree, or (None, None) outside git."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=HERE, capture_output=True, text=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status.strip())
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_result(path, result):
+    with open(path, "a") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+def find_baseline(history, scale, commit=None):
+    """The latest earlier run at `scale`, of `commit` if given."""
+    for run in reversed(history):
+        if run["scale"] == scale and (commit is None or run["commit"] == commit):
+            return run
+    return None
+
+
+def regression(name, old, new, threshold):
+    """True when `name` got worse by more than `threshold`; counts never regress."""
+    if not old:
+        return False
+    if name.endswith("_per_s"):
+        return new < old * (1 - threshold)
+    for unit, floor in NOISE_FLOOR.items():
+        if name.endswith(unit):
+            return new > old * (1 + threshold) and new - old > floor
+    return False
+
+
+def compare(result, baseline, threshold):
+    """Print every metric against `baseline`. Returns the regressed metric names."""
+    if baseline is None:
+        print("\nNo earlier run at this scale to compare with.")
+    else:
+        dirty = " (dirty)" if baseline.get("dirty") else ""
+        print(f"\nCompared with {baseline['commit']}{dirty} at {baseline['timestamp']}")
+    print(f"{'metric':<40} {'value':>12} {'baseline':>12} {'change':>8}")
+    regressed = []
+    for name, value in result["metrics"].items():
+        old = baseline["metrics"].get(name) if baseline else None
+        line = f"{name:<40} {value:>12.3f}"
+        if old is not None:
+            change = (value - old) / old if old else 0.0
+            line += f" {old:>12.3f} {change:>+8.1%}"
+            if regression(name, old, value, threshold):
+                line += "  REGRESSION"
+                regressed.append(name)
+        print(line)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=int, default=1, help="1, 10 or 100 times our real volume")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--rpm", type=int, default=100, help="stub requests per quota window")
+    parser.add_argument("--window", type=float, default=0.25, help="seconds per quota window")
+    parser.add_argument("--latency", type=float, default=0.005, help="stub response latency")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size of the loaders")
+    parser.add_argument("--repeat", type=int, default=500, help="executions per timed query")
+    parser.add_argument("--results", default=RESULTS_FILE)
+    parser.add_argument("--baseline", help="compare with the latest run of this commit")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown flagged as a regression")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the results")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    stages = [stage for stage in STAGES if stage in args.stages]
+    if any(stage in NEEDS_LOAD for stage in stages) and "load" not in stages:
+        stages.insert(stages.index(next(s for s in stages if s in NEEDS_LOAD)), "load")
+
+    world = SyntheticWorld(args.scale, args.seed)
+    team_ids = world.all_team_ids()
+    print(f"Scale {args.scale}: {len(world.leagues)} leagues, {len(team_ids)} teams; stages: {' '.join(stages)}")
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as directory:
+        folders, metrics["generate_s"] = timed(lambda: world.write_dataset(directory))
+        db_path = os.path.join(directory, "bench.db")
+        for stage in stages:
+            start = time.perf_counter()
+            if stage == "fetch":
+                metrics.update(bench_fetch(world, args))
+            elif stage == "parse":
+                metrics.update(bench_parse(folders))
+            elif stage == "load":
+                metrics.update(bench_load(folders, db_path, args.workers))
+            elif stage == "migrate":
+                metrics.update(bench_migrate(db_path, directory))
+            elif stage == "query":
+                metrics.update(bench_query(db_path, team_ids, args.repeat))
+            print(f"  {stage:<8} {time.perf_counter() - start:8.2f}s")
+
+    commit, dirty = git_revision()
+    result = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "scale": args.scale,
+        "stages": stages,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "metrics": {name: round(value, 6) for name, value in metrics.items()},
+    }
+
+    history = load_results(args.results)
+    regressed = compare(result, find_baseline(history, args.scale, args.baseline), args.threshold)
+    if not args.no_save:
+        append_result(args.results, result)
+        print(f"\nAppended to {args.results}")
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
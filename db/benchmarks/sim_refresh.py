@@ -0,0 +1,177 @@
+"""
+A simulated week of the refresh daemon against a synthetic league world.
+
+Each competition plays a handful of fixture slots over the weekend; every
+full time produces a new table (the synthetic world one matchday on). The
+daemon runs on a fake clock against an in-process client that serves the
+world as of the fake time, so a week takes seconds. It reports the
+requests spent per day and how long after each full time the database had
+the new table.
+
+    python db/benchmarks/sim_refresh.py --days 7 --live 180
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+WORK_DIR = tempfile.mkdtemp(prefix="dashdribble-refresh-")
+# Read at import time by delta_refresh, so set them before the first import
+os.environ["LEAGUE_TEAMS_DATA_FOLDER"] = os.path.join(WORK_DIR, "current_league_teams")
+os.environ["TEAM_DATA_FOLDER"] = os.path.join(WORK_DIR, "team_data")
+
+from db_league_teams_create import insert_teams_parallel  # noqa: E402
+from db_leagues_create import insert_leagues_parallel  # noqa: E402
+from db_players_coach_stadium_create import process_team_data  # noqa: E402
+from migrations import migrate  # noqa: E402
+from refresh_daemon import FakeClock, KickoffWindows, RefreshDaemon, parse_windows  # noqa: E402
+from synthetic import SyntheticWorld  # noqa: E402
+from team_data_stream import iter_teams, resolve_team_data_path  # noqa: E402
+
+# A Friday at midnight UTC
+START = datetime(2025, 1, 17, tzinfo=timezone.utc)
+MATCH_DURATION = timedelta(hours=1, minutes=55)
+BASE_MATCHDAY = 19
+# (day offset from Friday, kick-off hour, minute) of each competition's slots
+FIXTURES = {
+    "PL": [(1, 12, 30), (1, 15, 0), (1, 17, 30), (2, 14, 0), (2, 16, 30)],
+    "PD": [(0, 20, 0), (1, 13, 0), (1, 15, 15), (1, 20, 0), (2, 20, 0)],
+    "SA": [(1, 14, 0), (1, 17, 0), (2, 11, 30), (2, 14, 0), (3, 19, 45)],
+    "BL1": [(0, 19, 30), (1, 14, 30), (1, 17, 30), (2, 14, 30), (2, 16, 30)],
+    "FL1": [(0, 20, 0), (1, 16, 0), (1, 20, 0), (2, 14, 0), (2, 19, 45)],
+}
+
+
+def full_times(days):
+    """{code: sorted full-time moments within the simulated days}."""
+    end = START + timedelta(days=days)
+    times = {}
+    for code, slots in FIXTURES.items():
+        moments = []
+        for week in range(days // 7 + 1):
+            for day, hour, minute in slots:
+                kickoff = START + timedelta(weeks=week, days=day, hours=hour, minutes=minute)
+                if kickoff + MATCH_DURATION < end:
+                    moments.append(kickoff + MATCH_DURATION)
+        times[code] = sorted(moments)
+    return times
+
+
+class SimulatedClient:
+    """Serves the synthetic world as of the fake clock and counts requests per day."""
+
+    def __init__(self, clock, times, requests_per_minute):
+        self.clock = clock
+        self.times = times
+        self.requests_per_minute = requests_per_minute
+        self.per_day = Counter()
+        self.staleness = []
+        self._published = {}
+        self._worlds = {}
+        self._lock = threading.Lock()
+
+    def _matchday(self, code, now):
+        return BASE_MATCHDAY + sum(moment <= now for moment in self.times[code])
+
+    def _world(self, matchday):
+        if matchday not in self._worlds:
+            self._worlds[matchday] = SyntheticWorld(1, matchday=matchday)
+        return self._worlds[matchday]
+
+    def get_json(self, path):
+        now = self.clock.now()
+        with self._lock:
+            self.per_day[now.strftime("%a")] += 1
+        parts = path.strip("/").split("/")
+        if parts[0] == "teams":
+            return self._world(BASE_MATCHDAY).resource(path)
+        code = parts[1]
+        matchday = self._matchday(code, now)
+        if parts[-1] == "standings" and matchday > self._published.get(code, BASE_MATCHDAY):
+            # The first time the new table is served is when the daemon sees it
+            full_time = self.times[code][matchday - BASE_MATCHDAY - 1]
+            self.staleness.append((now - full_time).total_seconds())
+            self._published[code] = matchday
+        return self._world(matchday).resource(path)
+
+
+def seed(db_path):
+    """A database loaded from the world at the base matchday, as the pipeline would."""
+    folders = SyntheticWorld(1, matchday=BASE_MATCHDAY).write_dataset(WORK_DIR)
+    connection = sqlite3.connect(db_path)
+    try:
+        migrate(connection)
+        cursor = connection.cursor()
+        insert_leagues_parallel(cursor, folders[0])
+        insert_teams_parallel(cursor, folders[1])
+        process_team_data(connection, iter_teams(resolve_team_data_path(folders[2])))
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--live", type=int, default=180)
+    parser.add_argument("--active", type=int, default=1800)
+    parser.add_argument("--idle", type=int, default=6 * 3600)
+    parser.add_argument("--rpm", type=int, default=9, help="requests per minute")
+    parser.add_argument("--windows", default="fri 18-20, sat 11-20, sun 11-20, mon 18-20")
+    args = parser.parse_args()
+
+    db_path = os.path.join(WORK_DIR, "football.db")
+    clock = FakeClock(START)
+    times = full_times(args.days)
+    client = SimulatedClient(clock, times, args.rpm)
+    with contextlib.redirect_stdout(io.StringIO()):
+        seed(db_path)
+        daemon = RefreshDaemon(
+            client,
+            db_file=db_path,
+            competitions=list(FIXTURES),
+            clock=clock,
+            windows=KickoffWindows(parse_windows(args.windows)),
+            requests_per_minute=args.rpm,
+            live=args.live,
+            active=args.active,
+            idle=args.idle,
+        )
+        asyncio.run(daemon.run(until=START + timedelta(days=args.days)))
+
+    connection = sqlite3.connect(db_path)
+    try:
+        stored = dict(connection.execute("SELECT code, current_matchday FROM leagues").fetchall())
+    finally:
+        connection.close()
+
+    print(f"{args.days} simulated days from {START:%a %Y-%m-%d}, {args.rpm} requests/minute, live every {args.live}s")
+    for day, count in client.per_day.items():
+        print(f"  {day}: {count:>5} requests")
+    print(f"  total: {sum(client.per_day.values())} requests ({daemon.requests} through the budget)")
+    events = sum(map(len, times.values()))
+    print(f"{len(client.staleness)}/{events} new tables picked up", end="")
+    if client.staleness:
+        minutes = sorted(s / 60 for s in client.staleness)
+        print(
+            f", minutes after full time: median {statistics.median(minutes):.1f}, "
+            f"max {minutes[-1]:.1f}"
+        )
+    else:
+        print()
+    print("stored matchdays: " + ", ".join(f"{code} {stored.get(code)}" for code in FIXTURES))
+
+
+if __name__ == "__main__":
+    main()
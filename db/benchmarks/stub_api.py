@@ -0,0 +1,137 @@
+"""
+Local stand-in for the football-data.org API.
+
+Serves `/teams/{id}` payloads (or, given a `synthetic.SyntheticWorld`, its
+competitions, standings and teams) and enforces a fixed-window request quota the
+same way the real API does: every response carries
+`X-Requests-Available-Minute` and `X-RequestCounter-Reset`, and requests over
+the quota get a 429. The window length is configurable so benchmarks can run
+a scaled-down "minute". Payloads carry an ETag and conditional requests for
+an unchanged payload get a 304.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QuotaWindow:
+    def __init__(self, limit, window_seconds):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.window_start = time.monotonic()
+        self.used = 0
+        self.total = 0
+        self.rejected = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Count a request. Returns (allowed, available, reset_after)."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self.window_start >= self.window_seconds:
+                self.window_start = now
+                self.used = 0
+            reset_after = self.window_seconds - (now - self.window_start)
+            self.total += 1
+            if self.used >= self.limit:
+                self.rejected += 1
+                return False, 0, reset_after
+            self.used += 1
+            return True, self.limit - self.used, reset_after
+
+
+def team_payload(team_id, squad_size=25):
+    return {
+        "id": team_id,
+        "name": f"Team {team_id}",
+        "venue": f"Stadium {team_id}",
+        "coach": {"id": 900000 + team_id, "name": f"Coach {team_id}"},
+        "squad": [
+            {"id": team_id * 100 + i, "name": f"Player {team_id}-{i}", "position": "Midfield"}
+            for i in range(squad_size)
+        ],
+    }
+
+
+def team_resource(path):
+    parts = path.strip("/").split("/")
+    if len(parts) == 2 and parts[0] == "teams" and parts[1].isdigit():
+        return team_payload(int(parts[1]))
+    return None
+
+
+def make_handler(quota, latency, resource=team_resource):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            allowed, available, reset_after = quota.take()
+            if latency:
+                time.sleep(latency)
+
+            headers = {
+                "X-Requests-Available-Minute": str(available),
+                "X-RequestCounter-Reset": f"{reset_after:.3f}",
+            }
+            body = resource(self.path) if allowed else None
+            if not allowed:
+                status, body = 429, {"message": "You reached your request limit."}
+            elif body is not None:
+                status = 200
+            else:
+                status, body = 404, {"message": "Not found"}
+
+            payload = json.dumps(body).encode()
+            if status == 200:
+                etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+                headers["ETag"] = etag
+                if self.headers.get("If-None-Match") == etag:
+                    status, payload = 304, b""
+                    quota.not_modified += 1
+
+            self.send_response(status)
+            if payload:
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(limit=9, window_seconds=60.0, latency=0.05, port=0, world=None):
+    """Start the stub on a background thread. Returns (server, base_url, quota)."""
+    quota = QuotaWindow(limit, window_seconds)
+    resource = world.resource if world is not None else team_resource
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(quota, latency, resource))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, base_url, quota
+
+
+if __name__ == "__main__":
+    from synthetic import SyntheticWorld
+
+    parser = argparse.ArgumentParser(description="Serve a synthetic football-data.org API.")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--limit", type=int, default=9, help="requests per window")
+    parser.add_argument("--window", type=float, default=60.0, help="seconds per quota window")
+    args = parser.parse_args()
+
+    server, base_url, _ = start_stub_server(
+        args.limit, args.window, port=args.port, world=SyntheticWorld(args.scale)
+    )
+    print(f"Stub football-data API listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,319 @@
+"""
+Deterministic synthetic football-data.org payloads for benchmarks.
+
+`SyntheticWorld(scale)` models `5 * scale` leagues of 20 teams with
+25-30 player squads (scale 1 is our real volume) and renders the three
+resources we fetch, in the API's shapes:
+
+- `competition(code)`: `/competitions/{code}`
+- `standings(code)`: `/competitions/{code}/standings` (the TOTAL table)
+- `team(team_id)`: `/teams/{id}` with squad, coach and venue
+- `matches(code)`: `/competitions/{code}/matches`, a double round robin
+  played up to the current matchday
+
+`write_dataset(folder)` lays them out the way the fetch scripts do
+(historical_winners/, current_league_teams/, team_data/team_data.ndjson).
+
+    python db/benchmarks/synthetic.py --scale 10 --out /tmp/dashdribble-x10
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+
+from team_data_stream import write_teams  # noqa: E402
+
+REAL_LEAGUES = [("PL", "England"), ("PD", "Spain"), ("SA", "Italy"), ("BL1", "Germany"), ("FL1", "France")]
+TEAMS_PER_LEAGUE = 20
+POSITIONS = ["Goalkeeper", "Defence", "Midfield", "Offence"]
+DETAILED_POSITIONS = ["Centre-Back", "Left-Back", "Right-Back", "Defensive Midfield",
+                      "Central Midfield", "Attacking Midfield", "Left Winger", "Right Winger",
+                      "Centre-Forward"]
+NATIONALITIES = ["England", "Spain", "Italy", "Germany", "France", "Brazil", "Argentina",
+                 "Portugal", "Netherlands", "Belgium", "Croatia", "Norway", "Senegal", "Japan"]
+FIRST_NAMES = ["Kylian", "Lionel", "Erling", "Jude", "Vinícius", "Luka", "Antoine", "Pedri",
+               "Rúben", "Søren", "Martin", "Bukayo", "Federico", "Joshua", "Théo", "Khvicha"]
+SYLLABLES = ["ba", "co", "de", "fé", "ga", "hi", "jo", "ka", "lu", "mé", "no", "pa", "ri",
+             "sá", "to", "vi", "za", "ño"]
+SEASON_START = date(2024, 8, 16)
+
+
+class SyntheticWorld:
+    def __init__(self, scale=1, seed=7, matchday=19):
+        self.scale = scale
+        self.seed = seed
+        self.matchday = matchday
+        self.leagues = []
+        for index in range(len(REAL_LEAGUES) * scale):
+            code, country = REAL_LEAGUES[index % len(REAL_LEAGUES)]
+            if index >= len(REAL_LEAGUES):
+                code = f"{code}{index // len(REAL_LEAGUES)}"
+            self.leagues.append((code, country, 2000 + index))
+        self._by_code = {code: (country, league_id) for code, country, league_id in self.leagues}
+        self._league_ids = {league_id for _, _, league_id in self.leagues}
+
+    def _rng(self, *key):
+        return random.Random(f"{self.seed}:" + ":".join(map(str, key)))
+
+    def league_codes(self):
+        return [code for code, _, _ in self.leagues]
+
+    def team_ids(self, code):
+        league_id = self._by_code[code][1]
+        return [league_id * 100 + i for i in range(TEAMS_PER_LEAGUE)]
+
+    def all_team_ids(self):
+        return [team_id for code in self.league_codes() for team_id in self.team_ids(code)]
+
+    def _name(self, rng):
+        surname = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+        return f"{rng.choice(FIRST_NAMES)} {surname}"
+
+    def _team_name(self, team_id):
+        rng = self._rng("team-name", team_id)
+        return "".join(rng.choice(SYLLABLES) for _ in range(3)).title() + " FC"
+
+    def _area(self, code):
+        country = self._by_code[code][0]
+        return {
+            "id": 2070 + [c for _, c in REAL_LEAGUES].index(country),
+            "name": country,
+            "code": country[:3].upper(),
+            "flag": f"https://crests.football-data.org/{country[:3].lower()}.svg",
+        }
+
+    def _season(self, code):
+        league_id = self._by_code[code][1]
+        return {
+            "id": league_id * 10 + 1,
+            "startDate": SEASON_START.isoformat(),
+            "endDate": (SEASON_START + timedelta(days=280)).isoformat(),
+            "currentMatchday": self.matchday,
+            "winner": None,
+        }
+
+    def competition(self, code):
+        """`/competitions/{code}`"""
+        _, league_id = self._by_code[code]
+        current = self._season(code)
+        past = [
+            {
+                "id": current["id"] - year,
+                "startDate": SEASON_START.replace(year=SEASON_START.year - year).isoformat(),
+                "endDate": (SEASON_START.replace(year=SEASON_START.year - year) + timedelta(days=280)).isoformat(),
+                "currentMatchday": 38,
+                "winner": self._team_ref(self.team_ids(code)[year % TEAMS_PER_LEAGUE]),
+            }
+            for year in range(1, 11)
+        ]
+        return {
+            "area": self._area(code),
+            "id": league_id,
+            "name": f"League {code}",
+            "code": code,
+            "type": "LEAGUE",
+            "emblem": f"https://crests.football-data.org/{code}.png",
+            "currentSeason": current,
+            "seasons": [current, *past],
+            "lastUpdated": "2025-01-01T00:00:00Z",
+        }
+
+    def _team_ref(self, team_id):
+        name = self._team_name(team_id)
+        return {
+            "id": team_id,
+            "name": name,
+            "shortName": name.replace(" FC", ""),
+            "tla": name[:3].upper(),
+            "crest": f"https://crests.football-data.org/{team_id}.png",
+        }
+
+    def _table(self, code):
+        rng = self._rng("table", code)
+        games = self.matchday
+        rows = []
+        for team_id in self.team_ids(code):
+            strength = self._rng("strength", team_id).random()
+            won = sum(rng.random() < 0.25 + 0.35 * strength for _ in range(games))
+            draw = sum(rng.random() < 0.25 for _ in range(games - won))
+            lost = games - won - draw
+            goals_for = won * 2 + draw + rng.randint(0, games)
+            goals_against = lost * 2 + draw + rng.randint(0, games)
+            rows.append({
+                "team": self._team_ref(team_id),
+                "playedGames": games,
+                "form": None,
+                "won": won,
+                "draw": draw,
+                "lost": lost,
+                "points": 3 * won + draw,
+                "goalsFor": goals_for,
+                "goalsAgainst": goals_against,
+                "goalDifference": goals_for - goals_against,
+            })
+        rows.sort(key=lambda row: (-row["points"], -row["goalDifference"], -row["goalsFor"]))
+        return [{"position": i + 1, **row} for i, row in enumerate(rows)]
+
+    def standings(self, code):
+        """`/competitions/{code}/standings`"""
+        _, league_id = self._by_code[code]
+        return {
+            "filters": {"season": str(SEASON_START.year)},
+            "area": self._area(code),
+            "competition": {
+                "id": league_id,
+                "name": f"League {code}",
+                "code": code,
+                "type": "LEAGUE",
+                "emblem": f"https://crests.football-data.org/{code}.png",
+            },
+            "season": self._season(code),
+            "standings": [
+                {"stage": "REGULAR_SEASON", "type": "TOTAL", "group": None, "table": self._table(code)}
+            ],
+        }
+
+    def _fixtures(self, code):
+        """[(matchday, home_id, away_id)] of a double round robin (circle method)."""
+        teams = self.team_ids(code)
+        rounds = []
+        for index in range(len(teams) - 1):
+            rotation = teams[:1] + teams[1:][-index:] + teams[1:][:-index] if index else teams
+            half = len(rotation) // 2
+            pairs = list(zip(rotation[:half], reversed(rotation[half:])))
+            rounds.append([(a, b) if index % 2 else (b, a) for a, b in pairs])
+        rounds += [[(away, home) for home, away in pairs] for pairs in rounds]
+        return [(day, home, away) for day, pairs in enumerate(rounds, 1) for home, away in pairs]
+
+    def matches(self, code):
+        """`/competitions/{code}/matches`"""
+        _, league_id = self._by_code[code]
+        season = self._season(code)
+        matches = []
+        for number, (day, home, away) in enumerate(self._fixtures(code)):
+            played = day <= self.matchday
+            rng = self._rng("match", code, day, home)
+            home_goals = away_goals = winner = None
+            if played:
+                home_goals, away_goals = rng.choice((0, 0, 1, 1, 1, 2, 2, 3)), rng.choice((0, 0, 1, 1, 2, 3))
+                winner = "HOME_TEAM" if home_goals > away_goals else "AWAY_TEAM" if away_goals > home_goals else "DRAW"
+            matches.append({
+                "area": self._area(code),
+                "competition": {"id": league_id, "name": f"League {code}", "code": code, "type": "LEAGUE"},
+                "season": season,
+                "id": league_id * 1000 + number,
+                "utcDate": f"{SEASON_START + timedelta(weeks=day - 1)}T15:00:00Z",
+                "status": "FINISHED" if played else "TIMED",
+                "matchday": day,
+                "stage": "REGULAR_SEASON",
+                "group": None,
+                "lastUpdated": "2025-01-01T00:00:00Z",
+                "homeTeam": self._team_ref(home),
+                "awayTeam": self._team_ref(away),
+                "score": {
+                    "winner": winner,
+                    "duration": "REGULAR",
+                    "fullTime": {"home": home_goals, "away": away_goals},
+                },
+            })
+        return {
+            "filters": {"season": str(SEASON_START.year)},
+            "resultSet": {"count": len(matches), "played": sum(m["status"] == "FINISHED" for m in matches)},
+            "competition": {"id": league_id, "name": f"League {code}", "code": code, "type": "LEAGUE"},
+            "matches": matches,
+        }
+
+    def team(self, team_id):
+        """`/teams/{id}`"""
+        rng = self._rng("team", team_id)
+        squad = []
+        for i in range(rng.randint(25, 30)):
+            detailed = rng.random() < 0.3
+            squad.append({
+                "id": team_id * 100 + i,
+                "name": self._name(rng),
+                "position": rng.choice(DETAILED_POSITIONS if detailed else POSITIONS),
+                "dateOfBirth": (date(1990, 1, 1) + timedelta(days=rng.randint(0, 365 * 17))).isoformat(),
+                "nationality": rng.choice(NATIONALITIES),
+            })
+        coach_first, coach_last = self._name(rng).split(" ", 1)
+        return {
+            "area": {"id": 2072, "name": "England", "code": "ENG", "flag": None},
+            **self._team_ref(team_id),
+            "address": f"{team_id} Stadium Road",
+            "website": f"https://club{team_id}.example",
+            "founded": rng.randint(1870, 1990),
+            "clubColors": "Red / White",
+            "venue": f"{self._team_name(team_id).replace(' FC', '')} Arena",
+            "runningCompetitions": [],
+            "coach": {
+                "id": 500000 + team_id,
+                "firstName": coach_first,
+                "lastName": coach_last,
+                "name": f"{coach_first} {coach_last}",
+                "dateOfBirth": (date(1960, 1, 1) + timedelta(days=rng.randint(0, 365 * 20))).isoformat(),
+                "nationality": rng.choice(NATIONALITIES),
+                "contract": {"start": "2023-07", "until": "2026-06"},
+            },
+            "squad": squad,
+            "staff": [],
+            "lastUpdated": "2025-01-01T00:00:00Z",
+        }
+
+    def teams(self):
+        """(team_id, /teams/{id} payload) for every team, in league order."""
+        return ((team_id, self.team(team_id)) for team_id in self.all_team_ids())
+
+    def resource(self, path):
+        """The payload served for an API path, or None (accepts competition/ and competitions/)."""
+        parts = path.strip("/").split("?")[0].split("/")
+        if parts[0] in ("competition", "competitions") and len(parts) in (2, 3):
+            if parts[1] not in self._by_code:
+                return None
+            if len(parts) == 2:
+                return self.competition(parts[1])
+            if parts[2] == "standings":
+                return self.standings(parts[1])
+            if parts[2] == "matches":
+                return self.matches(parts[1])
+        if parts[0] == "teams" and len(parts) == 2 and parts[1].isdigit():
+            team_id = int(parts[1])
+            if team_id // 100 in self._league_ids and team_id % 100 < TEAMS_PER_LEAGUE:
+                return self.team(team_id)
+        return None
+
+    def write_dataset(self, folder):
+        """Write every payload in the fetch scripts' layout. Returns the three folders."""
+        leagues = os.path.join(folder, "historical_winners")
+        standings = os.path.join(folder, "current_league_teams")
+        team_data = os.path.join(folder, "team_data")
+        for path in (leagues, standings, team_data):
+            os.makedirs(path, exist_ok=True)
+        for code in self.league_codes():
+            with open(os.path.join(leagues, f"{code}.json"), "w") as f:
+                json.dump(self.competition(code), f)
+            with open(os.path.join(standings, f"{code}.json"), "w") as f:
+                json.dump(self.standings(code), f)
+        write_teams(os.path.join(team_data, "team_data.ndjson"), self.teams())
+        return leagues, standings, team_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic football-data dataset.")
+    parser.add_argument("--scale", type=int, default=1, help="1 = 5 leagues, 10 = 50, 100 = 500")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    world = SyntheticWorld(args.scale, args.seed)
+    world.write_dataset(args.out)
+    print(f"Wrote {len(world.leagues)} leagues and {len(world.all_team_ids())} teams to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
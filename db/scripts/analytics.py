@@ -0,0 +1,303 @@
+"""
+Vectorised analytics over standings, squads and standings history.
+
+The tables are read once into pandas frames; every metric below works on
+whole columns (NumPy arrays) rather than per-row dicts:
+
+- `standings_metrics`: points/goals per game and win/draw rates;
+- `squad_ages`: age of every player and per-team age profile;
+- `elo_ratings`: Elo-style ratings replayed from `standings_history`
+  (one rating step per matchday against the league average), falling back
+  to the current standings for teams without history;
+- `expected_table`: Monte Carlo season simulation of the remaining games
+  of every league, optionally spread over a process pool.
+
+Fixtures are not stored, so the simulation plays each team's remaining
+games against a league-average opponent with win/draw/loss probabilities
+derived from the team's strength.
+
+Usage:
+    python db/scripts/analytics.py [--simulations N] [--workers N] [--strength ppg|elo]
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import dotenv
+import numpy as np
+import pandas as pd
+
+dotenv.load_dotenv()
+
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
+
+DEFAULT_SIMULATIONS = 10_000
+BASE_RATING = 1500.0
+ELO_K = 20.0
+# Ratings carried into a new season are pulled this far back to the mean
+SEASON_CARRY = 0.75
+# Pseudo-games at the league average added to every team's record
+PRIOR_GAMES = 3
+
+STANDINGS_SQL = """
+SELECT s.league_id, l.code AS league_code, s.team_id, t.name AS team_name, s.position,
+       s.played_games, s.won, s.draw, s.lost, s.points, s.goals_for, s.goals_against,
+       s.goal_difference
+FROM current_standings s
+LEFT JOIN leagues l ON l.id = s.league_id
+LEFT JOIN league_teams t ON t.id = s.team_id
+ORDER BY s.league_id, s.position
+"""
+
+PLAYERS_SQL = """
+SELECT id, team_id, position, date_of_birth, nationality
+FROM players
+"""
+
+HISTORY_SQL = """
+SELECT league_id, season_id, team_id, matchday, played_games, won, draw, points
+FROM standings_history
+ORDER BY league_id, season_id, matchday
+"""
+
+
+@dataclass
+class Frames:
+    standings: pd.DataFrame
+    players: pd.DataFrame
+    history: pd.DataFrame
+
+
+def load_frames(connection):
+    """Read standings, players and standings history into columnar frames."""
+    return Frames(
+        standings=pd.read_sql_query(STANDINGS_SQL, connection),
+        players=pd.read_sql_query(PLAYERS_SQL, connection),
+        history=pd.read_sql_query(HISTORY_SQL, connection),
+    )
+
+
+def standings_metrics(standings):
+    """Per-game rates for every team, as new columns."""
+    played = standings["played_games"].to_numpy(dtype=float)
+    games = np.where(played > 0, played, np.nan)
+    return standings.assign(
+        points_per_game=standings["points"].to_numpy() / games,
+        goals_for_per_game=standings["goals_for"].to_numpy() / games,
+        goals_against_per_game=standings["goals_against"].to_numpy() / games,
+        win_rate=standings["won"].to_numpy() / games,
+        draw_rate=standings["draw"].to_numpy() / games,
+    )
+
+
+def squad_ages(players, as_of=None):
+    """
+    Add an `age` column to `players` and return (players, per-team profile)
+    with mean, median, youngest and oldest age.
+    """
+    as_of = pd.Timestamp(as_of or pd.Timestamp.today().normalize())
+    born = pd.to_datetime(players["date_of_birth"], errors="coerce")
+    players = players.assign(age=(as_of - born).dt.days / 365.25)
+    profile = players.groupby("team_id")["age"].agg(["mean", "median", "min", "max"])
+    return players, profile
+
+
+def expected_score(ratings, opponent_rating):
+    """Elo expected score (win = 1, draw = 0.5) against `opponent_rating`."""
+    return 1.0 / (1.0 + 10.0 ** ((opponent_rating - ratings) / 400.0))
+
+
+def _elo_step(ratings, games, points, k=ELO_K):
+    """
+    One vectorised rating update: every team with `games` new games scores
+    points / (3 * games) against the average rating of those teams.
+    """
+    active = games > 0
+    if not active.any():
+        return ratings
+    score = np.divide(points, 3.0 * games, out=np.zeros_like(ratings), where=active)
+    expected = expected_score(ratings, ratings[active].mean())
+    return np.where(active, ratings + k * games * (score - expected), ratings)
+
+
+def elo_ratings(history, standings=None, k=ELO_K):
+    """
+    Replay `standings_history` matchday by matchday into Elo-style ratings.
+
+    Returns:
+        pd.Series: Rating by team_id. Teams only present in `standings`
+        are rated from their current record in a single step.
+    """
+    ratings = {}
+    for (league_id, season_id), season in history.groupby(["league_id", "season_id"], sort=True):
+        # History rows are stored only on change; forward-fill to one row per matchday
+        points = season.pivot_table(index="matchday", columns="team_id", values="points").ffill().fillna(0)
+        played = season.pivot_table(index="matchday", columns="team_id", values="played_games").ffill().fillna(0)
+        gained = points.diff().fillna(points).to_numpy()
+        games = played.diff().fillna(played).to_numpy()
+
+        teams = points.columns.to_numpy()
+        current = np.array(
+            [BASE_RATING + SEASON_CARRY * (ratings.get(team, BASE_RATING) - BASE_RATING) for team in teams]
+        )
+        for step in range(len(points)):
+            current = _elo_step(current, games[step], gained[step], k)
+        ratings.update(zip(teams, current))
+
+    if standings is not None:
+        missing = standings[~standings["team_id"].isin(ratings.keys())]
+        for _, league in missing.groupby("league_id"):
+            current = np.full(len(league), BASE_RATING)
+            current = _elo_step(
+                current,
+                league["played_games"].to_numpy(dtype=float),
+                league["points"].to_numpy(dtype=float),
+                k / max(1.0, league["played_games"].mean() ** 0.5),
+            )
+            ratings.update(zip(league["team_id"], current))
+
+    return pd.Series(ratings, name="rating", dtype=float).rename_axis("team_id")
+
+
+def outcome_probabilities(expected, draw_rate):
+    """
+    Win/draw/loss probabilities against an average opponent from an
+    expected score per team, shape (teams, 3).
+    """
+    win = np.clip(expected - draw_rate / 2.0, 0.01, 0.98 - draw_rate)
+    loss = np.clip(1.0 - draw_rate - win, 0.01, None)
+    probabilities = np.stack([win, np.full_like(win, draw_rate), loss], axis=1)
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+def league_expectations(league, strength="ppg", ratings=None):
+    """Expected score per team of one league's standings frame."""
+    played = league["played_games"].to_numpy(dtype=float)
+    if strength == "elo" and ratings is not None:
+        team_ratings = ratings.reindex(league["team_id"]).fillna(BASE_RATING).to_numpy()
+        return expected_score(team_ratings, team_ratings.mean())
+
+    # Points per game shrunk towards the league average
+    points = league["points"].to_numpy(dtype=float)
+    average = points.sum() / max(played.sum(), 1.0)
+    ppg = (points + PRIOR_GAMES * average) / (played + PRIOR_GAMES)
+    draw_rate = league_draw_rate(league)
+    return (ppg - draw_rate) / 3.0 + draw_rate / 2.0
+
+
+def league_draw_rate(league):
+    played = league["played_games"].sum()
+    return float(np.clip(league["draw"].sum() / played, 0.15, 0.35)) if played else 0.26
+
+
+def simulate_league(points, goal_difference, remaining, probabilities, simulations, rng):
+    """
+    Simulate the remaining games of one league `simulations` times.
+
+    Args:
+        points, goal_difference, remaining: Arrays of shape (teams,).
+        probabilities: Win/draw/loss probabilities, shape (teams, 3).
+
+    Returns:
+        tuple: (final points, final positions), each of shape (simulations, teams).
+    """
+    teams = len(points)
+    results = rng.multinomial(
+        np.broadcast_to(remaining, (simulations, teams)),
+        np.broadcast_to(probabilities, (simulations, teams, 3)),
+    )
+    final_points = points + 3 * results[..., 0] + results[..., 1]
+    # Points, then the current goal difference, then a coin toss
+    key = final_points * 10_000.0 + goal_difference + rng.random((simulations, teams))
+    order = np.argsort(-key, axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(1, teams + 1), axis=1)
+    return final_points, positions
+
+
+def league_arrays(league, strength="ppg", ratings=None):
+    """
+    (points, goal difference, remaining games, outcome probabilities) of
+    one league's standings frame; the inputs of `simulate_league`.
+    """
+    teams = len(league)
+    season_games = 2 * (teams - 1)
+    played = league["played_games"].to_numpy()
+    remaining = np.clip(season_games - played, 0, None)
+    draw_rate = league_draw_rate(league)
+    probabilities = outcome_probabilities(league_expectations(league, strength, ratings), draw_rate)
+    return (
+        league["points"].to_numpy(),
+        league["goal_difference"].to_numpy(),
+        remaining,
+        probabilities,
+    )
+
+
+def _expected_league_table(league, simulations, seed, strength, ratings):
+    """Worker: simulate one league and summarise it per team."""
+    rng = np.random.default_rng(seed)
+    points, goal_difference, remaining, probabilities = league_arrays(league, strength, ratings)
+    final_points, positions = simulate_league(
+        points, goal_difference, remaining, probabilities, simulations, rng
+    )
+    return league[["league_id", "team_id", "team_name", "position", "points"]].assign(
+        expected_points=final_points.mean(axis=0),
+        expected_position=positions.mean(axis=0),
+    )
+
+
+def expected_table(standings, simulations=DEFAULT_SIMULATIONS, seed=0, workers=1,
+                   strength="ppg", ratings=None):
+    """
+    Expected final points and position of every team in every league.
+
+    Each league gets its own seed spawned from `seed`, so results do not
+    depend on `workers`.
+    """
+    leagues = [league for _, league in standings.groupby("league_id", sort=True)]
+    seeds = np.random.SeedSequence(seed).spawn(len(leagues))
+    tasks = [(league, simulations, s, strength, ratings) for league, s in zip(leagues, seeds)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            tables = list(executor.map(_expected_league_table, *zip(*tasks)))
+    else:
+        tables = [_expected_league_table(*task) for task in tasks]
+    if not tables:
+        return standings.iloc[0:0]
+    return pd.concat(tables, ignore_index=True).sort_values(["league_id", "expected_position"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Standings analytics and expected final tables.")
+    parser.add_argument("--simulations", type=int, default=DEFAULT_SIMULATIONS)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--strength", choices=("ppg", "elo"), default="ppg")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(DB_FILE)
+    try:
+        frames = load_frames(connection)
+    finally:
+        connection.close()
+
+    ratings = elo_ratings(frames.history, frames.standings)
+    start = time.perf_counter()
+    table = expected_table(
+        frames.standings, args.simulations, args.seed, args.workers, args.strength, ratings
+    )
+    elapsed = time.perf_counter() - start
+
+    table = table.join(ratings, on="team_id")
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(table.round(2).to_string(index=False))
+    print(f"{args.simulations} simulated seasons of {table['league_id'].nunique()} leagues in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
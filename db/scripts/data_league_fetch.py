@@ -1,12 +1,9 @@
-import requests
 import json
 import dotenv
-import os
 
-dotenv.load_dotenv()
+from fetch_client import create_client
 
-API_URL = os.getenv("FOOTBALL_DATA_ORG_URL")
-API_TOKEN = os.getenv("FOOTBALL_DATA_ORG_TOKEN")
+dotenv.load_dotenv()
 
 competitions = [  # "PL",
     "PD",
@@ -15,10 +12,21 @@ competitions = [  # "PL",
     "FL1",
 ]
 
-for competition in competitions:
-    response = requests.get(
-        f"{API_URL}/competition/{competition}", headers={"X-Auth-Token": API_TOKEN}
-    )
-    data = response.json()
-    with open(f"data/historical_winners/{competition}.json", "w") as f:
-        json.dump(data, f)
+
+def fetch_leagues(client):
+    for competition in competitions:
+        data = client.get_json(f"competition/{competition}")
+        if data is None:
+            continue
+        with open(f"data/historical_winners/{competition}.json", "w") as f:
+            json.dump(data, f)
+
+
+def main():
+    with create_client() as client:
+        fetch_leagues(client)
+        client.report_cache()
+
+
+if __name__ == "__main__":
+    main()
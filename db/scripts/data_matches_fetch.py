@@ -0,0 +1,39 @@
+import argparse
+import json
+import os
+
+import dotenv
+
+from data_league_teams_fetch import competitions
+from fetch_client import create_client
+
+dotenv.load_dotenv()
+
+DATA_FOLDER = os.getenv("MATCHES_DATA_FOLDER", "data/matches")
+
+
+def fetch_matches(client, season=None):
+    """Every competition's fixtures and results, the current season unless `season` (start year) is given."""
+    os.makedirs(DATA_FOLDER, exist_ok=True)
+    query = f"?season={season}" if season is not None else ""
+    suffix = f"-{season}" if season is not None else ""
+    for competition in competitions:
+        data = client.get_json(f"competition/{competition}/matches{query}")
+        if data is None:
+            continue
+        with open(f"{DATA_FOLDER}/{competition}{suffix}.json", "w") as f:
+            json.dump(data, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch fixtures and results.")
+    parser.add_argument("--season", type=int, default=None, help="season start year (default: current)")
+    args = parser.parse_args()
+
+    with create_client() as client:
+        fetch_matches(client, args.season)
+        client.report_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,11 @@
-import requests
 import json
 import dotenv
-import os
-import time
 
-dotenv.load_dotenv()
+import metrics
+from fetch_client import create_client, fetch_many, iter_fetch
+from team_data_stream import write_teams
 
-API_URL = os.getenv("FOOTBALL_DATA_ORG_URL")
-API_TOKEN = os.getenv("FOOTBALL_DATA_ORG_TOKEN")
+dotenv.load_dotenv()
 
 competitions = [
     "PL",
@@ -40,61 +38,89 @@ def get_team_ids():
     
     return all_teams
     
-def get_players_by_team_id(team_id):
-    url = f"{API_URL}/teams/{team_id}"
-    headers = {
-        "X-Auth-Token": API_TOKEN
-    }
-    
-    try:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Failed to fetch players for team {team_id}: {response.status_code}")
-            return None
-        
-    except requests.RequestException as e:
-        print(f"Request error for team {team_id}: {e}")
-        return None
+def get_players_by_team_id(client, team_id):
+    data = client.get_json(f"teams/{team_id}")
+    if data is None:
+        print(f"Failed to fetch players for team {team_id}")
+    return data
 
-def fetch_all_players(team_ids):
+def fetch_all_players(client, team_ids, max_workers=None):
     """
-    Fetches player data for all teams with a request rate limit of 9 requests/minute.
+    Fetches player data for all teams concurrently. All workers share the
+    client's pooled session and token bucket, which is paced to the API
+    quota and kept in step with the quota headers the API returns.
 
     Args:
+        client (FootballDataClient): Shared API client.
         team_ids (list): List of team IDs.
+        max_workers (int): Concurrent requests in flight, defaults to the quota.
 
     Returns:
         dict: Dictionary of team IDs and their player data.
     """
-    player_data = {}
-    requests_per_minute = 9
-    delay_between_requests = 60 / requests_per_minute
+    total = len(team_ids)
+    done = 0
+
+    def report(team_id, data):
+        nonlocal done
+        done += 1
+        status = "ok" if data else "failed"
+        metrics.inc("teams_fetched_total", status=status)
+        print(f"Fetched players for team {team_id} ({done}/{total}) {status}")
+
+    with metrics.span("fetch_all_players"):
+        fetched = fetch_many(
+            team_ids,
+            lambda team_id: get_players_by_team_id(client, team_id),
+            max_workers=max_workers or client.requests_per_minute,
+            on_result=report,
+        )
+
+    # Keep the output in the same order as the standings files
+    return {team_id: fetched[team_id] for team_id in team_ids if team_id in fetched}
 
-    for i, team_id in enumerate(team_ids):
-        print(f"Fetching players for team {team_id} ({i+1}/{len(team_ids)})...")
-        data = get_players_by_team_id(team_id)
+def stream_all_players(client, team_ids, max_workers=None):
+    """
+    Like fetch_all_players, but yields (team_id, data) pairs as each team
+    arrives so they can be written out without holding every squad.
+    """
+    total = len(team_ids)
+    for done, (team_id, data) in enumerate(
+        iter_fetch(
+            team_ids,
+            lambda team_id: get_players_by_team_id(client, team_id),
+            max_workers=max_workers or client.requests_per_minute,
+        ),
+        start=1,
+    ):
+        status = "ok" if data else "failed"
+        metrics.inc("teams_fetched_total", status=status)
+        print(f"Fetched players for team {team_id} ({done}/{total}) {status}")
         if data:
-            player_data[team_id] = data
-        
-        # Enforce rate limiting
-        if (i + 1) % requests_per_minute == 0:
-            print("Rate limit reached. Waiting for 1 minute...")
-            time.sleep(60)
-        else:
-            time.sleep(delay_between_requests)
+            yield team_id, data
 
-    return player_data
+def fetch_team_data(client):
+    all_teams = get_team_ids()
 
-all_teams = get_team_ids()
+    all_team_ids = []
 
-all_team_ids = []
+    for competition in all_teams:
+        all_team_ids.extend(all_teams[competition])
 
-for competition in all_teams:
-    all_team_ids.extend(all_teams[competition])
-    
-player_data = fetch_all_players(all_team_ids)
+    # One team per line, written as each team arrives
+    with metrics.span("fetch_team_data"):
+        written = write_teams(
+            "data/team_data/team_data.ndjson",
+            stream_all_players(client, all_team_ids),
+        )
+    print(f"Wrote {written} teams to data/team_data/team_data.ndjson")
+
+
+def main():
+    with create_client() as client:
+        fetch_team_data(client)
+        client.report_cache()
+    metrics.export()
 
-with open("data/team_data/team_data.json", "w") as f:
-    json.dump(player_data, f, indent=4)
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
+import argparse
 import sqlite3
-import json
+import sys
 import dotenv
 import os
 
+import metrics
+from migrations import migrate
+from parallel_ingest import JSON_SUFFIXES, StageTimings, json_files, map_files
+from records import INSERT_SQL, RecordError, Standing, Team, get_json_data, parse_standings
+from search_index import reindex_teams
+from standings_history import record_snapshot, snapshot_key
+from summaries import refresh_league_summaries
+
 # Load environment variables
 dotenv.load_dotenv()
 
@@ -14,152 +23,201 @@ DATA_FOLDER = os.getenv("LEAGUE_TEAMS_DATA_FOLDER")
 # Create the schema for the league_teams table
 def create_league_teams_schema(cursor):
     try:
-        # Create the static table: teams
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS league_teams (
-            id INTEGER PRIMARY KEY,
-            league_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            short_name TEXT,
-            tla TEXT,
-            crest TEXT,
-            FOREIGN KEY (league_id) REFERENCES leagues (id)
-        );
-        """)
-
-        # Create the dynamic table: league_teams
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS current_standings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            league_id INTEGER NOT NULL,
-            team_id INTEGER NOT NULL,
-            position INTEGER,
-            played_games INTEGER,
-            won INTEGER,
-            draw INTEGER,
-            lost INTEGER,
-            points INTEGER,
-            goals_for INTEGER,
-            goals_against INTEGER,
-            goal_difference INTEGER,
-            FOREIGN KEY (league_id) REFERENCES leagues (id),
-            FOREIGN KEY (team_id) REFERENCES league_teams (id)
-        );
-        """)
-
-        # Commit the changes and close the connection
-        cursor.connection.commit()
+        # The migration runner owns the schema, including indexes and natural keys
+        migrate(cursor.connection)
         print(
             "Tables 'league_teams' and 'current_standings' created successfully/already exists."
         )
 
     except sqlite3.Error as e:
         print(f"An error occurred while creating tables: {e}")
-
-
-# Utility function to get JSON data (for example)
-def get_json_data(file_path):
-    try:
-        with open(file_path, "r") as file:
-            return json.load(file)
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from {file_path}: {e}")
-        return None
-    except FileNotFoundError:
-        print(f"File not found: {file_path}")
-        return None
-    except Exception as e:
-        print(f"Error reading file {file_path}: {e}")
-        return None
+        raise
 
 
 # Step 1: Parse JSON Data
 def parse_json_data(json_data):
-    """Parse JSON data to extract league and team details."""
-    league_id = json_data["competition"]["id"]
-
-    static_teams = []  # For static table: league_teams
-    dynamic_standings = []  # For dynamic table: current_standings
-
-    for standing in json_data["standings"]:
-        for entry in standing["table"]:
-            # Static data for league_teams
-            static_team_data = {
-                "league_id": league_id,
-                "id": entry["team"]["id"],
-                "name": entry["team"]["name"],
-                "short_name": entry["team"].get("shortName", ""),
-                "tla": entry["team"].get("tla", ""),
-                "crest": entry["team"].get("crest", ""),
-            }
-            static_teams.append(static_team_data)
-
-            # Dynamic data for current_standings
-            dynamic_data = {
-                "league_id": league_id,
-                "team_id": entry["team"]["id"],
-                "position": entry["position"],
-                "played_games": entry["playedGames"],
-                "won": entry["won"],
-                "draw": entry["draw"],
-                "lost": entry["lost"],
-                "points": entry["points"],
-                "goals_for": entry["goalsFor"],
-                "goals_against": entry["goalsAgainst"],
-                "goal_difference": entry["goalDifference"],
-            }
-            dynamic_standings.append(dynamic_data)
-
-    return static_teams, dynamic_standings
+    """
+    Parse JSON data to extract league and team details.
+
+    Returns:
+        tuple: (Team records for league_teams, Standing records for current_standings),
+        or None when the payload is malformed
+    """
+    if json_data is None:
+        return None
+    try:
+        return parse_standings(json_data)
+    except RecordError as e:
+        print(f"Error parsing JSON data: {e}")
+        return None
 
 
 # Step 2: Insert Team Data for league_teams (static table)
-def insert_team(cursor, table_name, data):
-    """Insert a single record into the given table."""
+def insert_team(cursor, record):
+    """Insert a single Team or Standing record into its table."""
     try:
-        columns = ", ".join(data.keys())
-        placeholders = ", ".join(["?" for _ in data.keys()])
-        sql = f"INSERT OR IGNORE INTO {table_name} ({columns}) VALUES ({placeholders})"
-        cursor.execute(sql, tuple(data.values()))
+        cursor.execute(INSERT_SQL[type(record)], record)
 
     except sqlite3.Error as e:
         print(f"Database Error inserting team: {e}")
+        raise
     except Exception as e:
-        print(f"Error inserting into {table_name}: {e}")
+        print(f"Error inserting {type(record).__name__}: {e}")
+        raise
 
 
 # Step 3: Insert All Teams into league_teams and current_standings
 def insert_teams(cursor, data_folder):
     """Insert team data into static (league_teams) and dynamic (current_standings) tables."""
+    rows_parsed, parse_seconds = 0, 0.0
     try:
-        for filename in os.listdir(data_folder):
-            if filename.endswith(".json"):
-                # Step 1: Load and parse JSON data
-                json_data = get_json_data(f"{data_folder}/{filename}")
-                static_teams, dynamic_standings = parse_json_data(json_data)
-
-                # Step 2: Insert into league_teams (static data)
-                for team in static_teams:
-                    insert_team(cursor, "league_teams", team)
-
-                # Step 3: Insert into current_standings (dynamic data)
-                for standing in dynamic_standings:
-                    insert_team(cursor, "current_standings", standing)
-
-                print(f"Inserted teams and standings for {filename}")
-
-        # Commit changes after processing all files
-        cursor.connection.commit()
+        with metrics.span("insert_teams"):
+            for filename in os.listdir(data_folder):
+                if filename.endswith(JSON_SUFFIXES):
+                    # Step 1: Load and parse JSON data
+                    with metrics.span("parse") as parse:
+                        json_data = get_json_data(f"{data_folder}/{filename}")
+                        parsed = parse_json_data(json_data)
+                    parse_seconds += parse.seconds
+                    # Malformed files are reported and skipped, as in the parallel loader
+                    if parsed is None:
+                        continue
+                    static_teams, dynamic_standings = parsed
+                    rows_parsed += len(static_teams) + len(dynamic_standings)
+                    metrics.inc("rows_parsed_total", len(static_teams), table="league_teams")
+                    metrics.inc("rows_parsed_total", len(dynamic_standings), table="current_standings")
+
+                    with metrics.span("insert"):
+                        # Step 2: Insert into league_teams (static data)
+                        for team in static_teams:
+                            insert_team(cursor, team)
+
+                        # Step 3: Insert into current_standings (dynamic data)
+                        for standing in dynamic_standings:
+                            insert_team(cursor, standing)
+                    metrics.inc("sqlite_statements_total", len(static_teams), table="league_teams")
+                    metrics.inc("sqlite_statements_total", len(dynamic_standings), table="current_standings")
+
+                    # Step 4: Make the teams searchable and refresh the league summaries
+                    with metrics.span("derived"):
+                        reindex_teams(cursor, (team.id for team in static_teams))
+                        refresh_league_summaries(cursor, {row.league_id for row in dynamic_standings})
+
+                    # Step 5: Keep the matchday snapshot in the standings history
+                    key = snapshot_key(json_data)
+                    if key is not None:
+                        with metrics.span("history"):
+                            record_snapshot(cursor, key, dynamic_standings)
+
+                    print(f"Inserted teams and standings for {filename}")
+
+            # Commit changes after processing all files
+            with metrics.span("commit") as commit:
+                cursor.connection.commit()
+            metrics.observe("sqlite_commit_seconds", commit.seconds, loader="insert_teams")
+        if parse_seconds:
+            metrics.set_gauge("rows_parsed_per_second", rows_parsed / parse_seconds, loader="insert_teams")
         print("Teams and standings inserted successfully.")
 
+    # Nothing is committed on failure; re-raise so the caller sees it
     except sqlite3.Error as e:
         print(f"Database Error inserting teams and standings: {e}")
+        raise
 
     except Exception as e:
         print(f"Error inserting teams and standings: {e}")
+        raise
+
+
+INSERT_LEAGUE_TEAM_SQL = INSERT_SQL[Team]
+INSERT_STANDING_SQL = INSERT_SQL[Standing]
+
+
+def parse_standings_file(file_path):
+    """
+    Worker: load one standings file; a malformed file yields no rows.
+
+    Returns:
+        tuple: (Team records, Standing records, (snapshot key, standings) or None)
+    """
+    json_data = get_json_data(file_path)
+    parsed = parse_json_data(json_data)
+    if parsed is None:
+        return [], [], None
+    team_rows, standing_rows = parsed
+    key = snapshot_key(json_data)
+    snapshot = (key, standing_rows) if key is not None else None
+    return team_rows, standing_rows, snapshot
+
+
+def insert_teams_parallel(cursor, data_folder, workers=None):
+    """
+    Parse the standings files on a process pool and bulk-insert the rows
+    into league_teams and current_standings from this process.
+    """
+    with metrics.span("insert_teams_parallel"):
+        timings = StageTimings()
+        try:
+            with timings.stage("discover"):
+                paths = json_files(data_folder)
+
+            team_rows, standing_rows, snapshots = [], [], []
+            with timings.stage("parse"):
+                for teams, standings, snapshot in map_files(parse_standings_file, paths, workers):
+                    team_rows.extend(teams)
+                    standing_rows.extend(standings)
+                    if snapshot is not None:
+                        snapshots.append(snapshot)
+
+            metrics.inc("rows_parsed_total", len(team_rows), table="league_teams")
+            metrics.inc("rows_parsed_total", len(standing_rows), table="current_standings")
+
+            with timings.stage("insert"):
+                cursor.executemany(INSERT_LEAGUE_TEAM_SQL, team_rows)
+                cursor.executemany(INSERT_STANDING_SQL, standing_rows)
+            metrics.inc("sqlite_statements_total", len(team_rows), table="league_teams")
+            metrics.inc("sqlite_statements_total", len(standing_rows), table="current_standings")
+
+            with timings.stage("derived"):
+                reindex_teams(cursor, (team.id for team in team_rows))
+                refresh_league_summaries(cursor, {row.league_id for row in standing_rows})
+
+            with timings.stage("history"):
+                for key, standings in sorted(snapshots, key=lambda snapshot: snapshot[0]):
+                    record_snapshot(cursor, key, standings)
+
+            with timings.stage("commit"):
+                cursor.connection.commit()
+            metrics.observe("sqlite_commit_seconds", timings.stages["commit"], loader="insert_teams_parallel")
+            if timings.stages["parse"]:
+                metrics.set_gauge(
+                    "rows_parsed_per_second",
+                    (len(team_rows) + len(standing_rows)) / timings.stages["parse"],
+                    loader="insert_teams_parallel",
+                )
+
+            print(
+                f"Inserted {len(team_rows)} teams and {len(standing_rows)} standings "
+                f"from {len(paths)} files."
+            )
+
+        except sqlite3.Error as e:
+            print(f"Database Error inserting teams and standings: {e}")
+            raise
+
+    timings.report("Teams and standings")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Load standings JSON files into SQLite.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="parse files on a process pool with this many workers (1 = serial loader)",
+    )
+    args = parser.parse_args()
+
     # Connect to SQLite database (or create a new one)
     try:
         print(f"Connecting to database... {DB_FILE}")
@@ -171,13 +229,18 @@ def main():
         create_league_teams_schema(cursor)
 
         # Insert team data into league_teams and current_standings tables
-        insert_teams(cursor, DATA_FOLDER)
+        if args.workers == 1:
+            insert_teams(cursor, DATA_FOLDER)
+        else:
+            insert_teams_parallel(cursor, DATA_FOLDER, args.workers)
 
         # Close the database connection
         conn.close()
+        metrics.export()
 
     except sqlite3.Error as e:
-        print(f"Error connecting to database: {e}")
+        print(f"Database error: {e}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
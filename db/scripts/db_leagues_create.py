@@ -1,8 +1,13 @@
+import argparse
 import sqlite3
-import json
+import sys
 import dotenv
 import os
 
+from migrations import migrate
+from parallel_ingest import JSON_SUFFIXES, StageTimings, json_files, map_files
+from records import INSERT_SQL, League, RecordError, get_json_data, parse_league
+
 # Load environment variables
 dotenv.load_dotenv()
 
@@ -11,101 +16,104 @@ DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
 DATA_FOLDER = os.getenv("LEAGUE_DATA_FOLDER")
 
 
-# Utility function to get JSON data (for example)
-def get_json_data(file_path):
-    try:
-        with open(file_path, "r") as file:
-            return json.load(file)
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON from {file_path}: {e}")
-        return None
-    except FileNotFoundError:
-        print(f"File not found: {file_path}")
-        return None
-    except Exception as e:
-        print(f"Error reading file {file_path}: {e}")
-        return None
-
-
 def parse_json_data(data: dict):
+    """League record of a competition payload, or None when it is malformed."""
     try:
-        # Assuming the structure is consistent and needs parsing
-        league = {
-            "id": data["id"],
-            "name": data["name"],
-            "code": data["code"],
-            "emblem": data["emblem"],
-            "current_season_id": data["currentSeason"]["id"],
-            "current_matchday": data["currentSeason"]["currentMatchday"],
-            "area_id": data["area"]["id"],
-            "area_name": data["area"]["name"],
-            "area_code": data["area"]["code"],
-            "area_flag": data["area"]["flag"],
-        }
-        return league
-    except KeyError as e:
-        print(f"Missing expected key in JSON data: {e}")
-        return None
-    except Exception as e:
+        return parse_league(data)
+    except RecordError as e:
         print(f"Error parsing JSON data: {e}")
         return None
 
 
+INSERT_LEAGUE_SQL = INSERT_SQL[League]
+
+
 def insert_league(cursor, league):
     try:
-        cursor.execute(
-            """
-            INSERT INTO leagues (
-                id, name, code, emblem, current_season_id,
-                area_id, area_name, area_code, area_flag
-            ) VALUES (
-                ?, ?, ?, ?, ?,
-                ?, ?, ?, ?
-            )
-            """,
-            (
-                league["id"],
-                league["name"],
-                league["code"],
-                league["emblem"],
-                league["current_season_id"],
-                league["area_id"],
-                league["area_name"],
-                league["area_code"],
-                league["area_flag"],
-            ),
-        )
+        cursor.execute(INSERT_LEAGUE_SQL, league)
     except sqlite3.Error as e:
         print(f"Database Error inserting league: {e}")
+        raise
     except Exception as e:
         print(f"Unexpected Error inserting league: {e}")
+        raise
 
 
 def insert_leagues(cursor, data_folder):
     try:
         for filename in os.listdir(data_folder):
-            if filename.endswith(".json"):
+            if filename.endswith(JSON_SUFFIXES):
                 data = get_json_data(f"{data_folder}/{filename}")
 
-                # Parse the JSON data
+                # Parse the JSON data; malformed files are reported and skipped
                 league = parse_json_data(data)
+                if league is None:
+                    continue
 
                 # Insert the league into the database
                 insert_league(cursor, league)
 
-                print(f"Inserted league: {league['name']}")
+                print(f"Inserted league: {league.name}")
 
         # Commit the changes
         cursor.connection.commit()
         print("Leagues inserted successfully.")
 
+    # Nothing is committed on failure; re-raise so the caller sees it
     except sqlite3.Error as e:
         print(f"Database Error inserting leagues: {e}")
+        raise
     except Exception as e:
         print(f"Error inserting leagues: {e}")
+        raise
+
+
+def parse_league_file(file_path):
+    """Worker: load one league file and return its League record (or None)."""
+    data = get_json_data(file_path)
+    if data is None:
+        return None
+    return parse_json_data(data)
+
+
+def insert_leagues_parallel(cursor, data_folder, workers=None):
+    """
+    Parse the league files on a process pool and insert the rows in one
+    executemany from this process.
+    """
+    timings = StageTimings()
+    try:
+        with timings.stage("discover"):
+            paths = json_files(data_folder)
+
+        with timings.stage("parse"):
+            rows = [row for row in map_files(parse_league_file, paths, workers) if row]
+
+        with timings.stage("insert"):
+            cursor.executemany(INSERT_LEAGUE_SQL, rows)
+
+        with timings.stage("commit"):
+            cursor.connection.commit()
+
+        print(f"Inserted {len(rows)} leagues from {len(paths)} files.")
+
+    except sqlite3.Error as e:
+        print(f"Database Error inserting leagues: {e}")
+        raise
+
+    timings.report("Leagues")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Load league JSON files into SQLite.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="parse files on a process pool with this many workers (1 = serial loader)",
+    )
+    args = parser.parse_args()
+
     # Connect to SQLite database (or create a new one)
     try:
         print(f"Connecting to database... {DB_FILE}")
@@ -113,8 +121,14 @@ def main():
         cursor = conn.cursor()
         print("Database connected successfully.")
 
-        # Create the leagues table
-        insert_leagues(cursor, DATA_FOLDER)
+        # Create or upgrade the schema
+        migrate(conn)
+
+        # Insert the leagues
+        if args.workers == 1:
+            insert_leagues(cursor, DATA_FOLDER)
+        else:
+            insert_leagues_parallel(cursor, DATA_FOLDER, args.workers)
 
         # Check the leagues table
         cursor.execute("SELECT * FROM leagues")
@@ -125,7 +139,8 @@ def main():
         conn.close()
 
     except sqlite3.Error as e:
-        print(f"Error connecting to database: {e}")
+        print(f"Database error: {e}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
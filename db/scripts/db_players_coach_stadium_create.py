@@ -1,8 +1,16 @@
 import json
 import sqlite3
+import sys
 import dotenv
 import os
 
+import metrics
+from migrations import migrate
+from records import INSERT_SQL, Coach, Player, Stadium, parse_team
+from search_index import reindex_teams
+from summaries import refresh_team_summaries
+from team_data_stream import chunked, iter_teams, resolve_team_data_path
+
 # Load environment variables
 dotenv.load_dotenv()
 
@@ -15,48 +23,8 @@ def create_tables(connection):
     """
     Create tables for league_teams, coaches, players, and stadiums.
     """
-    cursor = connection.cursor()
-    
-    # Create the coaches table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS coaches (
-        id INTEGER PRIMARY KEY,
-        team_id INTEGER,
-        name TEXT,
-        first_name TEXT,
-        last_name TEXT,
-        date_of_birth TEXT,
-        nationality TEXT,
-        contract_start TEXT,
-        contract_until TEXT,
-        FOREIGN KEY (team_id) REFERENCES league_teams (id)
-    )
-    """)
-
-    # Create the players table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS players (
-        id INTEGER PRIMARY KEY,
-        team_id INTEGER,
-        name TEXT,
-        position TEXT,
-        date_of_birth TEXT,
-        nationality TEXT,
-        FOREIGN KEY (team_id) REFERENCES league_teams (id)
-    )
-    """)
-
-    # Create the stadiums table
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS stadiums (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        team_id INTEGER,
-        venue_name TEXT,
-        FOREIGN KEY (team_id) REFERENCES league_teams (id)
-    )
-    """)
-
-    connection.commit()
+    # The migration runner owns the schema, including indexes and natural keys
+    migrate(connection)
     print(f"Created the coaches, players, and stadiums tables.")
 
 def insert_coaches(connection, team_id, coach_data):
@@ -139,9 +107,11 @@ def insert_stadiums(connection, team_id, venue_name):
     ))
     connection.commit()
 
-def process_team_data(connection, data):
+def process_team_data_rowwise(connection, data):
     """
-    Iterate through the JSON data and populate all tables.
+    Iterate through the JSON data and populate all tables one row at a time.
+
+    Kept as the reference path for benchmarks; use process_team_data.
     """
     for team_id, team_data in data.items():
         team_id = int(team_id)
@@ -154,16 +124,107 @@ def process_team_data(connection, data):
         
         # Insert into stadiums table
         insert_stadiums(connection, team_id, team_data.get("venue", ""))
-# Example Usage
 
-if __name__ == "__main__":
-    # Replace with the path to your JSON file
-    json_file_path = f"{DATA_FOLDER}/team_data.json"
+    with connection:
+        reindex_teams(connection.cursor(), data.keys())
+        refresh_team_summaries(connection.cursor(), data.keys())
+
+def parse_team_batches(teams):
+    """
+    Flatten (team_id, team_data) pairs into record batches for the coaches,
+    players and stadiums tables.
+
+    Returns:
+        tuple: (Coach records, Player records, Stadium records)
+    """
+    coaches, players, stadiums = [], [], []
+    for team_id, team_data in teams:
+        coach, squad, stadium = parse_team(team_id, team_data)
+        if coach is not None:
+            coaches.append(coach)
+        players.extend(squad)
+        stadiums.append(stadium)
 
+    return coaches, players, stadiums
+
+UPSERT_COACH_SQL = INSERT_SQL[Coach]
+UPSERT_PLAYER_SQL = INSERT_SQL[Player]
+UPSERT_STADIUM_SQL = INSERT_SQL[Stadium]
+
+def process_team_data(connection, data, chunk_size=500):
+    """
+    Bulk-load team data into the coaches, players and stadiums tables.
+
+    `data` is a {team_id: team_data} dict or any iterable of
+    (team_id, team_data) pairs, e.g. a stream from iter_teams. Teams are
+    parsed and written `chunk_size` at a time with executemany upserts, all
+    inside a single transaction with WAL and synchronous=NORMAL for the load;
+    both are put back as they were afterwards, as WAL persists in the file.
+    """
+    teams = data.items() if isinstance(data, dict) else data
+    totals = [0, 0, 0]
+    parse_seconds = 0.0
+
+    previous_journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+    previous_synchronous = connection.execute("PRAGMA synchronous").fetchone()[0]
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
     try:
-        with open(json_file_path, "r") as file:
-            team_data = json.load(file)
+        with metrics.span("process_team_data"), connection:
+            cursor = connection.cursor()
+            chunks = chunked(teams, chunk_size)
+            while True:
+                # Reading the next chunk decodes its JSON when `data` is a stream
+                with metrics.span("parse") as parse:
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        coaches, players, stadiums = parse_team_batches(chunk)
+                parse_seconds += parse.seconds
+                if chunk is None:
+                    break
+                with metrics.span("write"):
+                    cursor.executemany(UPSERT_COACH_SQL, coaches)
+                    cursor.executemany(UPSERT_PLAYER_SQL, players)
+                    cursor.executemany(UPSERT_STADIUM_SQL, stadiums)
+                with metrics.span("derived"):
+                    team_ids = [stadium.team_id for stadium in stadiums]
+                    reindex_teams(cursor, team_ids)
+                    refresh_team_summaries(cursor, team_ids)
+                for table, rows in (("coaches", coaches), ("players", players), ("stadiums", stadiums)):
+                    metrics.inc("rows_parsed_total", len(rows), table=table)
+                    metrics.inc("sqlite_statements_total", len(rows), table=table)
+                totals[0] += len(coaches)
+                totals[1] += len(players)
+                totals[2] += len(stadiums)
+            # Commit here rather than on leaving the block, to time it
+            with metrics.span("commit") as commit:
+                connection.commit()
+            metrics.observe("sqlite_commit_seconds", commit.seconds, loader="process_team_data")
+    except sqlite3.Error as e:
+        # The transaction rolled back, so nothing from this load was kept
+        print(f"Error bulk loading team data, no teams loaded: {e}")
+        raise
+    finally:
+        connection.execute(f"PRAGMA synchronous={previous_synchronous}")
+        if previous_journal_mode.lower() != "wal":
+            try:
+                connection.execute(f"PRAGMA journal_mode={previous_journal_mode}")
+            except sqlite3.OperationalError as e:
+                # Leaving WAL needs the only connection; another reader kept it
+                print(f"Journal mode left as WAL: {e}")
+
+    if parse_seconds:
+        metrics.set_gauge("rows_parsed_per_second", sum(totals) / parse_seconds, loader="process_team_data")
+    print(f"Loaded {totals[0]} coaches, {totals[1]} players and {totals[2]} stadiums.")
 
+# Example Usage
+
+def main():
+    # team_data.ndjson, or the legacy team_data.json document
+    json_file_path = resolve_team_data_path(DATA_FOLDER)
+    connection = None
+
+    try:
         # Connect to SQLite database
         connection = sqlite3.connect(DB_FILE)
         
@@ -173,15 +234,22 @@ if __name__ == "__main__":
         # Create tables
         create_tables(connection)
 
-        # Process data and populate tables
-        process_team_data(connection, team_data)
+        # Stream the file through the loader
+        process_team_data(connection, iter_teams(json_file_path))
 
         print("Data inserted successfully.")
+        metrics.export()
 
+    except sqlite3.Error:
+        sys.exit(1)
     except FileNotFoundError:
         print(f"File not found: {json_file_path}")
     except json.JSONDecodeError:
         print("Error decoding JSON.")
     finally:
-        connection.close()
-    
\ No newline at end of file
+        if connection:
+            connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Incremental refresh of standings and team data.
+
+Instead of re-pulling every team and re-loading everything, this fetches
+the standings for each competition, diffs them against the stored
+`current_standings` rows and only:
+
+- rewrites the standings rows that changed,
+- refetches team/squad data for teams whose `playedGames` changed (or that
+  have never been fetched), and loads just those teams.
+
+Usage:
+    python db/scripts/delta_refresh.py [--revalidate-rosters]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+
+import dotenv
+
+from data_league_teams_fetch import competitions
+from data_players_fetch import fetch_all_players
+from db_league_teams_create import create_league_teams_schema, insert_team
+from db_players_coach_stadium_create import create_tables, process_team_data
+from fetch_client import create_client
+from records import parse_standings
+from search_index import reindex_teams
+from standings_history import record_snapshot, snapshot_key
+from summaries import refresh_league_summaries
+from team_data_stream import NDJSON_FILE, iter_teams, resolve_team_data_path, write_teams
+
+dotenv.load_dotenv()
+
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
+STANDINGS_FOLDER = os.getenv("LEAGUE_TEAMS_DATA_FOLDER", "data/current_league_teams")
+TEAM_DATA_FOLDER = os.getenv("TEAM_DATA_FOLDER", "data/team_data")
+
+STANDING_COLUMNS = (
+    "position",
+    "played_games",
+    "won",
+    "draw",
+    "lost",
+    "points",
+    "goals_for",
+    "goals_against",
+    "goal_difference",
+)
+
+
+def load_stored_standings(cursor, league_id):
+    """Return {team_id: (position, played_games, ...)} for one league."""
+    cursor.execute(
+        f"SELECT team_id, {', '.join(STANDING_COLUMNS)} FROM current_standings WHERE league_id = ?",
+        (league_id,),
+    )
+    return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+
+def diff_standings(fresh_standings, stored):
+    """
+    Compare parsed standings rows against the stored ones.
+
+    Returns:
+        tuple: (changed rows, team ids whose played_games changed or are new)
+    """
+    changed_rows = []
+    teams_to_refetch = []
+    for standing in fresh_standings:
+        values = tuple(getattr(standing, column) for column in STANDING_COLUMNS)
+        previous = stored.get(standing.team_id)
+        if previous == values:
+            continue
+        changed_rows.append(standing)
+        if previous is None or previous[1] != standing.played_games:
+            teams_to_refetch.append(standing.team_id)
+    return changed_rows, teams_to_refetch
+
+
+def write_changed_standings(cursor, changed_rows, stored):
+    """Update the changed rows in place and insert the ones not stored yet."""
+    assignments = ", ".join(f"{column} = ?" for column in STANDING_COLUMNS)
+    for standing in changed_rows:
+        if standing.team_id in stored:
+            cursor.execute(
+                f"UPDATE current_standings SET {assignments} WHERE league_id = ? AND team_id = ?",
+                (
+                    *(getattr(standing, column) for column in STANDING_COLUMNS),
+                    standing.league_id,
+                    standing.team_id,
+                ),
+            )
+        else:
+            insert_team(cursor, standing)
+
+
+def stored_team_ids(path):
+    if not os.path.exists(path):
+        return set()
+    return {team_id for team_id, _ in iter_teams(path)}
+
+
+def merge_team_data(path, fresh, changed):
+    """
+    Stream the stored team data into NDJSON, swapping in the fresh payloads.
+
+    Teams whose payload differs from the stored one are added to `changed`.
+    """
+    if os.path.exists(path):
+        for team_id, team in iter_teams(path):
+            if team_id in fresh:
+                new_team = fresh.pop(team_id)
+                if new_team != team:
+                    changed[team_id] = new_team
+                team = new_team
+            yield team_id, team
+    # Teams that were not in the file yet
+    for team_id, team in fresh.items():
+        changed[team_id] = team
+        yield team_id, team
+
+
+def _all_standing_team_ids(cursor):
+    cursor.execute("SELECT DISTINCT team_id FROM current_standings")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def save_standings(competition, json_data):
+    """Replace the working copy of a competition's standings payload in one step."""
+    path = f"{STANDINGS_FOLDER}/{competition}.json"
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(json_data, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def apply_standings(cursor, competition, json_data):
+    """
+    Write the delta of one competition's fresh standings payload. The
+    payload is parsed first, so a malformed one (RecordError) writes
+    nothing; the caller commits, then keeps the payload with save_standings.
+
+    Returns:
+        tuple: (changed standings rows, team ids whose team data should be refetched)
+    """
+    static_teams, dynamic_standings = parse_standings(json_data)
+    league_id = json_data["competition"]["id"]
+    stored = load_stored_standings(cursor, league_id)
+    changed_rows, refetch = diff_standings(dynamic_standings, stored)
+
+    new_teams = [team for team in static_teams if team.id not in stored]
+    for team in new_teams:
+        insert_team(cursor, team)
+    reindex_teams(cursor, (team.id for team in new_teams))
+    write_changed_standings(cursor, changed_rows, stored)
+    if changed_rows or new_teams:
+        refresh_league_summaries(cursor, [league_id])
+    key = snapshot_key(json_data)
+    if key is not None:
+        record_snapshot(cursor, key, dynamic_standings)
+
+    print(
+        f"{competition}: {len(changed_rows)} standings rows changed, "
+        f"{len(refetch)} teams to refetch"
+    )
+    return changed_rows, refetch
+
+
+def refresh_standings(client, cursor):
+    """
+    Fetch every competition's standings and apply the delta.
+
+    Returns:
+        list: Team ids whose team data should be refetched.
+    """
+    teams_to_refetch, applied = [], {}
+    for competition in competitions:
+        json_data = client.get_json(f"competition/{competition}/standings")
+        if json_data is None:
+            continue
+        teams_to_refetch.extend(apply_standings(cursor, competition, json_data)[1])
+        applied[competition] = json_data
+
+    cursor.connection.commit()
+    # Only once the database has them, so the working copies never run ahead
+    for competition, json_data in applied.items():
+        save_standings(competition, json_data)
+    return teams_to_refetch
+
+
+def refresh_teams(client, connection, team_ids):
+    """
+    Fetch `team_ids`, merge them into the team data file and reload the
+    teams whose payload changed.
+
+    Returns:
+        int: Teams reloaded.
+    """
+    team_data_path = resolve_team_data_path(TEAM_DATA_FOLDER)
+    fresh = fetch_all_players(client, team_ids) if team_ids else {}
+    # Only teams whose payload actually changed are reloaded
+    changed = {}
+    if fresh:
+        write_teams(
+            os.path.join(TEAM_DATA_FOLDER, NDJSON_FILE),
+            merge_team_data(team_data_path, fresh, changed),
+        )
+    if changed:
+        process_team_data(connection, changed)
+    return len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental standings and team data refresh.")
+    parser.add_argument(
+        "--revalidate-rosters",
+        action="store_true",
+        help="also revalidate unchanged teams (conditional GET, 304 if the squad is unchanged)",
+    )
+    args = parser.parse_args()
+
+    team_data_path = resolve_team_data_path(TEAM_DATA_FOLDER)
+    known_team_ids = stored_team_ids(team_data_path)
+
+    connection = sqlite3.connect(DB_FILE)
+    try:
+        cursor = connection.cursor()
+        create_league_teams_schema(cursor)
+        create_tables(connection)
+
+        with create_client() as client:
+            team_ids = refresh_standings(client, cursor)
+            # Teams we have standings for but have never fetched
+            team_ids.extend(
+                team_id
+                for team_id in _all_standing_team_ids(cursor)
+                if team_id not in known_team_ids and team_id not in team_ids
+            )
+            if args.revalidate_rosters:
+                team_ids.extend(t for t in known_team_ids if t not in team_ids)
+
+            reloaded = refresh_teams(client, connection, team_ids)
+            client.report_cache()
+
+        print(f"Delta refresh done: {len(team_ids)} teams fetched, {reloaded} teams reloaded.")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
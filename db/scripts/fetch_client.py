@@ -0,0 +1,371 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from payload_archive import PayloadArchive
+from response_cache import ResponseCache
+
+# football-data.org reports the remaining per-minute quota and the seconds
+# until the counter resets on every response.
+HEADER_REQUESTS_AVAILABLE = "X-Requests-Available-Minute"
+HEADER_COUNTER_RESET = "X-RequestCounter-Reset"
+
+DEFAULT_REQUESTS_PER_MINUTE = 9
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF = 2.0
+DEFAULT_TIMEOUT = 30
+DEFAULT_CACHE_FILE = "data/http_cache.db"
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_ARCHIVE_DIR = "data/archive"
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every worker of a fetch run.
+
+    The bucket starts full, so the first `capacity` requests go out at once
+    and the rest are released at `rate` tokens per second. The server's own
+    quota headers and 429 responses can drain the bucket or pause it.
+    """
+
+    def __init__(self, capacity, rate, clock=time.monotonic, sleep=time.sleep):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute, **kwargs):
+        return cls(requests_per_minute, requests_per_minute / 60, **kwargs)
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._updated = now
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+    def pause(self, seconds, tokens_after=0.0):
+        """
+        Hold every worker for `seconds` (e.g. after a 429).
+
+        `tokens_after` is the quota available once the pause ends; a server
+        side counter reset hands back the full window, a 429 hands back none.
+        """
+        with self._lock:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self.tokens = float(tokens_after)
+            self._updated = self._paused_until
+
+    def sync(self, available, reset_after):
+        """Align the bucket with the quota the server says is left."""
+        with self._lock:
+            self._refill(self._clock())
+            self.tokens = min(self.tokens, float(available))
+        if available <= 0 and reset_after > 0:
+            self.pause(reset_after, tokens_after=self.capacity)
+
+
+def _header_number(headers, name):
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def apply_rate_limit_headers(limiter, response):
+    """Feed the quota headers of `response` back into the shared limiter."""
+    available = _header_number(response.headers, HEADER_REQUESTS_AVAILABLE)
+    if available is None:
+        return
+    reset_after = _header_number(response.headers, HEADER_COUNTER_RESET) or 0
+    metrics.set_gauge("http_quota_available", available)
+    metrics.set_gauge("http_quota_reset_seconds", reset_after)
+    limiter.sync(available, reset_after)
+
+
+def retry_after_seconds(response, attempt, backoff=DEFAULT_BACKOFF):
+    """Seconds to wait before retrying: Retry-After if sent, else exponential backoff."""
+    retry_after = None
+    if response is not None:
+        retry_after = _header_number(response.headers, "Retry-After")
+        if retry_after is None:
+            retry_after = _header_number(response.headers, HEADER_COUNTER_RESET)
+    if retry_after is not None:
+        return retry_after
+    return backoff * (2**attempt) + random.uniform(0, backoff)
+
+
+def _deliver(on_body, url, body):
+    """Hand `body` to the `on_body` callback; its failure must not lose the payload."""
+    if on_body is None:
+        return
+    try:
+        on_body(body)
+    except Exception as e:
+        print(f"Error handling the body of {url}: {e}")
+
+
+def fetch_json(
+    url,
+    headers,
+    limiter,
+    session=None,
+    cache=None,
+    max_retries=DEFAULT_MAX_RETRIES,
+    backoff=DEFAULT_BACKOFF,
+    timeout=DEFAULT_TIMEOUT,
+    on_body=None,
+):
+    """
+    GET `url` through the shared limiter and return the decoded JSON body.
+
+    With a `cache`, the request is sent conditionally and a 304 is answered
+    from the cached body. 429 and 5xx responses and connection errors are
+    retried up to `max_retries` times. Returns None if the resource cannot
+    be fetched or its body is not JSON. `on_body(body)` is called with the
+    raw bytes of every body returned, fresh or revalidated; its errors are
+    reported and do not fail the fetch.
+    """
+    get = session.get if session is not None else requests.get
+    cached = cache.lookup(url) if cache is not None else None
+    plain_headers = headers
+    if cached is not None:
+        headers = {**headers, **cached.validators()}
+
+    for attempt in range(max_retries + 1):
+        start = time.perf_counter()
+        limiter.acquire()
+        sent = time.perf_counter()
+        metrics.inc("http_quota_wait_seconds_total", sent - start)
+        try:
+            response = get(url, headers=headers, timeout=timeout)
+        except requests.RequestException as e:
+            metrics.inc("http_requests_total", status="error")
+            print(f"Request error for {url}: {e}")
+            if attempt == max_retries:
+                return None
+            time.sleep(retry_after_seconds(None, attempt, backoff))
+            continue
+
+        status = str(response.status_code)
+        metrics.observe("http_request_seconds", time.perf_counter() - sent, status=status)
+        metrics.inc("http_requests_total", status=status)
+        metrics.inc("http_bytes_received_total", len(response.content))
+        apply_rate_limit_headers(limiter, response)
+
+        if response.status_code == 304 and cached is not None:
+            try:
+                data = json.loads(cached.body)
+            except ValueError as e:
+                # A corrupt cache row: drop it and ask again unconditionally
+                print(f"Discarding cached body for {url}: {e}")
+                cache.discard(url)
+                cached, headers = None, plain_headers
+                if attempt < max_retries:
+                    continue
+                return None
+            cache.revalidated(cached)
+            _deliver(on_body, url, cached.body)
+            return data
+
+        if response.status_code == 200:
+            try:
+                data = json.loads(response.content)
+            except ValueError as e:
+                # A truncated body or an HTML error page; never cached or archived
+                metrics.inc("http_invalid_bodies_total")
+                print(f"Invalid JSON from {url}: {e}")
+                return None
+            if cache is not None:
+                cache.store(
+                    url,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    response.content,
+                )
+            _deliver(on_body, url, response.content)
+            return data
+
+        if response.status_code == 429:
+            wait = retry_after_seconds(response, attempt, backoff)
+            print(f"Rate limited on {url}. Waiting {wait:.1f}s...")
+            limiter.pause(wait)
+            if attempt < max_retries:
+                continue
+        elif response.status_code >= 500 and attempt < max_retries:
+            time.sleep(retry_after_seconds(None, attempt, backoff))
+            continue
+
+        print(f"Failed to fetch {url}: {response.status_code}")
+        return None
+
+    return None
+
+
+class FootballDataClient:
+    """
+    Shared client for every football-data.org fetch script.
+
+    Holds one keep-alive `requests.Session` (connection pool sized to the
+    number of workers), the token bucket for the API token (or any limiter
+    with its acquire/pause/sync interface, e.g. a quota shared across
+    processes) and, optionally, the on-disk conditional-GET cache and the
+    payload archive.
+    """
+
+    def __init__(
+        self,
+        api_url,
+        token,
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+        cache=None,
+        pool_size=None,
+        archive=None,
+        limiter=None,
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.requests_per_minute = requests_per_minute
+        self.limiter = limiter or TokenBucket.per_minute(requests_per_minute)
+        self.cache = cache
+        self.archive = archive
+
+        pool_size = pool_size or requests_per_minute
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["X-Auth-Token"] = token or ""
+
+    def get_json(self, path):
+        url = f"{self.api_url}/{path.lstrip('/')}"
+        on_body = None
+        if self.archive is not None:
+            on_body = lambda body: self.archive.put(path, body)  # noqa: E731
+        return fetch_json(url, {}, self.limiter, session=self.session, cache=self.cache, on_body=on_body)
+
+    def iter_many(self, paths, max_workers=None):
+        """Fetch several paths concurrently, yielding (path, JSON) as they complete."""
+        return iter_fetch(paths, self.get_json, max_workers=max_workers or self.requests_per_minute)
+
+    def get_many(self, paths, max_workers=None, on_result=None):
+        """Fetch several paths concurrently. Returns path -> JSON."""
+        return fetch_many(
+            paths,
+            self.get_json,
+            max_workers=max_workers or self.requests_per_minute,
+            on_result=on_result,
+        )
+
+    def report_cache(self):
+        if self.archive is not None:
+            print(
+                f"Payload archive: {self.archive.stored} new payloads, "
+                f"{self.archive.deduplicated} unchanged"
+            )
+        if self.cache is None:
+            return
+        stats = self.cache.stats()
+        print(
+            f"Response cache: {stats['hits']} hits (304), {stats['misses']} misses, "
+            f"hit rate {stats['hit_rate']:.0%}, {stats['bytes_saved']} bytes not re-downloaded"
+        )
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.archive is not None:
+            self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def create_client(
+    requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, use_cache=True, use_archive=True, limiter=None
+):
+    """
+    Build a client from the FOOTBALL_DATA_ORG_*, FETCH_CACHE_* and
+    PAYLOAD_ARCHIVE_DIR environment variables (an empty PAYLOAD_ARCHIVE_DIR
+    turns the archive off).
+    """
+    cache = None
+    if use_cache:
+        cache = ResponseCache(
+            os.getenv("FETCH_CACHE_FILE", DEFAULT_CACHE_FILE),
+            int(os.getenv("FETCH_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES)),
+        )
+    archive = None
+    archive_dir = os.getenv("PAYLOAD_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+    if use_archive and archive_dir:
+        archive = PayloadArchive(archive_dir)
+    return FootballDataClient(
+        os.getenv("FOOTBALL_DATA_ORG_URL", ""),
+        os.getenv("FOOTBALL_DATA_ORG_TOKEN"),
+        requests_per_minute=requests_per_minute,
+        cache=cache,
+        archive=archive,
+        limiter=limiter,
+    )
+
+
+def iter_fetch(keys, fetch, max_workers=DEFAULT_REQUESTS_PER_MINUTE):
+    """
+    Run `fetch(key)` for every key on a thread pool and yield (key, result)
+    pairs as they complete, so callers can stream results out instead of
+    holding all of them.
+
+    Pacing is the job of the limiter used inside `fetch`; the pool only has
+    to be wide enough to keep every released token busy.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, key): key for key in keys}
+        for future in as_completed(futures):
+            key = futures.pop(future)
+            yield key, future.result()
+
+
+def fetch_many(keys, fetch, max_workers=DEFAULT_REQUESTS_PER_MINUTE, on_result=None):
+    """
+    Run `fetch(key)` for every key concurrently (see iter_fetch).
+
+    Returns:
+        dict: key -> result, skipping keys whose result was None.
+    """
+    results = {}
+    for key, data in iter_fetch(keys, fetch, max_workers):
+        if on_result:
+            on_result(key, data)
+        if data is not None:
+            results[key] = data
+    return results
@@ -0,0 +1,490 @@
+"""
+Persistent, resumable fetch job queue for historical backfills.
+
+A backfill is planned as one job per API request, kept in an SQLite file
+(JOB_QUEUE_FILE, default data/jobs.db) so a crash or a Ctrl-C loses at most
+the requests in flight:
+
+- `plan` queues the standings and matches of every competition and season;
+  a finished standings job queues a `/teams/{id}` job per team it lists.
+  Queuing is idempotent (one job per path), so re-planning is harmless.
+- `work` leases the highest-priority ready job, fetches it, writes the
+  payload under BACKFILL_DATA_FOLDER and marks the job done. A lease that
+  is not completed within LEASE_SECONDS (a dead worker) goes back to the
+  queue; a failed fetch is retried with exponential backoff up to
+  MAX_ATTEMPTS times. Completing a job twice is a no-op and the payload
+  write is atomic, so a job run by two workers leaves one result.
+- Any number of worker processes can drain the queue together. They share
+  the per-minute quota through the same file (`SharedQuota`), so adding
+  workers never exceeds it.
+- `progress` shows the jobs per kind and state, and estimates the time
+  left from the recent completion rate, never less than the quota allows.
+
+    python db/scripts/job_queue.py plan --seasons 2021 2022 2023
+    python db/scripts/job_queue.py work --processes 3
+    python db/scripts/job_queue.py progress
+    python db/scripts/job_queue.py retry
+    python db/scripts/job_queue.py collect
+
+The payloads land in the loaders' layouts: `{season}/current_league_teams/`
+(standings_history.py backfill), `{season}/matches/` (matches.py load) and
+`teams/`, which `collect` writes into `team_data/team_data.ndjson`.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import dotenv
+
+import metrics
+from data_league_teams_fetch import competitions as COMPETITIONS
+from fetch_client import DEFAULT_REQUESTS_PER_MINUTE, create_client
+from records import RecordError, get_json_data, parse_standings
+from team_data_stream import NDJSON_FILE, write_teams
+
+dotenv.load_dotenv()
+
+QUEUE_FILE = os.getenv("JOB_QUEUE_FILE", "data/jobs.db")
+BACKFILL_FOLDER = os.getenv("BACKFILL_DATA_FOLDER", "data/backfill")
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 30.0
+# Standings first: they reveal the team jobs
+PRIORITIES = {"standings": 2, "matches": 1, "team": 0}
+# How often an idle worker looks again; a running standings job may queue teams any moment
+IDLE_POLL = 1.0
+# Completions counted for the rate behind the estimate
+RATE_WINDOW = 600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    output TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    lease_token TEXT,
+    lease_expires REAL,
+    error TEXT,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready
+    ON jobs (status, priority DESC, id);
+CREATE TABLE IF NOT EXISTS quota (
+    sent_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quota_state (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+
+def _connect(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Autocommit; writes take the lock up front with BEGIN IMMEDIATE
+    connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+@contextmanager
+def _immediate(connection):
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+@dataclass
+class Job:
+    id: int
+    kind: str
+    path: str
+    output: str
+    attempts: int
+    lease_token: str
+
+
+class JobQueue:
+    def __init__(self, path=QUEUE_FILE, lease_seconds=LEASE_SECONDS, clock=time.time):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._clock = clock
+        self._conn = _connect(path)
+
+    def enqueue(self, jobs):
+        """
+        Queue (kind, path, output) jobs; a path already queued is left alone.
+
+        Returns:
+            int: Jobs added.
+        """
+        with _immediate(self._conn):
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO jobs (path, kind, output, priority) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (path) DO NOTHING",
+                [(path, kind, output, PRIORITIES[kind]) for kind, path, output in jobs],
+            )
+            return self._conn.total_changes - before
+
+    def lease(self):
+        """The highest-priority ready job, leased for `lease_seconds`, or None."""
+        now = self._clock()
+        token = uuid.uuid4().hex
+        with _immediate(self._conn):
+            row = self._conn.execute(
+                """
+                SELECT id, kind, path, output, attempts FROM jobs
+                WHERE (status = 'pending' AND not_before <= ?)
+                   OR (status = 'leased' AND lease_expires <= ?)
+                ORDER BY priority DESC, id
+                LIMIT 1
+                """,
+                (now, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, "
+                "lease_token = ?, lease_expires = ? WHERE id = ?",
+                (token, now + self.lease_seconds, row[0]),
+            )
+        return Job(*row[:4], row[4] + 1, token)
+
+    def complete(self, job):
+        """Mark `job` done. Returns False if it was already done (by this or another worker)."""
+        cursor = self._conn.execute(
+            "UPDATE jobs SET status = 'done', lease_token = NULL, error = NULL, finished_at = ? "
+            "WHERE id = ? AND status != 'done'",
+            (self._clock(), job.id),
+        )
+        if cursor.rowcount != 1:
+            return False
+        metrics.inc("jobs_total", kind=job.kind, status="done")
+        return True
+
+    def fail(self, job, error):
+        """Put `job` back with backoff, or give up on it after MAX_ATTEMPTS."""
+        give_up = job.attempts >= MAX_ATTEMPTS
+        # Only while we still hold the lease; an expired one belongs to someone else
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, not_before = ?, error = ?, lease_token = NULL "
+            "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+            (
+                "failed" if give_up else "pending",
+                self._clock() + RETRY_BACKOFF * 2 ** (job.attempts - 1),
+                error,
+                job.id,
+                job.lease_token,
+            ),
+        )
+        metrics.inc("jobs_total", kind=job.kind, status="failed" if give_up else "retried")
+
+    def retry_failed(self):
+        """Give every failed job a fresh set of attempts. Returns the jobs requeued."""
+        return self._conn.execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, not_before = 0 WHERE status = 'failed'"
+        ).rowcount
+
+    def next_ready(self):
+        """Seconds until a job could be leased (0 if one can now), or None when nothing is left."""
+        now = self._clock()
+        row = self._conn.execute(
+            """
+            SELECT MIN(CASE WHEN status = 'pending' THEN not_before ELSE lease_expires END)
+            FROM jobs WHERE status IN ('pending', 'leased')
+            """
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(row[0] - now, 0.0)
+
+    def progress(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, window=RATE_WINDOW):
+        """
+        Jobs per kind and state, and the estimated seconds left.
+
+        Returns:
+            dict: {"counts": {kind: {status: n}}, "remaining", "rate_per_minute",
+            "eta_seconds" (None until a job has finished), "undiscovered_standings"}
+        """
+        now = self._clock()
+        counts = {}
+        for kind, status, count in self._conn.execute(
+            "SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status"
+        ):
+            counts.setdefault(kind, {})[status] = count
+        remaining = sum(c.get("pending", 0) + c.get("leased", 0) for c in counts.values())
+        (recent,) = self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'done' AND finished_at > ?", (now - window,)
+        ).fetchone()
+        rate = recent / window * 60
+        eta = None
+        if rate:
+            # At least one request per job, so never faster than the quota
+            eta = remaining / min(rate, requests_per_minute) * 60
+        return {
+            "counts": counts,
+            "remaining": remaining,
+            "rate_per_minute": rate,
+            "eta_seconds": eta,
+            # Each of these still queues its teams when it finishes
+            "undiscovered_standings": counts.get("standings", {}).get("pending", 0)
+            + counts.get("standings", {}).get("leased", 0),
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+class SharedQuota:
+    """
+    Requests per rolling window shared by every process using the queue
+    file, with TokenBucket's acquire/pause/sync interface so it can stand
+    in as a FootballDataClient's limiter.
+    """
+
+    def __init__(self, path=QUEUE_FILE, per_minute=DEFAULT_REQUESTS_PER_MINUTE, window=60.0,
+                 clock=time.time, sleep=time.sleep):
+        self.capacity = per_minute
+        self.window = window
+        self._clock = clock
+        self._sleep = sleep
+        self._conn = _connect(path)
+        self._lock = threading.Lock()
+
+    def _paused_until(self):
+        row = self._conn.execute("SELECT value FROM quota_state WHERE key = 'paused_until'").fetchone()
+        return row[0] if row else 0.0
+
+    def acquire(self):
+        """Block until the shared window has room, then take a slot."""
+        while True:
+            with self._lock, _immediate(self._conn):
+                now = self._clock()
+                paused_until = self._paused_until()
+                if now < paused_until:
+                    wait = paused_until - now
+                else:
+                    self._conn.execute("DELETE FROM quota WHERE sent_at <= ?", (now - self.window,))
+                    sent, oldest = self._conn.execute("SELECT COUNT(*), MIN(sent_at) FROM quota").fetchone()
+                    if sent < self.capacity:
+                        self._conn.execute("INSERT INTO quota (sent_at) VALUES (?)", (now,))
+                        return
+                    wait = oldest + self.window - now
+            self._sleep(max(wait, 0.01))
+
+    def pause(self, seconds, tokens_after=0.0):
+        """Hold every process for `seconds`; a full `tokens_after` also clears the window."""
+        with self._lock, _immediate(self._conn):
+            until = max(self._paused_until(), self._clock() + seconds)
+            self._conn.execute(
+                "INSERT INTO quota_state (key, value) VALUES ('paused_until', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (until,),
+            )
+            if tokens_after >= self.capacity:
+                self._conn.execute("DELETE FROM quota")
+
+    def sync(self, available, reset_after):
+        """Count requests the server has seen but we have not (another client on the token)."""
+        with self._lock, _immediate(self._conn):
+            now = self._clock()
+            (sent,) = self._conn.execute(
+                "SELECT COUNT(*) FROM quota WHERE sent_at > ?", (now - self.window,)
+            ).fetchone()
+            missing = int(self.capacity - sent - available)
+            if missing > 0:
+                self._conn.executemany("INSERT INTO quota (sent_at) VALUES (?)", [(now,)] * missing)
+        if available <= 0 and reset_after > 0:
+            self.pause(reset_after, tokens_after=self.capacity)
+
+    def close(self):
+        self._conn.close()
+
+
+def plan_backfill(queue, seasons, competitions=COMPETITIONS):
+    """Queue the standings and matches of every competition for every season (newest first)."""
+    jobs = []
+    for season in sorted(seasons, reverse=True):
+        for code in competitions:
+            jobs.append((
+                "standings",
+                f"competition/{code}/standings?season={season}",
+                os.path.join(str(season), "current_league_teams", f"{code}.json"),
+            ))
+            jobs.append((
+                "matches",
+                f"competition/{code}/matches?season={season}",
+                os.path.join(str(season), "matches", f"{code}.json"),
+            ))
+    return queue.enqueue(jobs)
+
+
+def team_jobs(json_data):
+    """A `/teams/{id}` job for every team in a standings payload."""
+    teams, _ = parse_standings(json_data)
+    return [
+        ("team", f"teams/{team_id}", os.path.join("teams", f"{team_id}.json"))
+        for team_id in dict.fromkeys(team.id for team in teams)
+    ]
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def work(queue, client, folder=BACKFILL_FOLDER, poll=IDLE_POLL, sleep=time.sleep):
+    """
+    Drain the queue: lease, fetch, write, complete, until no job is
+    pending or leased.
+
+    Returns:
+        int: Jobs this worker completed.
+    """
+    completed = 0
+    while True:
+        job = queue.lease()
+        if job is None:
+            wait = queue.next_ready()
+            if wait is None:
+                return completed
+            sleep(min(wait, poll) or poll)
+            continue
+
+        data = client.get_json(job.path)
+        if data is None:
+            queue.fail(job, "fetch failed")
+            print(f"{job.path}: failed (attempt {job.attempts})")
+            continue
+        try:
+            _write_atomic(os.path.join(folder, job.output), data)
+            if job.kind == "standings":
+                queue.enqueue(team_jobs(data))
+        except (OSError, RecordError) as e:
+            queue.fail(job, str(e))
+            print(f"{job.path}: {e}")
+            continue
+        if queue.complete(job):
+            completed += 1
+        print(f"{job.path}: done")
+
+
+def collect_teams(folder=BACKFILL_FOLDER):
+    """Write the fetched team payloads into `team_data/team_data.ndjson` for the squad loader."""
+    teams_folder = os.path.join(folder, "teams")
+    names = sorted(os.listdir(teams_folder)) if os.path.isdir(teams_folder) else []
+    teams = (
+        (int(name.split(".")[0]), get_json_data(os.path.join(teams_folder, name)))
+        for name in names
+        if name.endswith(".json")
+    )
+    target = os.path.join(folder, "team_data", NDJSON_FILE)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    return write_teams(target, ((team_id, data) for team_id, data in teams if data is not None))
+
+
+def _worker(queue_file, folder, requests_per_minute, window):
+    queue = JobQueue(queue_file)
+    quota = SharedQuota(queue_file, requests_per_minute, window)
+    try:
+        with create_client(requests_per_minute, limiter=quota) as client:
+            completed = work(queue, client, folder)
+            client.report_cache()
+        print(f"Worker {os.getpid()}: {completed} jobs done")
+    finally:
+        quota.close()
+        queue.close()
+
+
+def run_workers(queue_file, folder, processes, requests_per_minute, window):
+    if processes == 1:
+        _worker(queue_file, folder, requests_per_minute, window)
+        return
+    workers = [
+        multiprocessing.Process(target=_worker, args=(queue_file, folder, requests_per_minute, window))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def print_progress(progress):
+    for kind in sorted(progress["counts"], key=lambda k: -PRIORITIES.get(k, 0)):
+        states = progress["counts"][kind]
+        print(f"{kind:<10} " + ", ".join(f"{status} {count}" for status, count in sorted(states.items())))
+    if not progress["remaining"]:
+        print("Nothing left to fetch.")
+        return
+    line = f"{progress['remaining']} jobs left at {progress['rate_per_minute']:.1f}/min"
+    if progress["eta_seconds"] is not None:
+        line += f", about {progress['eta_seconds'] / 60:.0f} min to go"
+    if progress["undiscovered_standings"]:
+        line += f" (+ the teams of {progress['undiscovered_standings']} standings not fetched yet)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable fetch job queue for historical backfills.")
+    parser.add_argument("--queue", default=QUEUE_FILE, help="queue database file")
+    parser.add_argument("--out", default=BACKFILL_FOLDER, help="where fetched payloads are written")
+    parser.add_argument("--requests-per-minute", type=int, default=DEFAULT_REQUESTS_PER_MINUTE)
+    commands = parser.add_subparsers(dest="command", required=True)
+    plan_parser = commands.add_parser("plan", help="queue standings and matches per season")
+    plan_parser.add_argument("--seasons", type=int, nargs="+", required=True, help="season start years")
+    plan_parser.add_argument("--competitions", nargs="+", default=COMPETITIONS)
+    work_parser = commands.add_parser("work", help="drain the queue")
+    work_parser.add_argument("--processes", type=int, default=1)
+    work_parser.add_argument("--window", type=float, default=60.0, help="quota window in seconds")
+    commands.add_parser("progress", help="jobs per state and estimated time left")
+    commands.add_parser("retry", help="requeue failed jobs")
+    commands.add_parser("collect", help="write fetched teams as team_data.ndjson")
+    args = parser.parse_args()
+
+    if args.command == "work":
+        run_workers(args.queue, args.out, args.processes, args.requests_per_minute, args.window)
+        metrics.export()
+        return
+    if args.command == "collect":
+        print(f"Wrote {collect_teams(args.out)} teams to {os.path.join(args.out, 'team_data', NDJSON_FILE)}")
+        return
+
+    queue = JobQueue(args.queue)
+    try:
+        if args.command == "plan":
+            added = plan_backfill(queue, args.seasons, args.competitions)
+            print(f"Queued {added} jobs")
+        elif args.command == "retry":
+            print(f"Requeued {queue.retry_failed()} failed jobs")
+        else:
+            print_progress(queue.progress(args.requests_per_minute))
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
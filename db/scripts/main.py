@@ -0,0 +1,317 @@
+"""
+dashdribble: run the data pipeline as a dependency graph.
+
+    fetch_leagues ───────────────┐
+    fetch_standings ──┬──────────┼─► insert_leagues ──┐
+                      └► fetch_teams                  ├─► simulate ─┬► sync_warehouse
+    migrate ─────────────────────┼─► insert_teams ────┤             └► export_snapshot
+                                 ├─► insert_players ──┘
+    fetch_matches ───────────────┴─► insert_matches
+
+Independent stages run concurrently (the fetches share one rate-limited
+client; database writers take turns). A stage is skipped when its input
+files and upstream stages are unchanged since its last successful run.
+
+Usage:
+    python db/scripts/main.py [STAGE ...] [--fetch] [--force] [--workers N] [--list]
+                              [--metrics FILE] [--profile STAGE ...]
+
+Without stages, runs everything except the export stages. Fetch stages only
+run with --fetch or when named; sync_warehouse and export_snapshot only when
+named.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+
+import dotenv
+
+import metrics
+from migrations import migrate
+from pipeline import Pipeline, Stage, select_stages
+
+dotenv.load_dotenv()
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
+LEAGUE_DATA_FOLDER = os.getenv("LEAGUE_DATA_FOLDER", "data/historical_winners")
+LEAGUE_TEAMS_DATA_FOLDER = os.getenv("LEAGUE_TEAMS_DATA_FOLDER", "data/current_league_teams")
+TEAM_DATA_FOLDER = os.getenv("TEAM_DATA_FOLDER", "data/team_data")
+MATCHES_DATA_FOLDER = os.getenv("MATCHES_DATA_FOLDER", "data/matches")
+SNAPSHOT_DIR = os.getenv("DASHDRIBBLE_SNAPSHOT_DIR", "data/snapshot")
+
+# Groups that only run when asked for
+OPT_IN_GROUPS = ("fetch", "export")
+
+
+class PipelineState:
+    """Stage fingerprints in the `pipeline_runs` table (migration v7)."""
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+
+    def fingerprint(self, stage):
+        connection = sqlite3.connect(self.db_file)
+        try:
+            if not connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'pipeline_runs'"
+            ).fetchone():
+                return None
+            row = connection.execute(
+                "SELECT fingerprint FROM pipeline_runs WHERE stage = ?", (stage,)
+            ).fetchone()
+            return row[0] if row else None
+        finally:
+            connection.close()
+
+    def record(self, stage, fingerprint, seconds):
+        connection = sqlite3.connect(self.db_file, timeout=60)
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT INTO pipeline_runs (stage, fingerprint, seconds) VALUES (?, ?, ?) "
+                    "ON CONFLICT (stage) DO UPDATE SET fingerprint = excluded.fingerprint, "
+                    "seconds = excluded.seconds, finished_at = datetime('now')",
+                    (stage, fingerprint, seconds),
+                )
+        finally:
+            connection.close()
+
+
+class SharedClient:
+    """One rate-limited API client for every fetch stage, opened on first use."""
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._client is None:
+                from fetch_client import create_client
+
+                self._client = create_client()
+            return self._client
+
+    def close(self):
+        if self._client is not None:
+            self._client.report_cache()
+            self._client.close()
+
+
+def _fetch_leagues(client):
+    from data_league_fetch import fetch_leagues
+
+    fetch_leagues(client.get())
+
+
+def _fetch_standings(client):
+    from data_league_teams_fetch import fetch_standings
+
+    fetch_standings(client.get())
+
+
+def _fetch_teams(client):
+    from data_players_fetch import fetch_team_data
+
+    fetch_team_data(client.get())
+
+
+def _fetch_matches(client):
+    from data_matches_fetch import fetch_matches
+
+    fetch_matches(client.get())
+
+
+def _with_db(load):
+    """Run `load(connection)` on a fresh connection to the database."""
+
+    def run():
+        connection = sqlite3.connect(DB_FILE, timeout=60)
+        try:
+            load(connection)
+        finally:
+            connection.close()
+
+    return run
+
+
+def _migrate(connection):
+    migrate(connection)
+
+
+def _insert_leagues(connection, workers):
+    from db_leagues_create import insert_leagues_parallel
+
+    insert_leagues_parallel(connection.cursor(), LEAGUE_DATA_FOLDER, workers)
+
+
+def _insert_teams(connection, workers):
+    from db_league_teams_create import insert_teams_parallel
+
+    insert_teams_parallel(connection.cursor(), LEAGUE_TEAMS_DATA_FOLDER, workers)
+
+
+def _insert_players(connection):
+    from db_players_coach_stadium_create import process_team_data
+    from team_data_stream import iter_teams, resolve_team_data_path
+
+    process_team_data(connection, iter_teams(resolve_team_data_path(TEAM_DATA_FOLDER)))
+
+
+def _insert_matches(connection):
+    from matches import insert_matches
+
+    insert_matches(connection.cursor(), MATCHES_DATA_FOLDER)
+
+
+def _simulate(connection):
+    from simulation import project_leagues
+
+    project_leagues(connection, workers=os.cpu_count() or 1)
+
+
+def _export_snapshot(connection):
+    from snapshots import export_snapshot
+
+    written, unchanged = export_snapshot(connection, SNAPSHOT_DIR)
+    print(f"Snapshot: {len(written)} datasets written, {len(unchanged)} unchanged")
+
+
+def _sync_warehouse():
+    sys.path.insert(0, os.path.join(HERE, "..", "azure"))
+    from migrate_azure import target_url
+    from sync_azure import sync
+
+    sync(DB_FILE, target_url())
+
+
+def build_stages(client, workers=None):
+    return [
+        Stage("fetch_leagues", lambda: _fetch_leagues(client), inputs=None, group="fetch"),
+        Stage("fetch_standings", lambda: _fetch_standings(client), inputs=None, group="fetch"),
+        Stage(
+            "fetch_teams",
+            lambda: _fetch_teams(client),
+            deps=("fetch_standings",),
+            inputs=None,
+            group="fetch",
+        ),
+        Stage("fetch_matches", lambda: _fetch_matches(client), inputs=None, group="fetch"),
+        Stage(
+            "migrate",
+            _with_db(_migrate),
+            inputs=(os.path.join(HERE, "migrations.py"),),
+            resource="db",
+        ),
+        Stage(
+            "insert_leagues",
+            _with_db(lambda connection: _insert_leagues(connection, workers)),
+            deps=("migrate", "fetch_leagues"),
+            inputs=(LEAGUE_DATA_FOLDER,),
+            resource="db",
+        ),
+        Stage(
+            "insert_teams",
+            _with_db(lambda connection: _insert_teams(connection, workers)),
+            deps=("migrate", "fetch_standings"),
+            inputs=(LEAGUE_TEAMS_DATA_FOLDER,),
+            resource="db",
+        ),
+        Stage(
+            "insert_players",
+            _with_db(_insert_players),
+            deps=("migrate", "fetch_teams"),
+            inputs=(TEAM_DATA_FOLDER,),
+            resource="db",
+        ),
+        Stage(
+            "insert_matches",
+            _with_db(_insert_matches),
+            deps=("migrate", "fetch_matches"),
+            inputs=(MATCHES_DATA_FOLDER,),
+            resource="db",
+        ),
+        Stage(
+            "simulate",
+            _with_db(_simulate),
+            deps=("insert_leagues", "insert_teams"),
+            resource="db",
+            group="aggregate",
+        ),
+        Stage(
+            "sync_warehouse",
+            _sync_warehouse,
+            deps=("insert_players", "simulate"),
+            inputs=None,
+            group="export",
+        ),
+        Stage(
+            "export_snapshot",
+            _with_db(_export_snapshot),
+            deps=("insert_players", "simulate"),
+            inputs=None,
+            group="export",
+        ),
+    ]
+
+
+def plan(stages, targets, fetch=False):
+    """The stages to run for `targets`, dropping opt-in stages that were not asked for."""
+    if not targets:
+        targets = [stage.name for stage in stages if stage.group not in OPT_IN_GROUPS]
+    selected = select_stages(stages, targets)
+    return [
+        stage
+        for stage in selected
+        if stage.group not in OPT_IN_GROUPS
+        or stage.name in targets
+        or (stage.group == "fetch" and fetch)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="dashdribble", description="Run the DashDribble data pipeline.")
+    parser.add_argument("stages", nargs="*", help="stages to run (with their dependencies)")
+    parser.add_argument("--fetch", action="store_true", help="fetch fresh data from the API first")
+    parser.add_argument("--force", action="store_true", help="run stages even if their inputs are unchanged")
+    parser.add_argument("--workers", type=int, default=4, help="stages run concurrently")
+    parser.add_argument("--parse-workers", type=int, default=None, help="process pool size of the loaders")
+    parser.add_argument("--list", action="store_true", help="list the stages and exit")
+    parser.add_argument("--metrics", help="write metrics here (.prom for Prometheus text, else JSON)")
+    parser.add_argument(
+        "--profile", nargs="+", metavar="STAGE", help="run these stages under cProfile ('all' for every stage)"
+    )
+    args = parser.parse_args()
+
+    client = SharedClient()
+    stages = build_stages(client, args.parse_workers)
+    if args.profile:
+        profiled = [stage.name for stage in stages] if "all" in args.profile else args.profile
+        os.environ["DASHDRIBBLE_PROFILE"] = ",".join(f"stage.{name}" for name in profiled)
+    if args.list:
+        for stage in stages:
+            deps = ", ".join(stage.deps) or "-"
+            print(f"{stage.name:<16} {stage.group:<10} after: {deps}")
+        return
+
+    try:
+        selected = plan(stages, args.stages, args.fetch)
+    except KeyError as e:
+        parser.error(str(e))
+
+    try:
+        report = Pipeline(selected, PipelineState(DB_FILE), args.workers, args.force).run()
+    finally:
+        client.close()
+        metrics.export(args.metrics)
+    report.print()
+    if not report.ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Fixtures and results, one row per match.
+
+`matches` (created by migration v8) holds each match's latest state, keyed
+by the API's match id and indexed by (league_id, matchday, utc_date) for a
+round's fixtures and by team for form. A load diffs the payload against
+the stored rows and writes only the matches whose status, score, winner,
+teams or kick-off changed, so reloading a season mid-round touches a
+handful of rows; each such change is also appended to `match_updates`,
+which is never rewritten.
+
+With `--derive-standings`, the current season's `current_standings` rows
+of the teams in changed matches are recomputed from their results (points,
+goal difference, goals scored order the table; head-to-head tie-breakers
+and point deductions are not modelled), so standings can follow results
+without refetching whole tables.
+
+Usage:
+    python db/scripts/matches.py load [FOLDER] [--derive-standings]
+    python db/scripts/matches.py form TEAM_ID [--last 5]
+    python db/scripts/matches.py h2h TEAM_ID OTHER_TEAM_ID [--last 10]
+"""
+
+import argparse
+import os
+import sqlite3
+from operator import attrgetter
+
+import dotenv
+
+import metrics
+from parallel_ingest import json_files
+from records import INSERT_SQL, Match, RecordError, get_json_data, parse_matches
+from summaries import refresh_league_summaries
+
+dotenv.load_dotenv()
+
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
+DATA_FOLDER = os.getenv("MATCHES_DATA_FOLDER", "data/matches")
+
+# A stored match is rewritten only when one of these differs
+DIFF_COLUMNS = (
+    "matchday", "utc_date", "status", "home_team_id", "away_team_id", "home_score", "away_score", "winner",
+)
+_diff_values = attrgetter(*DIFF_COLUMNS)
+# Statuses whose score counts in the table
+RESULT_STATUSES = ("FINISHED", "AWARDED")
+
+
+def create_matches_tables(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS matches (
+        id INTEGER PRIMARY KEY,
+        league_id INTEGER NOT NULL,
+        season_id INTEGER NOT NULL,
+        matchday INTEGER,
+        utc_date TEXT NOT NULL,
+        status TEXT NOT NULL,
+        stage TEXT,
+        home_team_id INTEGER,
+        away_team_id INTEGER,
+        home_score INTEGER,
+        away_score INTEGER,
+        winner TEXT,
+        last_updated TEXT
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_matches_round
+    ON matches (league_id, matchday, utc_date)
+    """)
+    # Form and head-to-head: a team's matches, newest first
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_matches_home_team
+    ON matches (home_team_id, utc_date)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_matches_away_team
+    ON matches (away_team_id, utc_date)
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS match_updates (
+        id INTEGER PRIMARY KEY,
+        match_id INTEGER NOT NULL,
+        observed_at TEXT NOT NULL DEFAULT (datetime('now')),
+        utc_date TEXT NOT NULL,
+        status TEXT NOT NULL,
+        home_score INTEGER,
+        away_score INTEGER
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_match_updates_match
+    ON match_updates (match_id, observed_at)
+    """)
+
+
+def load_stored_matches(cursor, league_id, season_id):
+    """{match_id: DIFF_COLUMNS values} of a season's stored matches."""
+    cursor.execute(
+        f"SELECT id, {', '.join(DIFF_COLUMNS)} FROM matches WHERE league_id = ? AND season_id = ?",
+        (league_id, season_id),
+    )
+    return {row[0]: row[1:] for row in cursor.fetchall()}
+
+
+def diff_matches(fresh, stored):
+    """The Match records of `fresh` that are new or differ from `stored` in DIFF_COLUMNS."""
+    return [match for match in fresh if stored.get(match.id) != _diff_values(match)]
+
+
+def write_changed_matches(cursor, changed):
+    cursor.executemany(INSERT_SQL[Match], changed)
+    cursor.executemany(
+        "INSERT INTO match_updates (match_id, utc_date, status, home_score, away_score) VALUES (?, ?, ?, ?, ?)",
+        [(m.id, m.utc_date, m.status, m.home_score, m.away_score) for m in changed],
+    )
+
+
+def _team_record(cursor, league_id, season_id, team_id):
+    """(played, won, draw, lost, goals_for, goals_against) of a team's results this season."""
+    statuses = ", ".join("?" for _ in RESULT_STATUSES)
+    cursor.execute(
+        f"""
+        SELECT COUNT(*), COALESCE(SUM(gf > ga), 0), COALESCE(SUM(gf = ga), 0),
+               COALESCE(SUM(gf < ga), 0), COALESCE(SUM(gf), 0), COALESCE(SUM(ga), 0)
+        FROM (
+            SELECT home_score AS gf, away_score AS ga FROM matches
+            WHERE home_team_id = ? AND league_id = ? AND season_id = ?
+              AND status IN ({statuses}) AND home_score IS NOT NULL
+            UNION ALL
+            SELECT away_score, home_score FROM matches
+            WHERE away_team_id = ? AND league_id = ? AND season_id = ?
+              AND status IN ({statuses}) AND away_score IS NOT NULL
+        )
+        """,
+        (team_id, league_id, season_id, *RESULT_STATUSES, team_id, league_id, season_id, *RESULT_STATUSES),
+    )
+    return cursor.fetchone()
+
+
+def derive_standings(cursor, changed):
+    """
+    Recompute the current-season standings rows of every team in `changed`
+    from its results, then the positions of their leagues.
+
+    Returns:
+        set: League ids whose table was rewritten.
+    """
+    current = dict(cursor.execute("SELECT id, current_season_id FROM leagues").fetchall())
+    teams = {}
+    for match in changed:
+        if current.get(match.league_id) != match.season_id:
+            continue
+        for team_id in (match.home_team_id, match.away_team_id):
+            if team_id is not None:
+                teams[team_id] = (match.league_id, match.season_id)
+
+    for team_id, (league_id, season_id) in teams.items():
+        played, won, draw, lost, goals_for, goals_against = _team_record(cursor, league_id, season_id, team_id)
+        cursor.execute(
+            """
+            UPDATE current_standings
+            SET played_games = ?, won = ?, draw = ?, lost = ?, points = ?,
+                goals_for = ?, goals_against = ?, goal_difference = ?
+            WHERE league_id = ? AND team_id = ?
+            """,
+            (played, won, draw, lost, 3 * won + draw, goals_for, goals_against,
+             goals_for - goals_against, league_id, team_id),
+        )
+
+    leagues = {league_id for league_id, _ in teams.values()}
+    for league_id in leagues:
+        cursor.execute(
+            """
+            SELECT team_id FROM current_standings WHERE league_id = ?
+            ORDER BY points DESC, goal_difference DESC, goals_for DESC, team_id
+            """,
+            (league_id,),
+        )
+        cursor.executemany(
+            "UPDATE current_standings SET position = ? WHERE league_id = ? AND team_id = ? AND position IS NOT ?",
+            [(position, league_id, team_id, position) for position, (team_id,) in enumerate(cursor.fetchall(), 1)],
+        )
+    if leagues:
+        refresh_league_summaries(cursor, leagues)
+    return leagues
+
+
+def load_matches(cursor, json_data, derive=False):
+    """
+    Write the changed matches of one `/competitions/{code}/matches` payload
+    (the caller commits).
+
+    Returns:
+        list: The Match records written.
+    """
+    fresh = parse_matches(json_data)
+    changed = []
+    for league_id, season_id in {(m.league_id, m.season_id) for m in fresh}:
+        stored = load_stored_matches(cursor, league_id, season_id)
+        season = [m for m in fresh if m.league_id == league_id and m.season_id == season_id]
+        changed.extend(diff_matches(season, stored))
+    write_changed_matches(cursor, changed)
+    if derive and changed:
+        derive_standings(cursor, changed)
+    return changed
+
+
+def insert_matches(cursor, data_folder, derive=False):
+    """Load every matches file in `data_folder`, writing only the changed matches."""
+    if not os.path.isdir(data_folder):
+        print(f"No matches fetched yet ({data_folder}); run data_matches_fetch.py first.")
+        return
+    parsed = written = 0
+    with metrics.span("insert_matches"):
+        try:
+            for path in json_files(data_folder):
+                json_data = get_json_data(path)
+                if json_data is None:
+                    continue
+                try:
+                    with metrics.span("load"):
+                        changed = load_matches(cursor, json_data, derive)
+                except RecordError as e:
+                    print(f"Error parsing {path}: {e}")
+                    continue
+                matches = len(json_data.get("matches", []))
+                parsed += matches
+                written += len(changed)
+                print(f"{os.path.basename(path)}: {len(changed)} of {matches} matches changed")
+
+            with metrics.span("commit"):
+                cursor.connection.commit()
+        except sqlite3.Error as e:
+            print(f"Database Error inserting matches: {e}")
+            raise
+    metrics.inc("rows_parsed_total", parsed, table="matches")
+    metrics.inc("sqlite_statements_total", written, table="matches")
+    print(f"Matches inserted successfully: {written} of {parsed} changed.")
+
+
+def team_form(cursor, team_id, last=5):
+    """
+    A team's last `last` results, newest first:
+    [(utc_date, opponent_id, 'H' | 'A', goals_for, goals_against, 'W' | 'D' | 'L')].
+    """
+    statuses = ", ".join("?" for _ in RESULT_STATUSES)
+    cursor.execute(
+        f"""
+        SELECT * FROM (
+            SELECT utc_date, away_team_id, 'H', home_score, away_score FROM matches
+            WHERE home_team_id = ? AND status IN ({statuses})
+            ORDER BY utc_date DESC LIMIT ?
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT utc_date, home_team_id, 'A', away_score, home_score FROM matches
+            WHERE away_team_id = ? AND status IN ({statuses})
+            ORDER BY utc_date DESC LIMIT ?
+        )
+        ORDER BY utc_date DESC LIMIT ?
+        """,
+        (team_id, *RESULT_STATUSES, last, team_id, *RESULT_STATUSES, last, last),
+    )
+    return [(*row, _outcome(row[3], row[4])) for row in cursor.fetchall()]
+
+
+def head_to_head(cursor, team_id, other_team_id, last=10):
+    """[(utc_date, home_team_id, away_team_id, home_score, away_score)] of their meetings, newest first."""
+    statuses = ", ".join("?" for _ in RESULT_STATUSES)
+    cursor.execute(
+        f"""
+        SELECT utc_date, home_team_id, away_team_id, home_score, away_score FROM matches
+        WHERE home_team_id = ? AND away_team_id = ? AND status IN ({statuses})
+        UNION ALL
+        SELECT utc_date, home_team_id, away_team_id, home_score, away_score FROM matches
+        WHERE home_team_id = ? AND away_team_id = ? AND status IN ({statuses})
+        ORDER BY utc_date DESC LIMIT ?
+        """,
+        (team_id, other_team_id, *RESULT_STATUSES, other_team_id, team_id, *RESULT_STATUSES, last),
+    )
+    return cursor.fetchall()
+
+
+def _outcome(goals_for, goals_against):
+    if goals_for is None or goals_against is None:
+        return None
+    return "W" if goals_for > goals_against else "D" if goals_for == goals_against else "L"
+
+
+def main():
+    from migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Fixtures and results.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load_parser = commands.add_parser("load", help="load matches JSON files")
+    load_parser.add_argument("folder", nargs="?", default=DATA_FOLDER)
+    load_parser.add_argument(
+        "--derive-standings",
+        action="store_true",
+        help="recompute the current standings of teams whose matches changed",
+    )
+    form_parser = commands.add_parser("form", help="a team's last results")
+    form_parser.add_argument("team_id", type=int)
+    form_parser.add_argument("--last", type=int, default=5)
+    h2h_parser = commands.add_parser("h2h", help="results between two teams")
+    h2h_parser.add_argument("team_id", type=int)
+    h2h_parser.add_argument("other_team_id", type=int)
+    h2h_parser.add_argument("--last", type=int, default=10)
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(DB_FILE)
+    try:
+        migrate(connection)
+        cursor = connection.cursor()
+        if args.command == "load":
+            insert_matches(cursor, args.folder, args.derive_standings)
+            metrics.export()
+        elif args.command == "form":
+            for utc_date, opponent, venue, goals_for, goals_against, outcome in team_form(
+                cursor, args.team_id, args.last
+            ):
+                print(f"{utc_date[:10]} {venue} v {opponent}: {goals_for}-{goals_against} {outcome}")
+        else:
+            for utc_date, home, away, home_score, away_score in head_to_head(
+                cursor, args.team_id, args.other_team_id, args.last
+            ):
+                print(f"{utc_date[:10]} {home} {home_score}-{away_score} {away}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Lightweight spans, counters, gauges and histograms for the fetch, load and
+migrate paths.
+
+    with metrics.span("process_team_data"):
+        ...
+        metrics.inc("rows_parsed_total", len(players), table="players")
+    metrics.observe("http_request_seconds", elapsed, status="200")
+
+Everything is recorded in the process-wide `REGISTRY`. Spans nest per
+thread ("insert_teams/commit") and are aggregated by path into a count,
+total and maximum duration, so a long run stays a few hundred series.
+
+`export()` writes the registry to DASHDRIBBLE_METRICS_FILE at the end of a
+run: Prometheus text format when the name ends in `.prom` (for
+node_exporter's textfile collector), JSON otherwise.
+
+Setting DASHDRIBBLE_PROFILE to a comma-separated list of span names runs
+those spans under cProfile and dumps `<span>.prof` files into
+DASHDRIBBLE_PROFILE_DIR (default `profiles/`); open them with `pstats` or
+snakeviz. Spans inside a profiled span are part of its profile.
+"""
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "dashdribble_"
+# Seconds; wide enough for a 2 ms cached read and a 60 s quota pause
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, ending with +Inf."""
+        running, pairs = 0, []
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            pairs.append((bound, running))
+        pairs.append((float("inf"), self.count))
+        return pairs
+
+
+class Span:
+    def __init__(self, path):
+        self.path = path
+        self.seconds = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.spans = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name):
+        """
+        Time a block under `name`, nested in the thread's enclosing spans.
+        Yields a `Span` whose `seconds` is set when the block exits.
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(name)
+        current = Span("/".join(stack))
+        profile = None
+        if not getattr(self._local, "profiling", False) and name in _profiled_spans():
+            profile = cProfile.Profile()
+            profile.enable()
+            self._local.profiling = True
+        start = time.perf_counter()
+        try:
+            yield current
+        finally:
+            current.seconds = seconds = time.perf_counter() - start
+            stack.pop()
+            if profile is not None:
+                self._local.profiling = False
+                _dump_profile(profile, name)
+            with self._lock:
+                count, total, longest = self.spans.get(current.path, (0, 0.0, 0.0))
+                self.spans[current.path] = (count + 1, total + seconds, max(longest, seconds))
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.spans.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.gauges.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": {_format_bound(b): n for b, n in histogram.cumulative()},
+                    }
+                    for (name, labels), histogram in sorted(self.histograms.items())
+                ],
+                "spans": [
+                    {"path": path, "count": count, "seconds": total, "max_seconds": longest}
+                    for path, (count, total, longest) in sorted(self.spans.items())
+                ],
+            }
+
+    def to_prometheus(self):
+        """The registry in the Prometheus text exposition format."""
+        data = self.to_dict()
+        lines = []
+
+        def family(name, kind):
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+        for kind, entries in (("counter", data["counters"]), ("gauge", data["gauges"])):
+            seen = set()
+            for entry in entries:
+                if entry["name"] not in seen:
+                    seen.add(entry["name"])
+                    family(entry["name"], kind)
+                lines.append(f"{PREFIX}{entry['name']}{_labels(entry['labels'])} {entry['value']}")
+
+        seen = set()
+        for entry in data["histograms"]:
+            name = entry["name"]
+            if name not in seen:
+                seen.add(name)
+                family(name, "histogram")
+            for bound, count in entry["buckets"].items():
+                labels = _labels({**entry["labels"], "le": bound})
+                lines.append(f"{PREFIX}{name}_bucket{labels} {count}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(entry['labels'])} {entry['sum']}")
+            lines.append(f"{PREFIX}{name}_count{_labels(entry['labels'])} {entry['count']}")
+
+        if data["spans"]:
+            for suffix, field, kind in (
+                ("span_seconds_total", "seconds", "counter"),
+                ("span_count_total", "count", "counter"),
+                ("span_max_seconds", "max_seconds", "gauge"),
+            ):
+                family(suffix, kind)
+                for entry in data["spans"]:
+                    lines.append(f"{PREFIX}{suffix}{_labels({'span': entry['path']})} {entry[field]}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the registry to `path` atomically, as Prometheus text for `.prom` files."""
+        if path.endswith(".prom"):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.to_dict(), indent=2)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _profiled_spans():
+    return {name.strip() for name in os.getenv("DASHDRIBBLE_PROFILE", "").split(",") if name.strip()}
+
+
+def _dump_profile(profile, name):
+    profile.disable()
+    directory = os.getenv("DASHDRIBBLE_PROFILE_DIR", "profiles")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name.replace('/', '_')}.prof")
+    profile.dump_stats(path)
+    print(f"Profile of {name} written to {path}")
+
+
+REGISTRY = Registry()
+
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set
+observe = REGISTRY.observe
+span = REGISTRY.span
+
+
+def export(path=None):
+    """
+    Write the registry to `path` or DASHDRIBBLE_METRICS_FILE.
+
+    Returns:
+        str | None: The file written, or None when no file is configured.
+    """
+    path = path or os.getenv("DASHDRIBBLE_METRICS_FILE")
+    if not path:
+        return None
+    REGISTRY.write(path)
+    print(f"Metrics written to {path}")
+    return path
@@ -0,0 +1,319 @@
+"""
+Versioned schema migrations for the DashDribble SQLite store.
+
+This module owns the full schema. The applied version is kept in
+`PRAGMA user_version`; `migrate` applies every pending migration in order,
+each in its own transaction. Databases created by the old per-script
+`CREATE TABLE` statements are adopted by the baseline migration.
+
+Usage:
+    python db/scripts/migrations.py [--status] [--target VERSION]
+"""
+
+import argparse
+import os
+import sqlite3
+
+import dotenv
+
+from matches import create_matches_tables
+from search_index import rebuild_search_index
+from standings_history import create_history_table, create_snapshots_table
+from summaries import create_summary_tables, rebuild_summaries
+
+dotenv.load_dotenv()
+
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
+
+
+def _add_missing_columns(cursor, table, columns):
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, definition in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def baseline_schema(cursor):
+    """v1: every table the loaders write to, including the leagues area_* columns."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS leagues (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        code TEXT,
+        emblem TEXT,
+        current_season_id INTEGER,
+        current_matchday INTEGER,
+        area_id INTEGER,
+        area_name TEXT,
+        area_code TEXT,
+        area_flag TEXT
+    )
+    """)
+    _add_missing_columns(
+        cursor,
+        "leagues",
+        [
+            ("current_season_id", "INTEGER"),
+            ("current_matchday", "INTEGER"),
+            ("area_id", "INTEGER"),
+            ("area_name", "TEXT"),
+            ("area_code", "TEXT"),
+            ("area_flag", "TEXT"),
+        ],
+    )
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS league_teams (
+        id INTEGER PRIMARY KEY,
+        league_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        short_name TEXT,
+        tla TEXT,
+        crest TEXT,
+        FOREIGN KEY (league_id) REFERENCES leagues (id)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS current_standings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        league_id INTEGER NOT NULL,
+        team_id INTEGER NOT NULL,
+        position INTEGER,
+        played_games INTEGER,
+        won INTEGER,
+        draw INTEGER,
+        lost INTEGER,
+        points INTEGER,
+        goals_for INTEGER,
+        goals_against INTEGER,
+        goal_difference INTEGER,
+        FOREIGN KEY (league_id) REFERENCES leagues (id),
+        FOREIGN KEY (team_id) REFERENCES league_teams (id)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS coaches (
+        id INTEGER PRIMARY KEY,
+        team_id INTEGER,
+        name TEXT,
+        first_name TEXT,
+        last_name TEXT,
+        date_of_birth TEXT,
+        nationality TEXT,
+        contract_start TEXT,
+        contract_until TEXT,
+        FOREIGN KEY (team_id) REFERENCES league_teams (id)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS players (
+        id INTEGER PRIMARY KEY,
+        team_id INTEGER,
+        name TEXT,
+        position TEXT,
+        date_of_birth TEXT,
+        nationality TEXT,
+        FOREIGN KEY (team_id) REFERENCES league_teams (id)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS stadiums (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        team_id INTEGER,
+        venue_name TEXT,
+        FOREIGN KEY (team_id) REFERENCES league_teams (id)
+    )
+    """)
+
+
+def natural_keys_and_indexes(cursor):
+    """
+    v2: natural-key uniqueness and indexes for the dashboard's access paths.
+
+    Duplicate standings/stadium rows left by earlier re-runs are collapsed
+    before the unique indexes are created. The old loader also inserted the
+    HOME and AWAY tables after TOTAL, so for standings the row kept is the
+    one with the most games played (the TOTAL row), newest first.
+    """
+    cursor.execute("""
+    DELETE FROM current_standings
+    WHERE id NOT IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY league_id, team_id ORDER BY played_games DESC, id DESC
+            ) AS keep
+            FROM current_standings
+        )
+        WHERE keep = 1
+    )
+    """)
+    cursor.execute("""
+    DELETE FROM stadiums
+    WHERE id NOT IN (
+        SELECT MAX(id) FROM stadiums GROUP BY team_id, venue_name
+    )
+    """)
+
+    # Natural keys
+    cursor.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_current_standings_league_team
+    ON current_standings (league_id, team_id)
+    """)
+    cursor.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_stadiums_team_venue
+    ON stadiums (team_id, venue_name)
+    """)
+
+    # League table ordered by position, covering the columns the table view shows
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_current_standings_league_position
+    ON current_standings (
+        league_id, position, team_id, played_games, won, draw, lost,
+        points, goals_for, goals_against, goal_difference
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_league_teams_league
+    ON league_teams (league_id)
+    """)
+    # Squad list by team
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_players_team
+    ON players (team_id, position, name)
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_coaches_team
+    ON coaches (team_id)
+    """)
+
+
+def search_index(cursor):
+    """
+    v3: FTS5 name index over players, teams, coaches and stadiums.
+
+    Accents are folded by the tokenizer (remove_diacritics 2) and prefix
+    indexes make short prefix queries cheap. The loaders keep it current
+    with search_index.reindex_teams.
+    """
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5 (
+        name,
+        kind UNINDEXED,
+        entity_id UNINDEXED,
+        team_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """)
+    rebuild_search_index(cursor)
+
+
+def summary_tables(cursor):
+    """v4: load-time summary tables (see summaries.py), populated from the current data."""
+    create_summary_tables(cursor)
+    rebuild_summaries(cursor)
+
+
+def simulation_results(cursor):
+    """v6: cache of Monte Carlo odds per (league, params, matchday); see simulation.py."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS simulation_results (
+        league_id INTEGER NOT NULL,
+        matchday INTEGER NOT NULL,
+        params_key TEXT NOT NULL,
+        standings_hash TEXT NOT NULL,
+        team_id INTEGER NOT NULL,
+        expected_points REAL NOT NULL,
+        expected_position REAL NOT NULL,
+        title_odds REAL NOT NULL,
+        top_four_odds REAL NOT NULL,
+        relegation_odds REAL NOT NULL,
+        position_odds TEXT NOT NULL,
+        created_at TEXT NOT NULL DEFAULT (datetime('now')),
+        PRIMARY KEY (league_id, params_key, matchday, team_id)
+    ) WITHOUT ROWID
+    """)
+
+
+def pipeline_runs(cursor):
+    """v7: input fingerprint of each pipeline stage's last successful run; see pipeline.py."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS pipeline_runs (
+        stage TEXT PRIMARY KEY,
+        fingerprint TEXT,
+        seconds REAL NOT NULL,
+        finished_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+    """)
+
+
+# (version, description, migration); versions are applied in order
+MIGRATIONS = [
+    (1, "baseline schema", baseline_schema),
+    (2, "natural keys and access-path indexes", natural_keys_and_indexes),
+    (3, "full-text name search index", search_index),
+    (4, "load-time summary tables", summary_tables),
+    (5, "historical standings snapshots", create_history_table),
+    (6, "simulation results cache", simulation_results),
+    (7, "pipeline stage fingerprints", pipeline_runs),
+    (8, "fixtures and results", create_matches_tables),
+    (9, "recorded standings snapshots", create_snapshots_table),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(connection):
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(connection, target=LATEST_VERSION):
+    """
+    Apply every migration above the database's version up to `target`.
+
+    Returns:
+        int: The schema version after migrating.
+    """
+    version = current_version(connection)
+    for migration_version, description, migration in MIGRATIONS:
+        if migration_version <= version or migration_version > target:
+            continue
+        try:
+            with connection:
+                cursor = connection.cursor()
+                if not connection.in_transaction:
+                    cursor.execute("BEGIN")
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {migration_version}")
+        except sqlite3.Error as e:
+            print(f"Migration {migration_version} ({description}) failed: {e}")
+            raise
+        print(f"Applied migration {migration_version}: {description}")
+        version = migration_version
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply DashDribble schema migrations.")
+    parser.add_argument("--status", action="store_true", help="print the schema version and exit")
+    parser.add_argument("--target", type=int, default=LATEST_VERSION)
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(DB_FILE)
+    try:
+        if args.status:
+            print(f"Schema version {current_version(connection)} (latest {LATEST_VERSION})")
+            return
+        version = migrate(connection, args.target)
+        print(f"Schema is at version {version}.")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
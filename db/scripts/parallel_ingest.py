@@ -0,0 +1,63 @@
+"""
+Helpers for loading a folder of JSON files with a process pool.
+
+Workers decode and normalise one file each into plain row tuples; the
+calling process is the single writer that bulk-inserts them into SQLite.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import metrics
+
+
+class StageTimings:
+    """Accumulates wall-clock time per named loader stage, recorded as metrics spans too."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            with metrics.span(name):
+                yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def report(self, title):
+        total = sum(self.stages.values())
+        print(f"{title} stage timings:")
+        for name, seconds in self.stages.items():
+            print(f"  {name:<10} {seconds * 1000:10.1f} ms")
+        print(f"  {'total':<10} {total * 1000:10.1f} ms")
+
+
+# Payload files the loaders read; see payload_archive.py for the compressed ones
+JSON_SUFFIXES = (".json", ".json.gz")
+
+
+def json_files(data_folder):
+    return sorted(
+        os.path.join(data_folder, filename)
+        for filename in os.listdir(data_folder)
+        if filename.endswith(JSON_SUFFIXES)
+    )
+
+
+def map_files(parse_file, paths, workers=None):
+    """
+    Yield `parse_file(path)` for every path, in order.
+
+    With more than one worker the files are parsed on a process pool;
+    `parse_file` must be a module-level function so it can be pickled.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(paths) <= 1:
+        yield from map(parse_file, paths)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        yield from executor.map(parse_file, paths)
@@ -0,0 +1,299 @@
+"""
+Content-addressed archive of every API response we fetch.
+
+Each distinct response body is stored once, gzip-compressed, under its
+SHA-256 (`objects/ab/ab12....json.gz`), and every fetch adds one row to a
+small SQLite index:
+
+    fetches(endpoint, params, fetched_at, hash)
+
+so a response that has not changed since the last fetch costs an index
+row and no disk. The working copies in data/ still hold the latest
+payloads; the archive keeps every earlier one.
+
+`checkout` rebuilds the loaders' folder layout as of any moment (the
+latest payload per endpoint fetched at or before it) as `.json.gz` and
+`.ndjson.gz` files that the loaders stream through gzip, so a past
+matchday or season can be replayed without decompressing the archive.
+Payloads fetched for a past season (`?season=2023`, e.g. by job_queue.py)
+go under `{season}/`, the layout job_queue.py writes:
+
+    python db/scripts/payload_archive.py stats
+    python db/scripts/payload_archive.py history competition/PL/standings
+    python db/scripts/payload_archive.py checkout /tmp/replay --at 2025-01-31T23:59:59
+    LEAGUE_TEAMS_DATA_FOLDER=/tmp/replay/current_league_teams python db/scripts/main.py insert_teams
+    python db/scripts/payload_archive.py checkout /tmp/replay --season 2023
+    python db/scripts/standings_history.py backfill /tmp/replay/2023/current_league_teams
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import urllib.parse
+from datetime import datetime, timezone
+
+import dotenv
+
+dotenv.load_dotenv()
+
+ARCHIVE_DIR = os.getenv("PAYLOAD_ARCHIVE_DIR", "data/archive")
+INDEX_FILE = "index.db"
+COMPRESS_LEVEL = 6
+
+# Endpoint -> folder of the loaders' layout; teams go into one NDJSON file
+LAYOUT = [
+    (re.compile(r"competitions?/(?P<code>[A-Z0-9]+)/standings"), "current_league_teams"),
+    (re.compile(r"competitions?/(?P<code>[A-Z0-9]+)/matches"), "matches"),
+    (re.compile(r"competitions?/(?P<code>[A-Z0-9]+)"), "historical_winners"),
+]
+TEAM_ENDPOINT = re.compile(r"teams/(?P<id>\d+)")
+TEAM_DATA_FILE = os.path.join("team_data", "team_data.ndjson.gz")
+
+
+def split_path(path):
+    """API path -> (endpoint, params), e.g. 'competitions/PL/matches?season=2023'."""
+    endpoint, _, params = path.strip("/").partition("?")
+    return endpoint, params
+
+
+def season_of(params):
+    """
+    Season of a fetch's query: '' for none (the current season), the year
+    for `season=YYYY`, or None for any other query, which has no layout.
+    """
+    if not params:
+        return ""
+    query = urllib.parse.parse_qs(params)
+    seasons = query.get("season", [])
+    if len(query) == 1 and len(seasons) == 1 and re.fullmatch(r"\d{4}", seasons[0]):
+        return seasons[0]
+    return None
+
+
+def _timestamp(moment=None):
+    """ISO timestamp in UTC, the index's sort order; naive input is taken as UTC."""
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment)
+    moment = moment or datetime.now(timezone.utc)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+class PayloadArchive:
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        self.stored = 0
+        self.deduplicated = 0
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+        CREATE TABLE IF NOT EXISTS objects (
+            hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            stored_size INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS fetches (
+            id INTEGER PRIMARY KEY,
+            endpoint TEXT NOT NULL,
+            params TEXT NOT NULL DEFAULT '',
+            fetched_at TEXT NOT NULL,
+            hash TEXT NOT NULL REFERENCES objects (hash)
+        );
+        CREATE INDEX IF NOT EXISTS idx_fetches_endpoint
+            ON fetches (endpoint, params, fetched_at);
+        """)
+
+    def object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.json.gz")
+
+    def put(self, path, body, fetched_at=None):
+        """
+        Archive one response body fetched from API `path`.
+
+        Returns:
+            str: The body's SHA-256, its key in the archive.
+        """
+        endpoint, params = split_path(path)
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            known = self._conn.execute("SELECT 1 FROM objects WHERE hash = ?", (digest,)).fetchone()
+            if known is None:
+                object_path = self.object_path(digest)
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                tmp_path = f"{object_path}.tmp"
+                # mtime=0 keeps the compressed bytes a function of the content alone
+                with open(tmp_path, "wb") as raw, gzip.GzipFile(
+                    fileobj=raw, mode="wb", compresslevel=COMPRESS_LEVEL, mtime=0
+                ) as f:
+                    f.write(body)
+                os.replace(tmp_path, object_path)
+                self._conn.execute(
+                    "INSERT INTO objects (hash, size, stored_size) VALUES (?, ?, ?)",
+                    (digest, len(body), os.path.getsize(object_path)),
+                )
+                self.stored += 1
+            else:
+                self.deduplicated += 1
+            self._conn.execute(
+                "INSERT INTO fetches (endpoint, params, fetched_at, hash) VALUES (?, ?, ?, ?)",
+                (endpoint, params, _timestamp(fetched_at), digest),
+            )
+            self._conn.commit()
+        return digest
+
+    def open(self, digest):
+        """The payload as a binary stream, decompressed as it is read."""
+        return gzip.open(self.object_path(digest), "rb")
+
+    def history(self, endpoint, params=""):
+        """[(fetched_at, hash)] of an endpoint, oldest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT fetched_at, hash FROM fetches WHERE endpoint = ? AND params = ? ORDER BY fetched_at, id",
+                (endpoint, params),
+            ).fetchall()
+
+    def latest(self, at=None):
+        """{(endpoint, params): hash} of the last fetch of every endpoint at or before `at`."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT endpoint, params, hash FROM fetches f
+                WHERE id = (
+                    SELECT id FROM fetches
+                    WHERE endpoint = f.endpoint AND params = f.params AND fetched_at <= ?
+                    ORDER BY fetched_at DESC, id DESC LIMIT 1
+                )
+                ORDER BY endpoint, params
+                """,
+                (_timestamp(at) if at else "9999",),
+            ).fetchall()
+        return {(endpoint, params): digest for endpoint, params, digest in rows}
+
+    def checkout(self, directory, at=None, season=None):
+        """
+        Write the loaders' folder layout as of `at` into `directory`, with
+        past seasons' payloads under `{season}/`. With `season`, only that
+        season's payloads are written.
+
+        Competition payloads are hard links to the archived objects (copies
+        across file systems); team payloads are concatenated into one
+        compressed NDJSON file.
+
+        Returns:
+            int: Payloads checked out.
+        """
+        count = 0
+        teams = []
+        for (endpoint, params), digest in self.latest(at).items():
+            payload_season = season_of(params)
+            if payload_season is None or (season is not None and payload_season != str(season)):
+                continue
+            if TEAM_ENDPOINT.fullmatch(endpoint):
+                if season is None and not payload_season:
+                    teams.append(digest)
+                continue
+            for pattern, folder in LAYOUT:
+                match = pattern.fullmatch(endpoint)
+                if match:
+                    target = os.path.join(directory, payload_season, folder, f"{match['code']}.json.gz")
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    _link(self.object_path(digest), target)
+                    count += 1
+                    break
+
+        if season is not None:
+            # Squads are only fetched as of now; a season's replay has none
+            return count
+        target = os.path.join(directory, TEAM_DATA_FILE)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with gzip.open(f"{target}.tmp", "wb", compresslevel=COMPRESS_LEVEL) as out:
+            for digest in teams:
+                with self.open(digest) as f:
+                    body = f.read().strip()
+                if b"\n" in body:
+                    # One payload per line; the API sends compact JSON, but be safe
+                    body = json.dumps(json.loads(body), separators=(",", ":")).encode()
+                out.write(body)
+                out.write(b"\n")
+        os.replace(f"{target}.tmp", target)
+        return count + len(teams)
+
+    def stats(self):
+        with self._lock:
+            fetches, endpoints = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT endpoint || '?' || params) FROM fetches"
+            ).fetchone()
+            objects, size, stored_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM objects"
+            ).fetchone()
+        return {
+            "fetches": fetches,
+            "endpoints": endpoints,
+            "objects": objects,
+            "bytes": size,
+            "stored_bytes": stored_size,
+        }
+
+    def close(self):
+        self._conn.close()
+
+
+def _link(source, target):
+    tmp_path = f"{target}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and replay the API payload archive.")
+    parser.add_argument("--archive", default=ARCHIVE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="fetches, distinct payloads and disk use")
+    history = commands.add_parser("history", help="every fetch of one endpoint")
+    history.add_argument("endpoint")
+    history.add_argument("--params", default="")
+    checkout = commands.add_parser("checkout", help="write the loaders' folder layout as of a moment")
+    checkout.add_argument("out")
+    checkout.add_argument("--at", help="ISO timestamp (UTC); default: now")
+    checkout.add_argument("--season", type=int, help="only the payloads fetched for this season")
+    args = parser.parse_args()
+
+    archive = PayloadArchive(args.archive)
+    try:
+        if args.command == "stats":
+            stats = archive.stats()
+            ratio = stats["bytes"] / stats["stored_bytes"] if stats["stored_bytes"] else 0
+            print(
+                f"{stats['fetches']} fetches of {stats['endpoints']} endpoints, "
+                f"{stats['objects']} distinct payloads: {stats['bytes'] / 2**20:.1f} MiB "
+                f"stored in {stats['stored_bytes'] / 2**20:.1f} MiB ({ratio:.1f}x)"
+            )
+        elif args.command == "history":
+            endpoint, params = split_path(args.endpoint)
+            for fetched_at, digest in archive.history(endpoint, args.params or params):
+                print(f"{fetched_at}  {digest[:16]}")
+        else:
+            count = archive.checkout(args.out, args.at, args.season)
+            season = f" of season {args.season}" if args.season is not None else ""
+            print(f"Checked out {count} payloads{season} as of {args.at or 'now'} into {args.out}")
+    finally:
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+A small DAG scheduler for the data pipeline.
+
+Stages declare their dependencies, the files they read and any shared
+resource they need exclusively (e.g. the SQLite writer). Every stage whose
+dependencies have finished is started on a thread pool, so independent
+branches run concurrently; stages sharing a resource take turns.
+
+A stage is skipped when its input fingerprint (a content hash of its input
+files combined with the fingerprints of its dependencies) matches the one
+recorded after its last successful run. Fingerprints are kept in the
+`pipeline_runs` table of the database, so a fresh database runs everything.
+
+Every stage runs inside a `stage.<name>` metrics span (see metrics.py).
+"""
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import metrics
+
+RAN, SKIPPED, FAILED, BLOCKED = "ran", "skipped", "failed", "blocked"
+
+
+@dataclass
+class Stage:
+    name: str
+    run: object
+    deps: tuple = ()
+    # Files or folders whose contents decide whether the stage must re-run.
+    # None means the stage always runs (e.g. remote fetches); its dependents
+    # should then list the files it writes among their own inputs.
+    inputs: tuple | None = ()
+    resource: str | None = None
+    group: str = "load"
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str
+    seconds: float = 0.0
+    fingerprint: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class RunReport:
+    results: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return all(result.status in (RAN, SKIPPED) for result in self.results.values())
+
+    def print(self):
+        print(f"\n{'stage':<20} {'status':<8} {'seconds':>8}")
+        for result in self.results.values():
+            line = f"{result.name:<20} {result.status:<8} {result.seconds:>8.2f}"
+            if result.error:
+                line += f"  {result.error}"
+            print(line)
+        print(f"{'total (wall)':<29} {self.seconds:>8.2f}")
+
+
+def hash_paths(paths):
+    """Content hash of files, and of every file under folders, in path order."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+            )
+        else:
+            files = [path]
+        for file_path in files:
+            digest.update(file_path.encode())
+            try:
+                with open(file_path, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(block)
+            except FileNotFoundError:
+                digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def select_stages(stages, targets):
+    """`targets` and everything they depend on, in definition order."""
+    by_name = {stage.name: stage for stage in stages}
+    selected = set()
+
+    def visit(name):
+        if name not in by_name:
+            raise KeyError(f"Unknown stage: {name}")
+        if name in selected:
+            return
+        selected.add(name)
+        for dep in by_name[name].deps:
+            visit(dep)
+
+    for target in targets:
+        visit(target)
+    return [stage for stage in stages if stage.name in selected]
+
+
+class Pipeline:
+    def __init__(self, stages, state, workers=4, force=False):
+        """
+        Args:
+            stages: Stages to run; dependencies outside this list count as done.
+            state: Object with `fingerprint(stage)` and `record(stage, fingerprint, seconds)`.
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.state = state
+        self.workers = workers
+        self.force = force
+        self._resources = {}
+        self._fingerprints = {}
+
+    def _resource_lock(self, name):
+        return self._resources.setdefault(name, threading.Lock())
+
+    def _fingerprint(self, stage):
+        if stage.inputs is None:
+            return None
+        parts = [hash_paths(stage.inputs)]
+        for dep in stage.deps:
+            if self._fingerprints.get(dep) is not None:
+                parts.append(self._fingerprints[dep])
+        return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+    def _execute(self, stage):
+        lock = self._resource_lock(stage.resource) if stage.resource else None
+        start = time.perf_counter()
+        if lock:
+            lock.acquire()
+        try:
+            # Fingerprint again: an upstream stage may have rewritten the inputs
+            fingerprint = self._fingerprint(stage)
+            if (
+                not self.force
+                and fingerprint is not None
+                and self.state.fingerprint(stage.name) == fingerprint
+            ):
+                return StageResult(stage.name, SKIPPED, time.perf_counter() - start, fingerprint)
+            try:
+                # Each stage is a span, so DASHDRIBBLE_PROFILE=stage.<name> profiles it
+                with metrics.span(f"stage.{stage.name}"):
+                    stage.run()
+            except Exception as e:
+                return StageResult(
+                    stage.name, FAILED, time.perf_counter() - start, error=f"{type(e).__name__}: {e}"
+                )
+            seconds = time.perf_counter() - start
+            self.state.record(stage.name, fingerprint, seconds)
+            return StageResult(stage.name, RAN, seconds, fingerprint)
+        finally:
+            if lock:
+                lock.release()
+
+    def run(self):
+        report = RunReport()
+        start = time.perf_counter()
+        pending = dict(self.stages)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    deps = [dep for dep in stage.deps if dep in self.stages]
+                    if any(report.results.get(dep) and report.results[dep].status in (FAILED, BLOCKED)
+                           for dep in deps):
+                        report.results[name] = StageResult(name, BLOCKED)
+                        del pending[name]
+                    elif all(dep in report.results for dep in deps):
+                        running[executor.submit(self._execute, stage)] = name
+                        del pending[name]
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result = future.result()
+                    self._fingerprints[name] = result.fingerprint
+                    report.results[name] = result
+
+        report.seconds = time.perf_counter() - start
+        # Report in definition order
+        report.results = {name: report.results[name] for name in self.stages}
+        return report
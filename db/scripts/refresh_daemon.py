@@ -0,0 +1,445 @@
+"""
+Long-running, matchday-aware refresh of standings and squads.
+
+Each competition is polled on its own schedule:
+
+- every `--live` seconds (default 3 min) inside a kick-off window, from the
+  first kick-off to the final whistle of the last game (KICKOFF_WINDOWS);
+- every `--active` seconds (default 30 min) outside one while a round is
+  visibly in progress (teams on different numbers of games played, e.g.
+  a rearranged midweek fixture);
+- otherwise every `--idle` seconds (default 6 h), but never later than the
+  start of the next window.
+
+Requests come out of one per-minute budget shared by every competition.
+Due standings polls go first, highest priority first (earlier entries in
+`competitions`), then competition refreshes and squad refetches get the
+rest. A poll whose payload is unchanged costs one request and nothing
+else; a changed one is applied with delta_refresh (only changed rows are
+written), which bumps the database's stamp and so invalidates the app's
+caches, and re-exports the dashboard snapshot when
+DASHDRIBBLE_SNAPSHOT_DIR is set. A matchday past the one stored in
+`leagues.current_matchday` also refreshes the competition itself.
+
+The clock and the API client are injected; db/benchmarks/sim_refresh.py
+runs a simulated week against a synthetic world on a fake clock.
+
+    python db/scripts/refresh_daemon.py
+    python db/scripts/refresh_daemon.py --windows "sat 11-20, sun 12-19" --live 120
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import dotenv
+
+import metrics
+from data_league_teams_fetch import competitions as COMPETITIONS
+from db_leagues_create import insert_league, parse_json_data as parse_league
+from delta_refresh import STANDINGS_FOLDER, apply_standings, refresh_teams, save_standings
+from fetch_client import DEFAULT_REQUESTS_PER_MINUTE, create_client
+from migrations import migrate
+from records import RecordError, get_json_data
+
+dotenv.load_dotenv()
+
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
+SNAPSHOT_DIR = os.getenv("DASHDRIBBLE_SNAPSHOT_DIR")
+
+# UTC, first to last kick-off hour of the usual European league slots
+KICKOFF_WINDOWS = os.getenv("REFRESH_WINDOWS", "fri 18-20, sat 11-20, sun 11-20, mon 18-20")
+# Kick-off to final whistle, stoppage time and a few minutes for the API to settle
+MATCH_LENGTH = timedelta(hours=2, minutes=15)
+LIVE_INTERVAL = 180
+ACTIVE_INTERVAL = 1800
+IDLE_INTERVAL = 6 * 3600
+# Teams behind the leaders that still count as postponed fixtures, not a round in progress
+POSTPONED_TEAMS = 4
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+class SystemClock:
+    def now(self):
+        return datetime.now(timezone.utc)
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class FakeClock:
+    """A clock that jumps ahead on sleep, for simulations."""
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    async def sleep(self, seconds):
+        self.current += timedelta(seconds=max(seconds, 0))
+        # Let other tasks run, as a real sleep would
+        await asyncio.sleep(0)
+
+
+def parse_windows(spec):
+    """'sat 11-20, sun 12-19' -> [(weekday, first kick-off hour, last kick-off hour)]."""
+    windows = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        match = re.fullmatch(r"(\w{3})\s+(\d{1,2})-(\d{1,2})", part.lower())
+        if match is None or match[1] not in WEEKDAYS:
+            raise ValueError(f"Bad kick-off window {part!r}, expected e.g. 'sat 11-20'")
+        windows.append((WEEKDAYS.index(match[1]), int(match[2]), int(match[3])))
+    return windows
+
+
+class KickoffWindows:
+    def __init__(self, windows, match_length=MATCH_LENGTH):
+        self.windows = windows
+        self.match_length = match_length
+
+    def _spans(self, now):
+        """(start, end) of every window in the weeks around `now`."""
+        monday = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        for week in (-1, 0, 1):
+            for weekday, first, last in self.windows:
+                day = monday + timedelta(weeks=week, days=weekday)
+                yield day + timedelta(hours=first), day + timedelta(hours=last) + self.match_length
+
+    def active(self, now):
+        return any(start <= now < end for start, end in self._spans(now))
+
+    def next_start(self, now):
+        starts = [start for start, _ in self._spans(now) if start > now]
+        return min(starts) if starts else None
+
+
+class QuotaBudget:
+    """Requests per rolling minute on the daemon's clock, shared by every job."""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self._sent = deque()
+
+    def _expire(self, now):
+        while self._sent and now - self._sent[0] >= timedelta(minutes=1):
+            self._sent.popleft()
+
+    def available(self, now):
+        self._expire(now)
+        return self.per_minute - len(self._sent)
+
+    def take(self, now):
+        if self.available(now) <= 0:
+            return False
+        self._sent.append(now)
+        return True
+
+    def next_free(self, now):
+        self._expire(now)
+        if len(self._sent) < self.per_minute:
+            return now
+        return self._sent[0] + timedelta(minutes=1)
+
+
+@dataclass
+class Competition:
+    code: str
+    priority: int
+    next_poll: datetime
+    payload_hash: str | None = None
+    matchday: int | None = None
+    in_progress: bool = False
+
+
+def payload_hash(data):
+    return hashlib.blake2b(json.dumps(data, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def round_in_progress(json_data):
+    """True when enough teams trail the leaders in games played to mean a round is being played."""
+    try:
+        played = [entry["playedGames"] for entry in json_data["standings"][0]["table"]]
+    except (KeyError, IndexError, TypeError):
+        return False
+    if not played:
+        return False
+    return sum(games < max(played) for games in played) > POSTPONED_TEAMS
+
+
+class RefreshDaemon:
+    def __init__(
+        self,
+        client,
+        db_file=DB_FILE,
+        competitions=COMPETITIONS,
+        clock=None,
+        windows=None,
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+        live=LIVE_INTERVAL,
+        active=ACTIVE_INTERVAL,
+        idle=IDLE_INTERVAL,
+        on_change=None,
+    ):
+        self.client = client
+        self.db_file = db_file
+        self.clock = clock or SystemClock()
+        self.windows = windows or KickoffWindows(parse_windows(KICKOFF_WINDOWS))
+        self.budget = QuotaBudget(requests_per_minute)
+        self.intervals = {"live": live, "active": active, "idle": idle}
+        self.on_change = on_change
+        now = self.clock.now()
+        self.competitions = [
+            Competition(code, len(competitions) - i, now) for i, code in enumerate(competitions)
+        ]
+        self.pending_teams = []
+        self.pending_competitions = []
+        # Set when the on_change export failed, so the next step tries it again
+        self.export_pending = False
+        self.requests = 0
+        self._load_state()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file, timeout=60)
+
+    def _load_state(self):
+        """
+        Stored matchdays, so an advance is noticed from the first poll, and
+        the hash of each saved standings payload, so a restart does not
+        reload unchanged standings.
+        """
+        connection = self._connect()
+        try:
+            migrate(connection)
+            matchdays = dict(connection.execute("SELECT code, current_matchday FROM leagues").fetchall())
+        finally:
+            connection.close()
+        for competition in self.competitions:
+            competition.matchday = matchdays.get(competition.code)
+            path = os.path.join(STANDINGS_FOLDER, f"{competition.code}.json")
+            if os.path.exists(path):
+                saved = get_json_data(path)
+                if saved is not None:
+                    competition.payload_hash = payload_hash(saved)
+
+    def next_interval(self, competition, now):
+        """Seconds until `competition` should be polled again."""
+        if self.windows.active(now):
+            return self.intervals["live"]
+        if competition.in_progress:
+            return self.intervals["active"]
+        interval = self.intervals["idle"]
+        next_start = self.windows.next_start(now)
+        if next_start is not None:
+            interval = min(interval, (next_start - now).total_seconds())
+        return max(interval, self.intervals["live"])
+
+    def _request(self, now):
+        if not self.budget.take(now):
+            return False
+        self.requests += 1
+        return True
+
+    async def _fetch(self, path):
+        """The JSON at `path`, or None when the request or its body fails."""
+        try:
+            return await asyncio.to_thread(self.client.get_json, path)
+        except (ValueError, OSError) as e:
+            # requests' errors are OSErrors; the path is polled again on its next interval
+            print(f"{path}: fetch failed: {e}")
+            metrics.inc("refresh_errors_total", job="fetch")
+            return None
+
+    def _apply_standings(self, code, json_data):
+        connection = self._connect()
+        try:
+            with connection:
+                result = apply_standings(connection.cursor(), code, json_data)
+        finally:
+            connection.close()
+        # The saved payload seeds the hash on restart, so it follows the commit
+        try:
+            save_standings(code, json_data)
+        except OSError as e:
+            # Committed all the same; a restart just applies the payload again
+            print(f"{code}: standings applied but not saved: {e}")
+        return result
+
+    def _apply_competition(self, json_data):
+        league = parse_league(json_data)
+        if league is None:
+            return
+        connection = self._connect()
+        try:
+            with connection:
+                insert_league(connection.cursor(), league)
+        finally:
+            connection.close()
+
+    def _refresh_teams(self, team_ids):
+        connection = self._connect()
+        try:
+            return refresh_teams(self.client, connection, team_ids)
+        finally:
+            connection.close()
+
+    async def poll(self, competition):
+        """Fetch one competition's standings and apply them if they changed."""
+        json_data = await self._fetch(f"competition/{competition.code}/standings")
+        now = self.clock.now()
+        if json_data is None:
+            metrics.inc("refresh_polls_total", competition=competition.code, result="failed")
+            return False
+
+        digest = payload_hash(json_data)
+        competition.in_progress = round_in_progress(json_data)
+        if digest == competition.payload_hash:
+            metrics.inc("refresh_polls_total", competition=competition.code, result="unchanged")
+            return False
+
+        try:
+            changed_rows, refetch = await asyncio.to_thread(self._apply_standings, competition.code, json_data)
+        except (RecordError, sqlite3.Error) as e:
+            # Nothing was kept; the hash stays, so the next poll tries again
+            print(f"{now:%a %H:%M} {competition.code}: standings not applied: {e}")
+            metrics.inc("refresh_polls_total", competition=competition.code, result="failed")
+            return False
+        competition.payload_hash = digest
+        metrics.inc("refresh_polls_total", competition=competition.code, result="changed")
+        self.pending_teams.extend(t for t in refetch if t not in self.pending_teams)
+
+        matchday = (json_data.get("season") or {}).get("currentMatchday")
+        if matchday is not None and (competition.matchday is None or matchday > competition.matchday):
+            competition.matchday = matchday
+            if competition.code not in self.pending_competitions:
+                self.pending_competitions.append(competition.code)
+        print(f"{now:%a %H:%M} {competition.code}: standings changed ({len(changed_rows)} rows)")
+        return bool(changed_rows)
+
+    async def _changed(self):
+        """The database changed: the app's caches follow its stamp; refresh derived exports."""
+        if self.on_change is None:
+            return
+        try:
+            await asyncio.to_thread(self.on_change)
+            self.export_pending = False
+        except Exception as e:
+            # The callback is the caller's; keep refreshing and retry it next step
+            print(f"Export after a change failed: {e}")
+            metrics.inc("refresh_errors_total", job="export")
+            self.export_pending = True
+
+    async def step(self):
+        """
+        Run every job that is due and the budget allows.
+
+        Returns:
+            datetime: When the next job is due.
+        """
+        changed = False
+        now = self.clock.now()
+        due = sorted(
+            (c for c in self.competitions if c.next_poll <= now),
+            key=lambda c: (-c.priority, c.next_poll),
+        )
+        for competition in due:
+            if not self._request(self.clock.now()):
+                break
+            changed |= await self.poll(competition)
+            now = self.clock.now()
+            competition.next_poll = now + timedelta(seconds=self.next_interval(competition, now))
+
+        while self.pending_competitions and self._request(self.clock.now()):
+            code = self.pending_competitions.pop(0)
+            json_data = await self._fetch(f"competition/{code}")
+            if json_data is not None:
+                try:
+                    await asyncio.to_thread(self._apply_competition, json_data)
+                    changed = True
+                except (sqlite3.Error, OSError) as e:
+                    print(f"{code}: competition not refreshed: {e}")
+                    metrics.inc("refresh_errors_total", job="competition")
+
+        batch = []
+        while self.pending_teams and self._request(self.clock.now()):
+            batch.append(self.pending_teams.pop(0))
+        if batch:
+            try:
+                changed |= await asyncio.to_thread(self._refresh_teams, batch) > 0
+            except (RecordError, sqlite3.Error, OSError) as e:
+                # The next standings change queues the teams again
+                print(f"{len(batch)} teams not refreshed: {e}")
+                metrics.inc("refresh_errors_total", job="teams")
+
+        if changed or self.export_pending:
+            await self._changed()
+
+        now = self.clock.now()
+        wake = min(c.next_poll for c in self.competitions)
+        if self.pending_teams or self.pending_competitions or any(c.next_poll <= now for c in self.competitions):
+            wake = min(wake, self.budget.next_free(now))
+        return max(wake, now)
+
+    async def run(self, until=None):
+        """Refresh until `until` (forever by default)."""
+        while until is None or self.clock.now() < until:
+            wake = await self.step()
+            if until is not None:
+                wake = min(wake, until)
+            await self.clock.sleep((wake - self.clock.now()).total_seconds())
+
+
+def export_snapshot():
+    from snapshots import export_snapshot as export
+
+    connection = sqlite3.connect(DB_FILE)
+    try:
+        written, _ = export(connection, SNAPSHOT_DIR)
+    finally:
+        connection.close()
+    print(f"Snapshot: {len(written)} datasets rewritten")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh standings and squads around kick-off times.")
+    parser.add_argument("--windows", default=KICKOFF_WINDOWS, help="UTC kick-off windows, e.g. 'sat 11-20, sun 12-19'")
+    parser.add_argument("--live", type=int, default=LIVE_INTERVAL, help="seconds between polls in a window")
+    parser.add_argument("--active", type=int, default=ACTIVE_INTERVAL, help="seconds between polls mid-round")
+    parser.add_argument("--idle", type=int, default=IDLE_INTERVAL, help="longest gap between polls")
+    parser.add_argument("--once", action="store_true", help="poll every competition once and exit")
+    args = parser.parse_args()
+
+    with create_client() as client:
+        daemon = RefreshDaemon(
+            client,
+            windows=KickoffWindows(parse_windows(args.windows)),
+            requests_per_minute=client.requests_per_minute,
+            live=args.live,
+            active=args.active,
+            idle=args.idle,
+            on_change=export_snapshot if SNAPSHOT_DIR else None,
+        )
+        start = time.monotonic()
+        try:
+            if args.once:
+                asyncio.run(daemon.step())
+            else:
+                asyncio.run(daemon.run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print(f"{daemon.requests} requests in {time.monotonic() - start:.0f}s")
+            client.report_cache()
+            metrics.export()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    etag: str | None
+    last_modified: str | None
+    body: bytes
+
+    def validators(self):
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache keyed by URL.
+
+    Entries keep the body together with the ETag / Last-Modified validators
+    so the next fetch can be sent as a conditional GET. The cache is a single
+    SQLite file capped at `max_bytes`; the least recently used entries are
+    evicted first.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_http_cache_last_used ON http_cache (last_used)"
+        )
+        self._conn.commit()
+
+    def lookup(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedResponse(url, row[0], row[1], row[2])
+
+    def store(self, url, etag, last_modified, body):
+        """Save a fresh 200 response. Responses without validators are not cached."""
+        with self._lock:
+            self.misses += 1
+            if not etag and not last_modified:
+                return
+            self._conn.execute(
+                """
+                INSERT INTO http_cache (url, etag, last_modified, body, size, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    body = excluded.body,
+                    size = excluded.size,
+                    last_used = excluded.last_used
+                """,
+                (url, etag, last_modified, body, len(body), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def revalidated(self, entry):
+        """Record a 304 for `entry` and mark it as recently used."""
+        with self._lock:
+            # fetch_many workers revalidate concurrently; the counters share the lock
+            self.hits += 1
+            self.bytes_saved += len(entry.body)
+            self._conn.execute(
+                "UPDATE http_cache SET last_used = ? WHERE url = ?", (time.time(), entry.url)
+            )
+            self._conn.commit()
+
+    def discard(self, url):
+        """Drop the entry for `url`, e.g. when its body no longer decodes."""
+        with self._lock:
+            self._conn.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT url, size FROM http_cache ORDER BY last_used"
+        ).fetchall()
+        evicted = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((url,))
+            total -= size
+        self._conn.executemany("DELETE FROM http_cache WHERE url = ?", evicted)
+
+    def stats(self):
+        with self._lock:
+            hits, misses, bytes_saved = self.hits, self.misses, self.bytes_saved
+        requests_made = hits + misses
+        hit_rate = hits / requests_made if requests_made else 0.0
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hit_rate,
+            "bytes_saved": bytes_saved,
+        }
+
+    def close(self):
+        self._conn.close()
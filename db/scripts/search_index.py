@@ -0,0 +1,67 @@
+"""
+Maintenance of the `search_index` FTS5 table (created by migration v3).
+
+Each row's rowid encodes its source table (entity id * 4 + kind code), so
+re-indexing a row is an INSERT OR REPLACE. Loaders re-index the teams they
+touched with one statement per kind and batch; per-row triggers would make
+FTS5 flush a segment for every inserted row.
+
+Usage (full rebuild):
+    python db/scripts/search_index.py
+"""
+
+import json
+import sqlite3
+
+# (kind, kind code, table, name column, team id column)
+SEARCH_SOURCES = [
+    ("player", 0, "players", "name", "team_id"),
+    ("team", 1, "league_teams", "name", "id"),
+    ("coach", 2, "coaches", "name", "team_id"),
+    ("stadium", 3, "stadiums", "venue_name", "team_id"),
+]
+SEARCH_KINDS = len(SEARCH_SOURCES)
+
+
+def _select_sql(kind, code, table, name_column, team_column):
+    return (
+        f"INSERT OR REPLACE INTO search_index (rowid, name, kind, entity_id, team_id) "
+        f"SELECT id * {SEARCH_KINDS} + {code}, {name_column}, '{kind}', id, {team_column} "
+        f"FROM {table}"
+    )
+
+
+def reindex_teams(cursor, team_ids):
+    """Re-index every player, coach, stadium and team row of `team_ids`."""
+    team_ids = json.dumps(sorted({int(team_id) for team_id in team_ids}))
+    for source in SEARCH_SOURCES:
+        team_column = source[4]
+        cursor.execute(
+            f"{_select_sql(*source)} WHERE {team_column} IN (SELECT value FROM json_each(?))",
+            (team_ids,),
+        )
+
+
+def rebuild_search_index(cursor):
+    """Drop and rebuild the whole index from the source tables."""
+    cursor.execute("DELETE FROM search_index")
+    for source in SEARCH_SOURCES:
+        cursor.execute(_select_sql(*source))
+
+
+def main():
+    from migrations import DB_FILE, migrate
+
+    connection = sqlite3.connect(DB_FILE)
+    try:
+        migrate(connection)
+        with connection:
+            rebuild_search_index(connection.cursor())
+        count = connection.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+        print(f"Rebuilt the search index ({count} names).")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
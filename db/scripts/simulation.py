@@ -0,0 +1,266 @@
+"""
+Monte Carlo season simulator with cached odds.
+
+Projects every team's final position, title, top-four and relegation odds
+by simulating the remaining games (see analytics.simulate_league). A run
+is split into shards that execute on a process pool; each shard's seed is
+spawned from (params seed, league id), so the result depends only on the
+parameters, never on the number of workers.
+
+Results are cached in `simulation_results` (migration v6) per (league,
+matchday, params key), together with a hash of the league's standings.
+A cached result is reused until new standings are loaded, so the app only
+ever reads precomputed odds; run this script after each load.
+
+Usage:
+    python db/scripts/simulation.py [--simulations N] [--shards N] [--workers N]
+                                    [--strength ppg|elo] [--seed N] [--force]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+
+import dotenv
+import numpy as np
+import pandas as pd
+
+from analytics import STANDINGS_SQL, elo_ratings, league_arrays, load_frames, simulate_league
+from migrations import migrate
+
+dotenv.load_dotenv()
+
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
+
+RESULT_COLUMNS = (
+    "team_id",
+    "expected_points",
+    "expected_position",
+    "title_odds",
+    "top_four_odds",
+    "relegation_odds",
+    "position_odds",
+)
+
+
+@dataclass(frozen=True)
+class SimulationParams:
+    simulations: int = 10_000
+    shards: int = 8
+    seed: int = 0
+    strength: str = "ppg"
+    relegation_places: int = 3
+
+    def key(self):
+        """Stable cache key; the shard count is part of it because it changes the draws."""
+        return hashlib.blake2b(
+            json.dumps(asdict(self), sort_keys=True).encode(), digest_size=8
+        ).hexdigest()
+
+
+DEFAULT_PARAMS = SimulationParams()
+
+
+def standings_hash(league):
+    """Fingerprint of one league's standings frame; changes whenever new standings are loaded."""
+    columns = ["team_id", "played_games", "won", "draw", "lost", "points", "goal_difference"]
+    rows = league.sort_values("team_id")[columns].to_numpy().tolist()
+    return hashlib.blake2b(repr(rows).encode(), digest_size=12).hexdigest()
+
+
+def league_matchday(cursor, league):
+    """The league's current matchday, or the most games played if it is unknown."""
+    cursor.execute("SELECT current_matchday FROM leagues WHERE id = ?", (int(league["league_id"].iloc[0]),))
+    row = cursor.fetchone()
+    if row and row[0] is not None:
+        return row[0]
+    return int(league["played_games"].max())
+
+
+def _shard_sizes(simulations, shards):
+    shards = max(1, min(shards, simulations))
+    base, extra = divmod(simulations, shards)
+    return [base + (i < extra) for i in range(shards)]
+
+
+def simulate_shard(arrays, simulations, seed):
+    """
+    Worker: simulate one shard of a league.
+
+    Returns:
+        tuple: (position counts of shape (teams, teams), summed final points per team)
+    """
+    points, goal_difference, remaining, probabilities = arrays
+    rng = np.random.default_rng(seed)
+    final_points, positions = simulate_league(
+        points, goal_difference, remaining, probabilities, simulations, rng
+    )
+    teams = len(points)
+    cells = np.arange(teams) * teams + (positions - 1)
+    counts = np.bincount(cells.ravel(), minlength=teams * teams).reshape(teams, teams)
+    return counts, final_points.sum(axis=0)
+
+
+def summarise(team_ids, counts, points_sum, simulations, relegation_places):
+    """Turn merged shard results into one result row per team."""
+    teams = len(team_ids)
+    odds = counts / simulations
+    places = np.arange(1, teams + 1)
+    relegated = odds[:, max(teams - relegation_places, 0):].sum(axis=1)
+    return pd.DataFrame(
+        {
+            "team_id": team_ids,
+            "expected_points": points_sum / simulations,
+            "expected_position": odds @ places,
+            "title_odds": odds[:, 0],
+            "top_four_odds": odds[:, :4].sum(axis=1),
+            "relegation_odds": relegated,
+            "position_odds": [json.dumps(np.round(row, 4).tolist()) for row in odds],
+        }
+    )
+
+
+def run_simulations(leagues, params, ratings=None, workers=1):
+    """
+    Simulate every league frame in `leagues` with `params`.
+
+    Returns:
+        dict: {league_id: per-team result frame}
+    """
+    tasks = []
+    for league in leagues:
+        league_id = int(league["league_id"].iloc[0])
+        arrays = league_arrays(league, params.strength, ratings)
+        sizes = _shard_sizes(params.simulations, params.shards)
+        seeds = np.random.SeedSequence([params.seed, league_id]).spawn(len(sizes))
+        tasks.extend((league_id, arrays, size, seed) for size, seed in zip(sizes, seeds))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            shard_results = list(
+                executor.map(simulate_shard, *zip(*[task[1:] for task in tasks]))
+            )
+    else:
+        shard_results = [simulate_shard(*task[1:]) for task in tasks]
+
+    merged = {}
+    for (league_id, *_), (counts, points_sum) in zip(tasks, shard_results):
+        if league_id in merged:
+            merged[league_id] = (merged[league_id][0] + counts, merged[league_id][1] + points_sum)
+        else:
+            merged[league_id] = (counts, points_sum)
+
+    return {
+        int(league["league_id"].iloc[0]): summarise(
+            league["team_id"].to_numpy(),
+            *merged[int(league["league_id"].iloc[0])],
+            params.simulations,
+            params.relegation_places,
+        )
+        for league in leagues
+    }
+
+
+def cached_results(cursor, league_id, matchday, params, fingerprint):
+    cursor.execute(
+        f"""
+        SELECT {", ".join(RESULT_COLUMNS)} FROM simulation_results
+        WHERE league_id = ? AND params_key = ? AND matchday = ? AND standings_hash = ?
+        ORDER BY expected_position
+        """,
+        (league_id, params.key(), matchday, fingerprint),
+    )
+    rows = cursor.fetchall()
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS) if rows else None
+
+
+def store_results(cursor, league_id, matchday, params, fingerprint, results):
+    """Replace every cached result of this league and params with `results`."""
+    cursor.execute(
+        "DELETE FROM simulation_results WHERE league_id = ? AND params_key = ?",
+        (league_id, params.key()),
+    )
+    cursor.executemany(
+        f"""
+        INSERT INTO simulation_results (league_id, matchday, params_key, standings_hash, {", ".join(RESULT_COLUMNS)})
+        VALUES (?, ?, ?, ?, {", ".join("?" for _ in RESULT_COLUMNS)})
+        """,
+        [
+            (league_id, matchday, params.key(), fingerprint, *row)
+            for row in results[list(RESULT_COLUMNS)].astype(object).itertuples(index=False, name=None)
+        ],
+    )
+
+
+def project_leagues(connection, params=DEFAULT_PARAMS, workers=1, force=False):
+    """
+    Odds for every league with standings, from the cache where the
+    standings are unchanged and freshly simulated otherwise.
+
+    Returns:
+        dict: {league_id: per-team result frame ordered by expected position}
+    """
+    cursor = connection.cursor()
+    standings = pd.read_sql_query(STANDINGS_SQL, connection)
+    results, stale = {}, []
+    for league_id, league in standings.groupby("league_id", sort=True):
+        league_id = int(league_id)
+        matchday = league_matchday(cursor, league)
+        fingerprint = standings_hash(league)
+        cached = None if force else cached_results(cursor, league_id, matchday, params, fingerprint)
+        if cached is not None:
+            results[league_id] = cached
+        else:
+            stale.append((league, matchday, fingerprint))
+
+    if stale:
+        ratings = None
+        if params.strength == "elo":
+            frames = load_frames(connection)
+            ratings = elo_ratings(frames.history, frames.standings)
+        simulated = run_simulations([league for league, *_ in stale], params, ratings, workers)
+        with connection:
+            for league, matchday, fingerprint in stale:
+                league_id = int(league["league_id"].iloc[0])
+                store_results(cursor, league_id, matchday, params, fingerprint, simulated[league_id])
+                results[league_id] = simulated[league_id].sort_values("expected_position")
+
+    print(f"Odds for {len(results)} leagues: {len(results) - len(stale)} cached, {len(stale)} simulated.")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the rest of the season and cache the odds.")
+    parser.add_argument("--simulations", type=int, default=DEFAULT_PARAMS.simulations)
+    parser.add_argument("--shards", type=int, default=DEFAULT_PARAMS.shards)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--strength", choices=("ppg", "elo"), default=DEFAULT_PARAMS.strength)
+    parser.add_argument("--seed", type=int, default=DEFAULT_PARAMS.seed)
+    parser.add_argument("--relegation-places", type=int, default=DEFAULT_PARAMS.relegation_places)
+    parser.add_argument("--force", action="store_true", help="ignore cached results")
+    args = parser.parse_args()
+
+    params = SimulationParams(
+        simulations=args.simulations,
+        shards=args.shards,
+        seed=args.seed,
+        strength=args.strength,
+        relegation_places=args.relegation_places,
+    )
+
+    connection = sqlite3.connect(DB_FILE)
+    try:
+        migrate(connection)
+        for league_id, results in project_leagues(connection, params, args.workers, args.force).items():
+            print(f"\nLeague {league_id}")
+            print(results.drop(columns="position_odds").round(3).to_string(index=False))
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
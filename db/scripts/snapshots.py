@@ -0,0 +1,245 @@
+"""
+Columnar snapshots of the database for the dashboard.
+
+Every plain table, plus a few derived datasets, is written to one Arrow
+IPC (default) or Parquet file, and `manifest.json` lists them:
+
+    {"version": 12, "created_at": "...", "format": "arrow",
+     "datasets": {"players": {"file": "players.3f9c2a1b7d0e.arrow",
+                              "hash": "...", "rows": 1234, "bytes": 56789,
+                              "columns": [...]}, ...}}
+
+Arrow files are uncompressed so the app can memory-map them and read
+columns zero-copy; Parquet files are zstd-compressed and suit shipping a
+snapshot to dashboard replicas, at the cost of decoding on load.
+
+Exports are incremental: each dataset's content hash (its rows in key
+order) is compared with the manifest and unchanged datasets are not
+rewritten. File names carry the hash, and the manifest is replaced
+atomically after the new files are in place, so a reader holding the old
+manifest keeps reading consistent files. Files referenced by neither the
+new nor the previous manifest are removed.
+
+Usage:
+    python db/scripts/snapshots.py [--out DIR] [--format arrow|parquet] [--force]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import unicodedata
+from datetime import datetime, timezone
+
+import dotenv
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+dotenv.load_dotenv()
+
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
+SNAPSHOT_DIR = os.getenv("DASHDRIBBLE_SNAPSHOT_DIR", "data/snapshot")
+MANIFEST = "manifest.json"
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+# Bookkeeping tables the dashboard never reads
+SKIP_TABLES = {"pipeline_runs", "match_updates"}
+
+# Derived datasets: (name, query in a stable order)
+DERIVED = [
+    # The odds of the most recent parameter set per league (see simulation.py)
+    (
+        "latest_odds",
+        """
+        SELECT r.league_id, r.team_id, r.matchday, r.expected_points, r.expected_position,
+               r.title_odds, r.top_four_odds, r.relegation_odds
+        FROM simulation_results r
+        WHERE r.params_key = (
+            SELECT params_key FROM simulation_results
+            WHERE league_id = r.league_id ORDER BY created_at DESC LIMIT 1
+        )
+        ORDER BY r.league_id, r.expected_position
+        """,
+    ),
+    # The FTS5 index has no file form; names are folded here instead
+    (
+        "search_names",
+        "SELECT rowid AS cursor, kind, entity_id, name, team_id FROM search_index ORDER BY rowid",
+    ),
+]
+
+
+def fold(name):
+    """Lower-case and strip accents, as the search index tokenizer does."""
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def snapshot_tables(connection):
+    """Plain tables to export; virtual tables and their shadow tables are skipped."""
+    rows = connection.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall()
+    virtual = [name for name, sql in rows if sql.upper().startswith("CREATE VIRTUAL TABLE")]
+    return [
+        name for name, _ in rows
+        if name not in SKIP_TABLES and not any(name == v or name.startswith(f"{v}_") for v in virtual)
+    ]
+
+
+def table_query(connection, table):
+    """SELECT of a whole table in primary key order (rowid order without one)."""
+    pk = sorted((row[5], row[1]) for row in connection.execute(f"PRAGMA table_info({table})") if row[5])
+    order_by = ", ".join(name for _, name in pk) or "rowid"
+    return f"SELECT * FROM {table} ORDER BY {order_by}"
+
+
+def read_dataset(connection, sql):
+    """(column names, rows, content hash) of a query."""
+    cursor = connection.execute(sql)
+    columns = [description[0] for description in cursor.description]
+    digest = hashlib.blake2b(repr(columns).encode(), digest_size=16)
+    rows = []
+    while True:
+        batch = cursor.fetchmany(10_000)
+        if not batch:
+            break
+        digest.update(repr(batch).encode())
+        rows.extend(batch)
+    return columns, rows, digest.hexdigest()
+
+
+def _column(values):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # SQLite columns may mix types; keep them as text
+        return pa.array([None if value is None else str(value) for value in values], pa.string())
+
+
+def to_arrow(name, columns, rows):
+    values = list(zip(*rows)) if rows else [() for _ in columns]
+    table = pa.table({column: _column(list(data)) for column, data in zip(columns, values)})
+    if name == "search_names":
+        table = table.append_column("folded", pa.array([fold(n) for n in table.column("name").to_pylist()]))
+    return table
+
+
+def write_dataset(table, path, fmt):
+    tmp_path = f"{path}.tmp"
+    if fmt == "parquet":
+        pq.write_table(table, tmp_path, compression="zstd")
+    else:
+        with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def export_snapshot(connection, directory=SNAPSHOT_DIR, fmt="arrow", force=False):
+    """
+    Write every changed dataset and a new manifest.
+
+    Returns:
+        tuple: (names written, names unchanged)
+    """
+    os.makedirs(directory, exist_ok=True)
+    previous = read_manifest(directory) or {"version": 0, "datasets": {}}
+    if previous.get("format") != fmt:
+        force = True
+
+    sources = [(table, table_query(connection, table)) for table in snapshot_tables(connection)]
+    sources += [(name, sql) for name, sql in DERIVED if name not in dict(sources)]
+
+    datasets, written, unchanged = {}, [], []
+    for name, sql in sources:
+        try:
+            columns, rows, content_hash = read_dataset(connection, sql)
+        except sqlite3.OperationalError as e:
+            # A derived dataset over a table an older schema does not have
+            print(f"Skipping {name}: {e}")
+            continue
+        entry = previous["datasets"].get(name)
+        if (
+            not force
+            and entry is not None
+            and entry["hash"] == content_hash
+            and os.path.exists(os.path.join(directory, entry["file"]))
+        ):
+            datasets[name] = entry
+            unchanged.append(name)
+            continue
+
+        file_name = f"{name}.{content_hash[:12]}{FORMATS[fmt]}"
+        path = os.path.join(directory, file_name)
+        write_dataset(to_arrow(name, columns, rows), path, fmt)
+        datasets[name] = {
+            "file": file_name,
+            "hash": content_hash,
+            "rows": len(rows),
+            "bytes": os.path.getsize(path),
+            "columns": columns,
+        }
+        written.append(name)
+
+    if written or set(datasets) != set(previous["datasets"]):
+        write_manifest(
+            directory,
+            {
+                "version": previous["version"] + 1,
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "format": fmt,
+                "datasets": datasets,
+            },
+        )
+        prune(directory, datasets, previous["datasets"])
+    return written, unchanged
+
+
+def prune(directory, current, previous):
+    """Remove dataset files that neither the current nor the previous manifest lists."""
+    keep = {entry["file"] for entry in (*current.values(), *previous.values())} | {MANIFEST}
+    for file_name in os.listdir(directory):
+        if file_name.endswith(tuple(FORMATS.values())) and file_name not in keep:
+            os.remove(os.path.join(directory, file_name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the database to columnar snapshot files.")
+    parser.add_argument("--out", default=SNAPSHOT_DIR)
+    parser.add_argument("--format", choices=tuple(FORMATS), default="arrow")
+    parser.add_argument("--force", action="store_true", help="rewrite every dataset")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(f"file:{DB_FILE}?mode=ro", uri=True)
+    try:
+        written, unchanged = export_snapshot(connection, args.out, args.format, args.force)
+    finally:
+        connection.close()
+    manifest = read_manifest(args.out)
+    print(
+        f"Snapshot v{manifest['version'] if manifest else 0} in {args.out}: "
+        f"{len(written)} datasets written, {len(unchanged)} unchanged."
+    )
+    for name in written:
+        entry = manifest["datasets"][name]
+        print(f"  {name:<22} {entry['rows']:>9} rows {entry['bytes'] / 1024:>10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Historical standings, one snapshot per (league, season, matchday).
+
+`standings_history` (created by migration v5) stores each team's row only
+when it differs from the team's previous snapshot, so a row holds from its
+`matchday` until the team's next row. Rows are compact: `lost` and
+`goal_difference` are derived on read. A later snapshot of the same
+matchday replaces that matchday's row.
+
+Both question shapes are primary-key or index seeks:
+
+- league table at matchday N: per team, the latest row at or before N;
+- position over time for a team: idx_standings_history_team.
+
+Usage:
+    python db/scripts/standings_history.py backfill [FOLDER]
+    python db/scripts/standings_history.py table LEAGUE_ID SEASON_ID MATCHDAY
+    python db/scripts/standings_history.py team TEAM_ID [--season SEASON_ID]
+"""
+
+import argparse
+import os
+import sqlite3
+
+import dotenv
+
+dotenv.load_dotenv()
+
+DB_FILE = os.getenv("DASHDRIBBLE_DB_FILE")
+DATA_FOLDER = os.getenv("LEAGUE_TEAMS_DATA_FOLDER", "data/current_league_teams")
+
+# Stored per snapshot; lost and goal_difference are derived from these
+SNAPSHOT_COLUMNS = ("position", "played_games", "won", "draw", "points", "goals_for", "goals_against")
+
+
+def create_history_table(cursor):
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS standings_history (
+        league_id INTEGER NOT NULL,
+        season_id INTEGER NOT NULL,
+        team_id INTEGER NOT NULL,
+        matchday INTEGER NOT NULL,
+        {", ".join(f"{column} INTEGER NOT NULL" for column in SNAPSHOT_COLUMNS)},
+        PRIMARY KEY (league_id, season_id, team_id, matchday)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_standings_history_team
+    ON standings_history (team_id, season_id, matchday, position)
+    """)
+
+
+def create_snapshots_table(cursor):
+    """
+    v9: the matchdays recorded per league and season. Unchanged rows are not
+    stored, so a snapshot can leave no rows behind; this keeps a record of it
+    for snapshots recorded out of order (see record_snapshot).
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS standings_snapshots (
+        league_id INTEGER NOT NULL,
+        season_id INTEGER NOT NULL,
+        matchday INTEGER NOT NULL,
+        PRIMARY KEY (league_id, season_id, matchday)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+    INSERT OR IGNORE INTO standings_snapshots (league_id, season_id, matchday)
+    SELECT DISTINCT league_id, season_id, matchday FROM standings_history
+    """)
+
+
+def snapshot_key(json_data):
+    """(league_id, season_id, matchday) of a standings payload, or None if it has no matchday."""
+    season = json_data.get("season") or {}
+    if season.get("id") is None or season.get("currentMatchday") is None:
+        return None
+    return json_data["competition"]["id"], season["id"], season["currentMatchday"]
+
+
+def _previous_rows(cursor, league_id, season_id, matchday):
+    """{team_id: snapshot values} of each team's latest row before `matchday`."""
+    cursor.execute(
+        f"""
+        SELECT h.team_id, {", ".join(f"h.{column}" for column in SNAPSHOT_COLUMNS)}
+        FROM standings_history h
+        WHERE h.league_id = ? AND h.season_id = ?
+          AND h.matchday = (
+              SELECT MAX(p.matchday) FROM standings_history p
+              WHERE p.league_id = h.league_id AND p.season_id = h.season_id
+                AND p.team_id = h.team_id AND p.matchday < ?
+          )
+        """,
+        (league_id, season_id, matchday),
+    )
+    return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+
+def _rows_at(cursor, league_id, season_id, matchday):
+    """{team_id: snapshot values} of the rows stored at exactly `matchday`."""
+    cursor.execute(
+        f"""
+        SELECT team_id, {", ".join(SNAPSHOT_COLUMNS)} FROM standings_history
+        WHERE league_id = ? AND season_id = ? AND matchday = ?
+        """,
+        (league_id, season_id, matchday),
+    )
+    return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+
+def _upsert_rows(cursor, league_id, season_id, matchday, rows):
+    cursor.executemany(
+        f"""
+        INSERT INTO standings_history (league_id, season_id, team_id, matchday, {", ".join(SNAPSHOT_COLUMNS)})
+        VALUES (?, ?, ?, ?, {", ".join("?" for _ in SNAPSHOT_COLUMNS)})
+        ON CONFLICT (league_id, season_id, team_id, matchday) DO UPDATE SET
+        {", ".join(f"{column} = excluded.{column}" for column in SNAPSHOT_COLUMNS)}
+        """,
+        [(league_id, season_id, team_id, matchday, *values) for team_id, values in rows],
+    )
+
+
+def _delete_rows(cursor, league_id, season_id, matchday, team_ids):
+    cursor.executemany(
+        "DELETE FROM standings_history "
+        "WHERE league_id = ? AND season_id = ? AND team_id = ? AND matchday = ?",
+        [(league_id, season_id, team_id, matchday) for team_id in team_ids],
+    )
+
+
+def record_snapshot(cursor, key, standings):
+    """
+    Record the parsed Standing records (see records.parse_standings) as the snapshot
+    for `key` = (league_id, season_id, matchday). Snapshots may be recorded in
+    any order.
+
+    Returns:
+        tuple: (rows written, rows unchanged since the previous snapshot)
+    """
+    league_id, season_id, matchday = key
+    previous = _previous_rows(cursor, league_id, season_id, matchday)
+
+    # One row per team, should a payload list a team twice
+    current = {}
+    for standing in standings:
+        current.setdefault(standing.team_id, tuple(getattr(standing, c) for c in SNAPSHOT_COLUMNS))
+
+    changed = [(team_id, values) for team_id, values in current.items() if previous.get(team_id) != values]
+    unchanged = current.keys() - {team_id for team_id, _ in changed}
+
+    # Recorded out of order (a backfill after live loads): later snapshots
+    # dropped their unchanged rows against what was stored before, so the
+    # next recorded snapshot gets the values it showed wherever this one
+    # would now change them, and loses rows this one makes redundant.
+    cursor.execute(
+        "SELECT MIN(matchday) FROM standings_snapshots WHERE league_id = ? AND season_id = ? AND matchday > ?",
+        (league_id, season_id, matchday),
+    )
+    (next_matchday,) = cursor.fetchone()
+    if next_matchday is not None:
+        shown = {**previous, **_rows_at(cursor, league_id, season_id, matchday)}
+        stored_next = _rows_at(cursor, league_id, season_id, next_matchday)
+        carried = [
+            (team_id, shown[team_id]) for team_id, values in current.items()
+            if team_id not in stored_next and team_id in shown and shown[team_id] != values
+        ]
+        redundant = [team_id for team_id, values in current.items() if stored_next.get(team_id) == values]
+        _upsert_rows(cursor, league_id, season_id, next_matchday, carried)
+        _delete_rows(cursor, league_id, season_id, next_matchday, redundant)
+
+    _upsert_rows(cursor, league_id, season_id, matchday, changed)
+    cursor.execute(
+        "INSERT OR IGNORE INTO standings_snapshots (league_id, season_id, matchday) VALUES (?, ?, ?)",
+        key,
+    )
+    # An earlier snapshot of this matchday may have differed; the previous row now covers it
+    _delete_rows(cursor, league_id, season_id, matchday, unchanged)
+    return len(changed), len(unchanged)
+
+
+def table_at(cursor, league_id, season_id, matchday):
+    """League table as of `matchday`, ordered by position."""
+    cursor.execute(
+        """
+        SELECT h.position, h.team_id, h.played_games, h.won, h.draw,
+               h.played_games - h.won - h.draw AS lost, h.points,
+               h.goals_for, h.goals_against, h.goals_for - h.goals_against AS goal_difference
+        FROM (SELECT DISTINCT team_id FROM standings_history
+              WHERE league_id = ? AND season_id = ?) t
+        JOIN standings_history h
+          ON h.league_id = ? AND h.season_id = ? AND h.team_id = t.team_id
+         AND h.matchday = (
+             SELECT MAX(p.matchday) FROM standings_history p
+             WHERE p.league_id = h.league_id AND p.season_id = h.season_id
+               AND p.team_id = t.team_id AND p.matchday <= ?
+         )
+        ORDER BY h.position
+        """,
+        (league_id, season_id, league_id, season_id, matchday),
+    )
+    return cursor.fetchall()
+
+
+def position_history(cursor, team_id, season_id=None):
+    """
+    [(season_id, matchday, position)] for a team, one entry per stored
+    snapshot; the position holds until the next entry.
+    """
+    sql = "SELECT season_id, matchday, position FROM standings_history WHERE team_id = ?"
+    params = [team_id]
+    if season_id is not None:
+        sql += " AND season_id = ?"
+        params.append(season_id)
+    cursor.execute(sql + " ORDER BY season_id, matchday", params)
+    return cursor.fetchall()
+
+
+def backfill(connection, folder):
+    """Record every standings JSON file under `folder`, oldest snapshot first."""
+    from parallel_ingest import JSON_SUFFIXES
+    from records import get_json_data, parse_standings
+
+    snapshots = []
+    for root, _, files in os.walk(folder):
+        for filename in files:
+            if not filename.endswith(JSON_SUFFIXES):
+                continue
+            json_data = get_json_data(os.path.join(root, filename))
+            key = snapshot_key(json_data) if json_data else None
+            if key is None:
+                print(f"Skipping {filename}: no season or matchday.")
+                continue
+            snapshots.append((key, parse_standings(json_data)[1]))
+
+    written = unchanged = 0
+    with connection:
+        cursor = connection.cursor()
+        # (league, season, matchday) order, so every snapshot is diffed against its predecessor
+        for key, standings in sorted(snapshots, key=lambda snapshot: snapshot[0]):
+            counts = record_snapshot(cursor, key, standings)
+            written += counts[0]
+            unchanged += counts[1]
+    print(f"Backfilled {len(snapshots)} snapshots: {written} rows stored, {unchanged} unchanged.")
+
+
+def main():
+    from migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Historical standings snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = commands.add_parser("backfill", help="import standings JSON archives")
+    backfill_parser.add_argument("folder", nargs="?", default=DATA_FOLDER)
+    table_parser = commands.add_parser("table", help="league table at a matchday")
+    table_parser.add_argument("league_id", type=int)
+    table_parser.add_argument("season_id", type=int)
+    table_parser.add_argument("matchday", type=int)
+    team_parser = commands.add_parser("team", help="position over time for a team")
+    team_parser.add_argument("team_id", type=int)
+    team_parser.add_argument("--season", type=int, default=None)
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(DB_FILE)
+    try:
+        migrate(connection)
+        cursor = connection.cursor()
+        if args.command == "backfill":
+            backfill(connection, args.folder)
+        elif args.command == "table":
+            for row in table_at(cursor, args.league_id, args.season_id, args.matchday):
+                print(*row)
+        else:
+            for season_id, matchday, position in position_history(cursor, args.team_id, args.season):
+                print(f"season {season_id} matchday {matchday}: {position}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Summary tables materialised at load time (created by migration v4).
+
+- `league_table`: the standings of each league joined with the team name
+  and crest, keyed by (league_id, position) so a league table is one
+  index range read.
+- `league_summary`: one row per league (matches, goals per game, leader
+  and gap to second).
+- `team_squad_stats`: one row per team (squad size, average age, players
+  per position group).
+- `nationality_counts`: players per (team, nationality).
+
+Loaders call `refresh_league_summaries` / `refresh_team_summaries` for the
+leagues and teams they wrote, inside their own transaction. Each refresh
+deletes and recomputes the affected rows with one set-based statement per
+table.
+
+Usage (full rebuild):
+    python db/scripts/summaries.py
+"""
+
+import json
+import sqlite3
+
+# Position groups; the API reports either the four broad groups or
+# detailed positions such as "Centre-Back" or "Left Winger".
+POSITION_GROUPS = {
+    "goalkeepers": "position = 'Goalkeeper'",
+    "defenders": "(position IN ('Defence', 'Defender') OR position LIKE '%Back')",
+    "midfielders": "position LIKE '%Midfield%'",
+    "attackers": (
+        "(position IN ('Offence', 'Attack') OR position LIKE '%Forward' "
+        "OR position LIKE '%Winger' OR position LIKE '%Striker')"
+    ),
+}
+
+SUMMARY_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS league_table (
+        league_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        team_id INTEGER NOT NULL,
+        team_name TEXT,
+        crest TEXT,
+        played_games INTEGER,
+        won INTEGER,
+        draw INTEGER,
+        lost INTEGER,
+        points INTEGER,
+        goals_for INTEGER,
+        goals_against INTEGER,
+        goal_difference INTEGER,
+        points_per_game REAL,
+        PRIMARY KEY (league_id, position, team_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS league_summary (
+        league_id INTEGER PRIMARY KEY,
+        teams INTEGER NOT NULL,
+        matches_played INTEGER NOT NULL,
+        goals INTEGER NOT NULL,
+        goals_per_game REAL,
+        leader_team_id INTEGER,
+        leader_points INTEGER,
+        points_gap INTEGER,
+        refreshed_at TEXT NOT NULL
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS team_squad_stats (
+        team_id INTEGER PRIMARY KEY,
+        players INTEGER NOT NULL,
+        average_age REAL,
+        {", ".join(f"{group} INTEGER NOT NULL" for group in POSITION_GROUPS)},
+        nationalities INTEGER NOT NULL,
+        refreshed_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS nationality_counts (
+        team_id INTEGER NOT NULL,
+        nationality TEXT NOT NULL,
+        players INTEGER NOT NULL,
+        PRIMARY KEY (team_id, nationality)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_nationality_counts_nationality
+    ON nationality_counts (nationality, players)
+    """,
+]
+
+INSERT_LEAGUE_TABLE_SQL = """
+INSERT INTO league_table (
+    league_id, position, team_id, team_name, crest, played_games, won, draw, lost,
+    points, goals_for, goals_against, goal_difference, points_per_game
+)
+SELECT s.league_id, s.position, s.team_id, t.name, t.crest, s.played_games, s.won,
+       s.draw, s.lost, s.points, s.goals_for, s.goals_against, s.goal_difference,
+       ROUND(CAST(s.points AS REAL) / NULLIF(s.played_games, 0), 2)
+FROM current_standings s
+LEFT JOIN league_teams t ON t.id = s.team_id
+"""
+
+INSERT_LEAGUE_SUMMARY_SQL = """
+INSERT INTO league_summary (
+    league_id, teams, matches_played, goals, goals_per_game,
+    leader_team_id, leader_points, points_gap, refreshed_at
+)
+SELECT league_id,
+       COUNT(*),
+       SUM(played_games) / 2,
+       SUM(goals_for),
+       ROUND(CAST(SUM(goals_for) AS REAL) / NULLIF(SUM(played_games) / 2, 0), 2),
+       MAX(CASE WHEN position = 1 THEN team_id END),
+       MAX(CASE WHEN position = 1 THEN points END),
+       MAX(CASE WHEN position = 1 THEN points END) - MAX(CASE WHEN position = 2 THEN points END),
+       datetime('now')
+FROM current_standings
+"""
+
+INSERT_SQUAD_STATS_SQL = f"""
+INSERT INTO team_squad_stats (
+    team_id, players, average_age, {", ".join(POSITION_GROUPS)}, nationalities, refreshed_at
+)
+SELECT team_id,
+       COUNT(*),
+       ROUND(AVG((julianday('now') - julianday(date_of_birth)) / 365.25), 1),
+       {", ".join(f"COALESCE(SUM({condition}), 0)" for condition in POSITION_GROUPS.values())},
+       COUNT(DISTINCT nationality),
+       datetime('now')
+FROM players
+"""
+
+INSERT_NATIONALITY_COUNTS_SQL = """
+INSERT INTO nationality_counts (team_id, nationality, players)
+SELECT team_id, nationality, COUNT(*)
+FROM players
+"""
+
+IN_IDS = "IN (SELECT value FROM json_each(?))"
+
+
+def _ids(ids):
+    return json.dumps(sorted({int(i) for i in ids}))
+
+
+def create_summary_tables(cursor):
+    for statement in SUMMARY_SCHEMA:
+        cursor.execute(statement)
+
+
+def refresh_league_summaries(cursor, league_ids):
+    """Recompute league_table and league_summary for `league_ids`."""
+    ids = _ids(league_ids)
+    cursor.execute(f"DELETE FROM league_table WHERE league_id {IN_IDS}", (ids,))
+    cursor.execute(f"{INSERT_LEAGUE_TABLE_SQL} WHERE s.league_id {IN_IDS}", (ids,))
+    cursor.execute(f"DELETE FROM league_summary WHERE league_id {IN_IDS}", (ids,))
+    cursor.execute(
+        f"{INSERT_LEAGUE_SUMMARY_SQL} WHERE league_id {IN_IDS} GROUP BY league_id", (ids,)
+    )
+
+
+def refresh_team_summaries(cursor, team_ids):
+    """Recompute team_squad_stats and nationality_counts for `team_ids`."""
+    ids = _ids(team_ids)
+    cursor.execute(f"DELETE FROM team_squad_stats WHERE team_id {IN_IDS}", (ids,))
+    cursor.execute(f"{INSERT_SQUAD_STATS_SQL} WHERE team_id {IN_IDS} GROUP BY team_id", (ids,))
+    cursor.execute(f"DELETE FROM nationality_counts WHERE team_id {IN_IDS}", (ids,))
+    cursor.execute(
+        f"{INSERT_NATIONALITY_COUNTS_SQL} WHERE team_id {IN_IDS} AND nationality IS NOT NULL "
+        f"GROUP BY team_id, nationality",
+        (ids,),
+    )
+
+
+def rebuild_summaries(cursor):
+    """Recompute every summary table from the source tables."""
+    for table in ("league_table", "league_summary", "team_squad_stats", "nationality_counts"):
+        cursor.execute(f"DELETE FROM {table}")
+    cursor.execute(INSERT_LEAGUE_TABLE_SQL)
+    cursor.execute(f"{INSERT_LEAGUE_SUMMARY_SQL} GROUP BY league_id")
+    cursor.execute(f"{INSERT_SQUAD_STATS_SQL} GROUP BY team_id")
+    cursor.execute(
+        f"{INSERT_NATIONALITY_COUNTS_SQL} WHERE nationality IS NOT NULL GROUP BY team_id, nationality"
+    )
+
+
+def main():
+    from migrations import DB_FILE, migrate
+
+    connection = sqlite3.connect(DB_FILE)
+    try:
+        migrate(connection)
+        with connection:
+            rebuild_summaries(connection.cursor())
+        print("Rebuilt the summary tables.")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Streaming reader/writer for the team data file.
+
+The fetcher writes newline-delimited JSON (`team_data.ndjson`): one team
+payload per line, keyed by the payload's own `id`. The legacy format is a
+single `{team_id: payload, ...}` document (`team_data.json`); it is read
+with an incremental parser so neither format is ever fully materialised.
+"""
+
+import gzip
+import json
+import os
+from itertools import islice
+
+from records import loads
+
+NDJSON_FILE = "team_data.ndjson"
+# Written by `payload_archive.py checkout`
+COMPRESSED_NDJSON_FILE = "team_data.ndjson.gz"
+LEGACY_FILE = "team_data.json"
+READ_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\r\n"
+
+
+def resolve_team_data_path(folder):
+    """Prefer the NDJSON file (plain, then compressed), fall back to the legacy single document."""
+    for name in (NDJSON_FILE, COMPRESSED_NDJSON_FILE):
+        ndjson_path = os.path.join(folder, name)
+        if os.path.exists(ndjson_path):
+            return ndjson_path
+    return os.path.join(folder, LEGACY_FILE)
+
+
+def iter_ndjson_teams(path):
+    # A compressed file is decompressed line by line as it is read
+    with (gzip.open if path.endswith(".gz") else open)(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                team = loads(line)
+                yield int(team["id"]), team
+
+
+def iter_legacy_teams(path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield (team_id, payload) pairs from a `{team_id: payload}` document
+    while holding at most about twice the largest team in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill(size=chunk_size):
+            nonlocal buffer, pos, eof
+            chunk = f.read(size)
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+
+        def expect(chars):
+            nonlocal pos
+            skip_whitespace()
+            if pos >= len(buffer) or buffer[pos] not in chars:
+                raise json.JSONDecodeError(f"Expected one of {chars!r}", buffer, pos)
+            pos += 1
+            return buffer[pos - 1]
+
+        def decode_value():
+            nonlocal pos
+            skip_whitespace()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # Read at least as much again as is pending, so a value
+                    # spanning many chunks is re-decoded O(log n) times, not O(n)
+                    fill(max(chunk_size, len(buffer) - pos))
+                    continue
+                pos = end
+                return value
+
+        expect("{")
+        skip_whitespace()
+        if pos < len(buffer) and buffer[pos] == "}":
+            return
+        while True:
+            team_id = decode_value()
+            expect(":")
+            team = decode_value()
+            yield int(team_id), team
+            if expect(",}") == "}":
+                return
+
+
+def iter_teams(path):
+    """Yield (team_id, payload) pairs from either team data format."""
+    if path.endswith((".ndjson", ".ndjson.gz")):
+        return iter_ndjson_teams(path)
+    return iter_legacy_teams(path)
+
+
+def write_teams(path, teams):
+    """
+    Write (team_id, payload) pairs as NDJSON, atomically replacing `path`.
+
+    Returns:
+        int: Number of teams written.
+    """
+    count = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        for team_id, team in teams:
+            if team.get("id") is None:
+                team = {**team, "id": team_id}
+            f.write(json.dumps(team, separators=(",", ":")))
+            f.write("\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def chunked(iterable, size):
+    """Yield lists of at most `size` items."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
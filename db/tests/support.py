@@ -0,0 +1,15 @@
+"""
+Shared setup for the tests: the scripts and benchmarks folders on sys.path,
+as the scripts themselves expect to run from `db/scripts`.
+
+    python -m unittest discover -s db/tests -t db
+"""
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+for folder in ("scripts", "benchmarks", "azure"):
+    path = os.path.join(HERE, "..", folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+from tests import support  # noqa: F401
+
+from fetch_client import TokenBucket, fetch_json
+from response_cache import ResponseCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Answers each GET with the next queued response and keeps the headers sent."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.sent.append(headers)
+        return self.responses.pop(0)
+
+
+class FetchJsonTest(unittest.TestCase):
+    def setUp(self):
+        self.limiter = TokenBucket(600, 10.0)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResponseCache(os.path.join(directory.name, "cache.db"))
+        self.addCleanup(self.cache.close)
+
+    def fetch(self, session, **kwargs):
+        return fetch_json("https://api/x", {}, self.limiter, session=session, backoff=0, **kwargs)
+
+    def test_body_that_is_not_json_returns_none(self):
+        session = FakeSession(FakeResponse(200, b"<html>Bad gateway</html>", {"ETag": '"a"'}))
+        self.assertIsNone(self.fetch(session, cache=self.cache))
+        # Never cached
+        self.assertIsNone(self.cache.lookup("https://api/x"))
+
+    def test_corrupt_cached_body_is_evicted_and_refetched(self):
+        self.cache.store("https://api/x", '"a"', None, b'{"trunc')
+        session = FakeSession(FakeResponse(304), FakeResponse(200, b'{"ok": 1}', {"ETag": '"b"'}))
+        self.assertEqual(self.fetch(session, cache=self.cache), {"ok": 1})
+        # The retry went out without the stale validator
+        self.assertNotIn("If-None-Match", session.sent[1])
+        self.assertEqual(self.cache.lookup("https://api/x").body, b'{"ok": 1}')
+
+    def test_failing_on_body_keeps_the_payload(self):
+        def on_body(body):
+            raise OSError("disk full")
+
+        session = FakeSession(FakeResponse(200, b'{"ok": 1}'))
+        self.assertEqual(self.fetch(session, on_body=on_body), {"ok": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
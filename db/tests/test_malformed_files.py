@@ -0,0 +1,75 @@
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from tests import support  # noqa: F401
+
+from db_league_teams_create import insert_teams, insert_teams_parallel
+from db_leagues_create import insert_leagues, insert_leagues_parallel
+from migrations import migrate
+from synthetic import SyntheticWorld
+
+
+class MalformedFileTest(unittest.TestCase):
+    """A malformed file is reported and skipped by the serial and parallel loaders alike."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.folder = os.path.join(directory.name, "data")
+        os.mkdir(self.folder)
+        self.connection = sqlite3.connect(os.path.join(directory.name, "football.db"))
+        self.addCleanup(self.connection.close)
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate(self.connection)
+        self.world = SyntheticWorld(1)
+        self.code = self.world.league_codes()[0]
+
+    def write(self, name, text):
+        with open(os.path.join(self.folder, name), "w") as f:
+            f.write(text)
+
+    def write_malformed(self):
+        # One truncated document and one that lacks required fields
+        self.write("truncated.json", '{"competition": {"id": ')
+        self.write("incomplete.json", json.dumps({"standings": []}))
+
+    def count(self, table):
+        return self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def load(self, loader, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            loader(self.connection.cursor(), self.folder, *args)
+
+    def check_teams(self, loader, *args):
+        standings = self.world.standings(self.code)
+        self.write(f"{self.code}.json", json.dumps(standings))
+        self.write_malformed()
+        self.load(loader, *args)
+        self.assertEqual(self.count("league_teams"), len(standings["standings"][0]["table"]))
+
+    def check_leagues(self, loader, *args):
+        self.write(f"{self.code}.json", json.dumps(self.world.competition(self.code)))
+        self.write_malformed()
+        self.load(loader, *args)
+        self.assertEqual(self.count("leagues"), 1)
+
+    def test_serial_team_loader_skips(self):
+        self.check_teams(insert_teams)
+
+    def test_parallel_team_loader_skips(self):
+        self.check_teams(insert_teams_parallel, 2)
+
+    def test_serial_league_loader_skips(self):
+        self.check_leagues(insert_leagues)
+
+    def test_parallel_league_loader_skips(self):
+        self.check_leagues(insert_leagues_parallel, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
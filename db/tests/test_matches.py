@@ -0,0 +1,39 @@
+import contextlib
+import io
+import sqlite3
+import unittest
+
+from tests import support  # noqa: F401
+
+from matches import load_matches
+from migrations import migrate
+from synthetic import SyntheticWorld
+
+
+class MatchDiffTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.addCleanup(self.connection.close)
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate(self.connection)
+        world = SyntheticWorld(1)
+        self.payload = world.matches(world.league_codes()[0])
+        self.cursor = self.connection.cursor()
+        load_matches(self.cursor, self.payload)
+
+    def test_unchanged_payload_writes_nothing(self):
+        self.assertEqual(load_matches(self.cursor, self.payload), [])
+
+    def test_corrected_winner_and_team_are_written(self):
+        finished = [m for m in self.payload["matches"] if m["score"]["winner"] == "HOME_TEAM"]
+        # An awarded result reverses the winner and keeps the score
+        finished[0]["score"]["winner"] = "AWAY_TEAM"
+        finished[1]["homeTeam"] = {**finished[1]["homeTeam"], "id": 999999}
+        changed = load_matches(self.cursor, self.payload)
+        self.assertEqual({m.id for m in changed}, {finished[0]["id"], finished[1]["id"]})
+        winner = self.cursor.execute("SELECT winner FROM matches WHERE id = ?", (finished[0]["id"],)).fetchone()[0]
+        self.assertEqual(winner, "AWAY_TEAM")
+
+
+if __name__ == "__main__":
+    unittest.main()
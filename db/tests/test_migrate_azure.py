@@ -0,0 +1,67 @@
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from tests import support  # noqa: F401
+
+from migrate_azure import Checkpoint, create_target_engine, migrate_table, reflect_source
+
+
+class CrashingCheckpoint(Checkpoint):
+    """Fails the checkpoint write after the second chunk has been committed."""
+
+    def update(self, table, **values):
+        if values.get("rows", 0) > 2:
+            raise OSError("disk full")
+        super().update(table, **values)
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source_path = os.path.join(directory.name, "source.db")
+        self.checkpoint_path = os.path.join(directory.name, "checkpoint.json")
+        source = sqlite3.connect(self.source_path)
+        source.execute("CREATE TABLE teams (id INTEGER PRIMARY KEY, name TEXT)")
+        source.execute("CREATE TABLE notes (body TEXT)")
+        for i in range(1, 8):
+            source.execute("INSERT INTO teams VALUES (?, ?)", (i, f"Team {i}"))
+            source.execute("INSERT INTO notes VALUES (?)", (f"Note {i}",))
+        source.commit()
+        source.close()
+
+        self.target_path = os.path.join(directory.name, "target.db")
+        self.engine = create_target_engine(f"sqlite:///{self.target_path}")
+        self.addCleanup(self.engine.dispose)
+        reflect_source(self.source_path).create_all(self.engine)
+
+    def rows(self, path, table):
+        connection = sqlite3.connect(path)
+        try:
+            return sorted(connection.execute(f"SELECT * FROM {table}").fetchall())
+        finally:
+            connection.close()
+
+    def resume_after_crash(self, table):
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(OSError):
+                migrate_table(self.source_path, self.engine, table, CrashingCheckpoint(self.checkpoint_path), 2)
+            # The second chunk is in the target but not in the checkpoint
+            self.assertEqual(len(self.rows(self.target_path, table)), 4)
+            rows = migrate_table(self.source_path, self.engine, table, Checkpoint(self.checkpoint_path), 2)
+        self.assertEqual(rows, 7)
+        self.assertEqual(self.rows(self.target_path, table), self.rows(self.source_path, table))
+
+    def test_keyed_table_resumes_without_duplicates(self):
+        self.resume_after_crash("teams")
+
+    def test_rowid_table_resumes_without_duplicates(self):
+        self.resume_after_crash("notes")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import contextlib
+import io
+import os
+import sqlite3
+import unittest
+from datetime import timedelta
+
+from tests import support  # noqa: F401
+
+# Points the data folders at its own work directory, so it goes before the daemon
+import sim_refresh
+from sim_refresh import START, SimulatedClient, seed
+from refresh_daemon import FakeClock, KickoffWindows, RefreshDaemon, parse_windows
+
+
+class FlakyClient(SimulatedClient):
+    """Serves the first standings request as a body that is not JSON."""
+
+    def __init__(self, clock, times):
+        super().__init__(clock, times, requests_per_minute=60)
+        self.paths = []
+
+    def get_json(self, path):
+        self.paths.append(path)
+        if len(self.paths) == 1:
+            raise ValueError("Expecting value: line 1 column 1 (char 0)")
+        return super().get_json(path)
+
+
+class BadPayloadTest(unittest.TestCase):
+    def setUp(self):
+        self.db_path = os.path.join(sim_refresh.WORK_DIR, "football.db")
+        if os.path.exists(self.db_path):
+            os.remove(self.db_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seed(self.db_path)
+        self.clock = FakeClock(START)
+        # PL reaches its next matchday a minute in
+        self.client = FlakyClient(self.clock, {"PL": [START + timedelta(minutes=1)]})
+        self.exports = []
+
+    def export(self):
+        self.exports.append(self.clock.now())
+        if len(self.exports) == 1:
+            raise OSError("snapshot directory is read-only")
+
+    def test_daemon_keeps_running(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            daemon = RefreshDaemon(
+                self.client,
+                db_file=self.db_path,
+                competitions=["PL"],
+                clock=self.clock,
+                windows=KickoffWindows(parse_windows("fri 0-23")),
+                requests_per_minute=60,
+                live=60,
+                on_change=self.export,
+            )
+
+            async def ticks(count):
+                for _ in range(count):
+                    wake = await daemon.step()
+                    await self.clock.sleep((wake - self.clock.now()).total_seconds())
+
+            # The bad body, then the new table and a failing export, then its retry
+            asyncio.run(ticks(3))
+
+        self.assertGreater(self.client.paths.count("competition/PL/standings"), 1)
+        self.assertEqual(len(self.exports), 2)
+        self.assertFalse(daemon.export_pending)
+        connection = sqlite3.connect(self.db_path)
+        self.addCleanup(connection.close)
+        matchday = connection.execute("SELECT current_matchday FROM leagues WHERE code = 'PL'").fetchone()[0]
+        self.assertEqual(matchday, sim_refresh.BASE_MATCHDAY + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from tests import support  # noqa: F401
+
+from migrate_azure import create_target_engine, reflect_source
+from migrations import migrate
+from sync_azure import sync, upsert_statement
+
+
+class AllKeyColumnsTest(unittest.TestCase):
+    """standings_snapshots has no column outside its primary key."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.source_path = os.path.join(directory.name, "football.db")
+        self.source = sqlite3.connect(self.source_path)
+        self.addCleanup(self.source.close)
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate(self.source)
+        with self.source:
+            self.source.executemany(
+                "INSERT INTO standings_snapshots (league_id, season_id, matchday) VALUES (?, ?, ?)",
+                [(2021, 1, 1), (2021, 1, 2), (2014, 1, 1)],
+            )
+
+        self.target_path = os.path.join(directory.name, "target.db")
+        self.url = f"sqlite:///{self.target_path}"
+        engine = create_target_engine(self.url)
+        reflect_source(self.source_path).create_all(engine)
+        engine.dispose()
+
+    def sync(self, state_name):
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync(self.source_path, self.url, state_path=os.path.join(self.directory, state_name))
+
+    def snapshots(self, connection):
+        return connection.execute("SELECT * FROM standings_snapshots ORDER BY 1, 2, 3").fetchall()
+
+    def test_sync_inserts_and_ignores_existing_rows(self):
+        self.sync("state.db")
+        # A lost sync state pushes every row again, onto rows the target already has
+        self.sync("fresh_state.db")
+        target = sqlite3.connect(self.target_path)
+        self.addCleanup(target.close)
+        self.assertEqual(self.snapshots(target), self.snapshots(self.source))
+
+    def test_merge_has_no_update_clause(self):
+        keys = ["league_id", "season_id", "matchday"]
+        statement = str(upsert_statement("mssql", "standings_snapshots", keys, keys))
+        self.assertNotIn("WHEN MATCHED", statement)
+        self.assertIn("WHEN NOT MATCHED THEN INSERT", statement)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from tests import support  # noqa: F401
+
+from db_players_coach_stadium_create import process_team_data
+from migrations import migrate
+from synthetic import SyntheticWorld
+
+
+class ProcessTeamDataTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.db_path = os.path.join(directory.name, "football.db")
+        self.connection = sqlite3.connect(self.db_path)
+        self.addCleanup(self.connection.close)
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate(self.connection)
+        self.teams = dict(SyntheticWorld(1).teams())
+
+    def load(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_team_data(self.connection, self.teams)
+
+    def test_journal_mode_is_restored(self):
+        self.load()
+        self.assertEqual(self.connection.execute("PRAGMA journal_mode").fetchone()[0], "delete")
+        self.assertFalse(os.path.exists(f"{self.db_path}-wal"))
+        players = self.connection.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+        self.assertEqual(players, sum(len(team["squad"]) for team in self.teams.values()))
+
+    def test_wal_database_stays_wal(self):
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.load()
+        self.assertEqual(self.connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from tests import support  # noqa: F401
+
+import team_data_stream
+from team_data_stream import iter_legacy_teams
+
+
+class IterLegacyTeamsTest(unittest.TestCase):
+    def write(self, document):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "team_data.json")
+        with open(path, "w") as f:
+            json.dump(document, f, indent=1)
+        return path
+
+    def test_reads_every_team(self):
+        teams = {str(i): {"id": i, "squad": [{"id": i * 100 + j} for j in range(30)]} for i in range(1, 40)}
+        path = self.write(teams)
+        read = dict(iter_legacy_teams(path, chunk_size=97))
+        self.assertEqual(read, {int(k): v for k, v in teams.items()})
+
+    def test_large_team_is_not_decoded_once_per_chunk(self):
+        # One team of about 2 MB read in 1 KB chunks: 2000 chunks
+        squad = [{"id": j, "name": f"Player {j}", "position": "Midfield"} for j in range(40_000)]
+        path = self.write({"1": {"id": 1, "squad": squad}})
+
+        decoder = json.JSONDecoder()
+        calls = []
+
+        class CountingDecoder:
+            def raw_decode(self, s, idx=0):
+                calls.append(idx)
+                return decoder.raw_decode(s, idx)
+
+        with mock.patch.object(team_data_stream.json, "JSONDecoder", CountingDecoder):
+            [(team_id, team)] = list(iter_legacy_teams(path, chunk_size=1024))
+        self.assertEqual(len(team["squad"]), 40_000)
+        self.assertLess(len(calls), 40)
+
+
+if __name__ == "__main__":
+    unittest.main()